@@ -7,4 +7,5 @@ from .models import UserProfile
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'role', 'phone', 'created_at']
     list_filter = ['role', 'created_at']
-    search_fields = ['user__username', 'user__email', 'phone']
\ No newline at end of file
+    search_fields = ['user__username', 'user__email', 'phone']
+    list_select_related = ['user']
\ No newline at end of file
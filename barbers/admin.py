@@ -13,4 +13,5 @@ class BarberAdmin(admin.ModelAdmin):
 class BarberAvailabilityAdmin(admin.ModelAdmin):
     list_display = ['barber', 'day_of_week', 'start_time', 'end_time', 'is_available']
     list_filter = ['day_of_week', 'is_available']
-    search_fields = ['barber__name']
\ No newline at end of file
+    search_fields = ['barber__name']
+    list_select_related = ['barber']
\ No newline at end of file
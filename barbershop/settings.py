@@ -29,6 +29,7 @@ INSTALLED_APPS = [
     'services',
     'payments',
     'dashboard',
+    'reports',
 ]
 
 MIDDLEWARE = [
@@ -69,6 +70,15 @@ DATABASES = {
     )
 }
 
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Take the write lock when a transaction begins, so concurrent bookings
+    # queue up instead of deadlocking on a read-to-write lock upgrade, and
+    # give a long queue of writers time to drain
+    DATABASES['default'].setdefault('OPTIONS', {}).update({'transaction_mode': 'IMMEDIATE', 'timeout': 20})
+    # Test against a file so threads see real file locking, as in development,
+    # rather than the shared-cache table locks of an in-memory database
+    DATABASES['default'].setdefault('TEST', {})['NAME'] = BASE_DIR / 'test_db.sqlite3'
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
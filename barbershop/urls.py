@@ -13,6 +13,7 @@ urlpatterns = [
     path('dashboard/', include('dashboard.urls')),
     path('booking/', include('booking.urls')),
     path('payments/', include('payments.urls')),
+    path('reports/', include('reports.urls')),
 ]
 
 # Serve media files in development
@@ -0,0 +1,122 @@
+# booking/archive.py
+
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from payments.models import ArchivedPayment, Payment
+from .models import Appointment, ArchivedAppointment, WaitlistEntry
+
+# Days a finished appointment stays in the live table; settings.APPOINTMENT_ARCHIVE_DAYS overrides it
+ARCHIVE_AFTER_DAYS = 90
+
+# Appointments moved per transaction
+BATCH_SIZE = 1000
+
+# Completed appointments that still owe money stay live, where staff can chase them
+SETTLED_PAYMENT_STATUSES = ['paid', 'refunded']
+
+APPOINTMENT_FIELDS = [field.attname for field in ArchivedAppointment._meta.concrete_fields if field.name != 'archived_at']
+PAYMENT_FIELDS = [field.attname for field in ArchivedPayment._meta.concrete_fields]
+
+
+def archive_cutoff(days=None):
+    """First date that stays live: appointments before it may be archived."""
+    if days is None:
+        days = getattr(settings, 'APPOINTMENT_ARCHIVE_DAYS', ARCHIVE_AFTER_DAYS)
+    return timezone.localdate() - timedelta(days=days)
+
+
+def archivable(cutoff):
+    """Live appointments before cutoff that are finished with: cancelled, declined, or completed and settled."""
+    settled = Payment.objects.filter(appointment=OuterRef('pk'), payment_status__in=SETTLED_PAYMENT_STATUSES)
+    return Appointment.objects.filter(
+        Q(status__in=['cancelled', 'declined']) | Q(Exists(settled), status='completed'),
+        appointment_date__lt=cutoff
+    )
+
+
+def _delete_rows(model, field_name, values):
+    # A plain DELETE: Model.delete() would collect related rows and send signals for each one
+    quote = connection.ops.quote_name
+    column = model._meta.get_field(field_name).column
+    placeholders = ', '.join(['%s'] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {quote(model._meta.db_table)} WHERE {quote(column)} IN ({placeholders})', values)
+
+
+def archive_batch(cutoff, batch_size=BATCH_SIZE):
+    """
+    Move up to batch_size appointments, with their payments, to the archive in one transaction.
+    
+    Rows are copied with their ids, then removed from the live tables with
+    plain SQL deletes. No delete signals fire, so the daily rollup keeps
+    counting them, calendars get no deletion tombstones and live listeners
+    hear nothing: the appointments still exist, only somewhere else.
+    
+    Only my_appointments, appointment_detail and the reports read the
+    archive. Everything else queries the live table and stops showing
+    archived appointments: the admin and customer calendars and their
+    summaries, the ICS feeds, the dashboard's recent and customer history
+    lists, the staff appointment list and the Django admin.
+    
+    Returns:
+        Tuple (appointments moved, payments moved)
+    """
+    with transaction.atomic():
+        ids = list(
+            archivable(cutoff).select_for_update().order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0, 0
+    
+        ArchivedAppointment.objects.bulk_create([
+            ArchivedAppointment(**row) for row in Appointment.objects.filter(pk__in=ids).values(*APPOINTMENT_FIELDS)
+        ])
+        payments = ArchivedPayment.objects.bulk_create([
+            ArchivedPayment(**row) for row in Payment.objects.filter(appointment_id__in=ids).values(*PAYMENT_FIELDS)
+        ])
+    
+        WaitlistEntry.objects.filter(appointment_id__in=ids).update(appointment=None)
+        _delete_rows(Payment, 'appointment', ids)
+        _delete_rows(Appointment, 'id', ids)
+    
+    return len(ids), len(payments)
+
+
+def archive(cutoff, batch_size=BATCH_SIZE):
+    """
+    Archive everything eligible before cutoff, a batch at a time.
+    
+    Each batch commits on its own, so an interrupted run loses nothing and
+    running again carries on where it stopped.
+    
+    Yields:
+        (appointments moved, payments moved) after each batch
+    """
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved[0]:
+            return
+        yield moved
+
+
+def sum_rows(rows, key_fields):
+    """
+    Add up aggregate rows (dicts) from the live and archive tables that share a key.
+    
+    Returns:
+        List of merged rows, in the order their keys first appeared
+    """
+    merged = {}
+    for row in rows:
+        key = tuple(row[field] for field in key_fields)
+        if key not in merged:
+            merged[key] = dict(row)
+            continue
+        total = merged[key]
+        for field, value in row.items():
+            if field not in key_fields and value is not None:
+                total[field] = value if total[field] is None else total[field] + value
+    return list(merged.values())
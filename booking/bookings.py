@@ -0,0 +1,265 @@
+# booking/bookings.py
+
+import random
+import time
+from datetime import datetime
+from django.db import IntegrityError, OperationalError, transaction
+from django.utils import timezone
+from . import slot_index
+from .models import Appointment, DailyQueueCounter
+from .utils import has_overlap
+from .holds import held_by_others, live_holds, release_holds
+from .intervals import ACTIVE_STATUSES, IntervalIndex, load_interval_indexes, to_minutes
+from .signals import appointments_bulk_changed, offer_to_waitlist
+from barbers.models import Barber, BarberAvailability
+
+# Attempts before giving up when the database reports a lock or serialization conflict
+MAX_ATTEMPTS = 5
+
+# Longest pause between attempts, in seconds
+MAX_BACKOFF = 0.05
+
+SLOT_TAKEN_MESSAGE = 'This barber is already booked at this time. Please choose another time.'
+SLOT_HELD_MESSAGE = 'Another customer is finishing a booking for this time. Please choose another time.'
+
+# Bulk transitions: action -> (new status, statuses it may be applied to).
+# None of them make an appointment active again, so they can't double-book.
+TRANSITIONS = {
+    'approve': ('confirmed', ['pending']),
+    'decline': ('declined', ['pending']),
+    'cancel': ('cancelled', ['pending', 'confirmed']),
+    'complete': ('completed', ['confirmed']),
+}
+
+
+class SlotTakenError(Exception):
+    """Raised when the requested time overlaps a booking that got there first."""
+    
+    def __init__(self, message=SLOT_TAKEN_MESSAGE):
+        super().__init__(message)
+
+
+def book_appointment(appointment):
+    """
+    Save a new or rescheduled appointment without ever double-booking its barber.
+    
+    The overlap check and the write run in one transaction while holding a
+    row lock on the barber, so concurrent bookings for the same barber are
+    serialised. Slots held by other customers are refused, and the
+    customer's own holds are released once the booking is saved. The
+    partial unique constraint on active slots is the last line of defence.
+    A conflict rebuilds the day's slot index, since the slot was offered as
+    free. Transient lock/serialization failures are retried with jittered
+    backoff.
+    
+    Args:
+        appointment: Unsaved or modified Appointment instance
+    
+    Returns:
+        The saved appointment
+    
+    Raises:
+        SlotTakenError: The slot overlaps another pending/confirmed booking
+        IntegrityError: Any other constraint failed
+    """
+    is_new = appointment.pk is None
+    original_slot = appointment._original_slot
+    appointment.snapshot_service()
+    
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                lock_barber(appointment.barber_id)
+                
+                if appointment.status in ['pending', 'confirmed'] and has_overlap(
+                    appointment.barber,
+                    appointment.appointment_date,
+                    appointment.appointment_time,
+                    appointment.duration_minutes,
+                    exclude_pk=appointment.pk
+                ):
+                    raise SlotTakenError()
+                
+                if appointment.status in ['pending', 'confirmed'] and held_by_others(
+                    appointment.barber,
+                    appointment.appointment_date,
+                    appointment.appointment_time,
+                    appointment.duration_minutes,
+                    appointment.customer_id
+                ):
+                    raise SlotTakenError(SLOT_HELD_MESSAGE)
+                
+                if is_new:
+                    # Taken last so the day's counter row is locked for as short a time as possible
+                    appointment.queue_number = DailyQueueCounter.next_number(appointment.appointment_date)
+                
+                appointment.save()
+                release_holds(appointment.customer_id)
+            return appointment
+        except SlotTakenError:
+            # The customer was offered this slot, so the index may have missed a booking
+            slot_index.refresh(appointment.barber_id, appointment.appointment_date)
+            raise
+        except IntegrityError:
+            _reset(appointment, is_new, original_slot)
+            if not _slot_taken(appointment):
+                raise
+            slot_index.refresh(appointment.barber_id, appointment.appointment_date)
+            raise SlotTakenError()
+        except OperationalError:
+            _reset(appointment, is_new, original_slot)
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            time.sleep(random.uniform(0, min(MAX_BACKOFF, 0.002 * 2 ** attempt)))
+
+
+def book_series(series):
+    """
+    Save an appointment series and book every occurrence that is free.
+    
+    All occurrences are checked together against the barber's weekly
+    schedule, existing bookings and other customers' holds, then the free
+    ones are inserted with one bulk_create, all in one transaction under the
+    barber's lock. The query count doesn't depend on the series length.
+    
+    Args:
+        series: Unsaved AppointmentSeries instance
+    
+    Returns:
+        Tuple (appointments: list of created Appointment, conflicts: list of (date, reason))
+    """
+    dates = series.occurrence_dates()
+    today = datetime.now().date()
+    start = to_minutes(series.appointment_time)
+    end = start + series.service.duration_minutes
+    
+    with transaction.atomic():
+        lock_barber(series.barber_id)
+        
+        schedule = {
+            availability.day_of_week: availability
+            for availability in BarberAvailability.objects.filter(barber_id=series.barber_id, is_available=True)
+        }
+        indexes = load_interval_indexes([series.barber_id], dates)
+        holds = {}
+        for day, hold_time, duration in live_holds([series.barber_id], dates, exclude_customer=series.customer_id).values_list('date', 'time', 'duration_minutes'):
+            holds.setdefault(day, []).append((to_minutes(hold_time), to_minutes(hold_time) + duration))
+        
+        free_dates = []
+        conflicts = []
+        for day in dates:
+            availability = schedule.get(day.weekday())
+            if day < today:
+                conflicts.append((day, 'Date is in the past'))
+            elif availability is None:
+                conflicts.append((day, 'Barber not working'))
+            elif start < to_minutes(availability.start_time) or end > to_minutes(availability.end_time):
+                conflicts.append((day, 'Outside working hours'))
+            elif indexes[(series.barber_id, day)].overlaps(start, end):
+                conflicts.append((day, 'Already booked'))
+            elif IntervalIndex(holds.get(day, ())).overlaps(start, end):
+                conflicts.append((day, 'Held by another customer'))
+            else:
+                free_dates.append(day)
+        
+        series.save()
+        if not free_dates:
+            return [], conflicts
+        
+        queue_numbers = DailyQueueCounter.allocate(free_dates)
+        appointments = Appointment.objects.bulk_create([
+            Appointment(
+                customer_id=series.customer_id,
+                barber_id=series.barber_id,
+                service=series.service,
+                appointment_date=day,
+                appointment_time=series.appointment_time,
+                notes=series.notes,
+                queue_number=queue_numbers[day],
+                series=series,
+            )
+            for day in free_dates
+        ])
+        release_holds(series.customer_id)
+        appointments_bulk_changed.send(sender=Appointment, appointment_ids=[appointment.pk for appointment in appointments])
+    
+    return appointments, conflicts
+
+
+def bulk_transition(appointment_ids, action):
+    """
+    Apply a status transition to many appointments with a single UPDATE.
+    
+    Appointments are checked in one query joined to their payment: each
+    must be in a status the action applies to, and completion also needs a
+    paid payment. The rest are updated together, then the slot index and
+    the waitlist are told about any slots that were freed.
+    
+    Args:
+        appointment_ids: Primary keys of the selected appointments
+        action: One of the keys of TRANSITIONS
+    
+    Returns:
+        Tuple of (updated_ids, failures), failures being (appointment_id, reason) pairs
+    """
+    new_status, from_statuses = TRANSITIONS[action]
+    appointment_ids = set(appointment_ids)
+    updated_ids, failures = [], []
+    freed = []
+    
+    with transaction.atomic():
+        rows = Appointment.objects.select_for_update(of=('self',)).filter(pk__in=appointment_ids).values_list(
+            'pk', 'status', 'barber_id', 'appointment_date', 'appointment_time', 'payment__payment_status'
+        )
+        
+        for pk, status, barber_id, appointment_date, appointment_time, payment_status in rows:
+            appointment_ids.discard(pk)
+            if status not in from_statuses:
+                failures.append((pk, f'Cannot {action} a {status} appointment'))
+            elif action == 'complete' and payment_status != 'paid':
+                failures.append((pk, 'Payment has not been recorded'))
+            else:
+                updated_ids.append(pk)
+                if new_status not in ACTIVE_STATUSES:
+                    freed.append((barber_id, appointment_date, appointment_time, None))
+        
+        failures.extend((pk, 'Appointment not found') for pk in sorted(appointment_ids))
+        
+        if updated_ids:
+            # QuerySet.update() skips auto_now, so stamp updated_at ourselves
+            Appointment.objects.filter(pk__in=updated_ids).update(status=new_status, updated_at=timezone.now())
+            appointments_bulk_changed.send(sender=Appointment, appointment_ids=updated_ids)
+            for slot in freed:
+                offer_to_waitlist(slot)
+    
+    return updated_ids, sorted(failures)
+
+
+def lock_barber(barber_id):
+    """Hold the barber's row until commit so their bookings go through one at a time."""
+    list(Barber.objects.select_for_update().filter(pk=barber_id).values_list('pk', flat=True))
+
+
+def _slot_taken(appointment):
+    """
+    Whether another active booking holds the appointment's exact slot.
+    
+    Tells a unique_active_appointment_slot violation apart from any other
+    IntegrityError. SQLite names the columns rather than the constraint in
+    its error, so the slot is checked directly instead.
+    """
+    return Appointment.objects.filter(
+        barber_id=appointment.barber_id,
+        appointment_date=appointment.appointment_date,
+        appointment_time=appointment.appointment_time,
+        status__in=ACTIVE_STATUSES
+    ).exclude(pk=appointment.pk).exists()
+
+
+def _reset(appointment, is_new, original_slot):
+    """Undo in-memory changes left by a rolled-back save so the next attempt starts clean."""
+    if is_new:
+        appointment.pk = None
+        appointment.queue_number = None
+        appointment._state.adding = True
+    appointment._original_slot = original_slot
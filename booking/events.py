@@ -0,0 +1,160 @@
+# booking/events.py
+
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.utils import timezone
+from django.db.models import Count
+from .models import Appointment, DeletedAppointment
+
+STATUS_COLORS = {
+    'pending': '#f39c12',  # Orange
+    'confirmed': '#27ae60', # Green
+    'completed': '#2980b9', # Blue
+    'cancelled': '#c0392b', # Red
+    'declined': '#7f8c8d',  # Grey
+}
+DEFAULT_COLOR = '#34495e'
+
+STATUS_LABELS = dict(Appointment.STATUS_CHOICES)
+
+# Rows fetched from the database, and events encoded, per round trip
+CHUNK_SIZE = 2000
+
+# Changes are re-sent for this long after a sync token is issued, to catch
+# transactions that were still open when it was taken. Clients apply
+# changes by id, so repeats are harmless.
+SYNC_OVERLAP = timedelta(seconds=30)
+
+# How long deletions are remembered; older sync tokens need a full refetch
+TOMBSTONE_DAYS = 7
+
+EVENT_FIELDS = [
+    'id', 'appointment_date', 'appointment_time', 'status',
+    'service__name', 'duration_minutes', 'barber__name',
+]
+
+
+def calendar_events(queryset, include_customer=False):
+    """
+    Yield FullCalendar event dicts for appointments without building model instances.
+    
+    Only the columns an event needs are selected, and rows are read from a
+    server-side cursor in chunks, so memory stays flat however wide the
+    range is.
+    
+    Args:
+        queryset: Appointment queryset, already filtered
+        include_customer: Whether to show the customer's username (staff only)
+    """
+    fields = EVENT_FIELDS + ['customer__username'] if include_customer else EVENT_FIELDS
+    
+    for row in queryset.order_by().values(*fields).iterator(chunk_size=CHUNK_SIZE):
+        start_dt = datetime.combine(row['appointment_date'], row['appointment_time'])
+        end_dt = start_dt + timedelta(minutes=row['duration_minutes'])
+        customer = row['customer__username'] if include_customer else None
+    
+        yield {
+            'id': row['id'],
+            'title': f"{customer}: {row['service__name']}" if include_customer else row['service__name'],
+            'start': start_dt.isoformat(),
+            'end': end_dt.isoformat(),
+            'color': STATUS_COLORS.get(row['status'], DEFAULT_COLOR),
+            'url': f"/booking/appointment/{row['id']}/",
+            'extendedProps': {
+                'status': STATUS_LABELS.get(row['status'], row['status']),
+                'barber': row['barber__name'],
+                'customer': customer
+            }
+        }
+
+
+def day_summaries(queryset, by_barber=False):
+    """
+    Count appointments per day and status with a single GROUP BY.
+    
+    Args:
+        queryset: Appointment queryset, already filtered
+        by_barber: Also break each day down by barber
+    
+    Returns:
+        Dictionary mapping ISO dates to {'total': n, 'statuses': {status: n}},
+        plus 'barbers': {barber name: {status: n}} when by_barber is set
+    """
+    group_by = ['appointment_date', 'status'] + (['barber__name'] if by_barber else [])
+    rows = queryset.order_by().values(*group_by).annotate(count=Count('id'))
+    
+    days = {}
+    for row in rows:
+        day = days.setdefault(row['appointment_date'].isoformat(), {'total': 0, 'statuses': {}})
+        day['total'] += row['count']
+        day['statuses'][row['status']] = day['statuses'].get(row['status'], 0) + row['count']
+        if by_barber:
+            barber = day.setdefault('barbers', {}).setdefault(row['barber__name'], {})
+            barber[row['status']] = barber.get(row['status'], 0) + row['count']
+    return days
+
+
+def stream_json_array(items, chunk_size=CHUNK_SIZE):
+    """
+    Encode an iterable as a JSON array a chunk of items at a time.
+    
+    Each yielded string is a complete slice of the array, so a
+    StreamingHttpResponse can send it as soon as it's ready.
+    """
+    encoder = json.JSONEncoder(separators=(',', ':'))
+    yield '['
+    
+    batch = []
+    first = True
+    for item in items:
+        batch.append(encoder.encode(item))
+        if len(batch) == chunk_size:
+            yield ('' if first else ',') + ','.join(batch)
+            first = False
+            batch = []
+    
+    if batch:
+        yield ('' if first else ',') + ','.join(batch)
+    yield ']'
+
+
+def make_sync_token(moment=None):
+    """Encode a moment (default now) as an opaque sync token."""
+    moment = moment or timezone.now()
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def parse_sync_token(token):
+    """
+    Decode a sync token back into an aware datetime.
+    
+    Raises:
+        ValueError: If the token is malformed
+    """
+    return datetime.fromtimestamp(int(token) / 1_000_000, tz=dt_timezone.utc)
+
+
+def token_expired(since):
+    """Whether deletions older than a sync token may already have been pruned."""
+    return since < timezone.now() - timedelta(days=TOMBSTONE_DAYS)
+
+
+def changed_since(queryset, since):
+    """Narrow an Appointment queryset to rows created or changed after a sync token."""
+    return queryset.filter(updated_at__gt=since - SYNC_OVERLAP)
+
+
+def deleted_since(since, customer=None):
+    """Ids of appointments deleted after a sync token, optionally only one customer's."""
+    tombstones = DeletedAppointment.objects.filter(deleted_at__gt=since - SYNC_OVERLAP)
+    if customer is not None:
+        tombstones = tombstones.filter(customer_id=customer.pk)
+    return list(tombstones.values_list('appointment_id', flat=True))
+
+
+def record_deletion(appointment_id, customer_id, appointment_date):
+    """Leave a tombstone for a deleted appointment and prune expired ones."""
+    DeletedAppointment.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=TOMBSTONE_DAYS)).delete()
+    DeletedAppointment.objects.create(
+        appointment_id=appointment_id, customer_id=customer_id, appointment_date=appointment_date
+    )
@@ -1,7 +1,7 @@
 # booking/forms.py
 
 from django import forms
-from .models import Appointment
+from .models import Appointment, AppointmentSeries, WaitlistEntry
 from barbers.models import Barber
 from services.models import Service
 from datetime import datetime, time, timedelta
@@ -29,25 +29,77 @@ class AppointmentForm(forms.ModelForm):
         cleaned_data = super().clean()
         appointment_date = cleaned_data.get('appointment_date')
         appointment_time = cleaned_data.get('appointment_time')
-        barber = cleaned_data.get('barber')
         
-        if appointment_date and appointment_time and barber:
+        # Overlapping bookings are rejected by booking.bookings.book_appointment(),
+        # inside the same transaction as the insert
+        if appointment_date and appointment_time:
             # Check if date is not in the past
             if appointment_date < datetime.now().date():
                 raise forms.ValidationError('Cannot book appointments in the past.')
-            
-            # Check if barber is already booked
-            existing = Appointment.objects.filter(
-                barber=barber,
-                appointment_date=appointment_date,
-                appointment_time=appointment_time,
-                status__in=['pending', 'confirmed']
-            )
-            
-            if self.instance.pk:
-                existing = existing.exclude(pk=self.instance.pk)
-            
-            if existing.exists():
-                raise forms.ValidationError('This barber is already booked at this time. Please choose another time.')
-        
-        return cleaned_data
\ No newline at end of file
+        
+        return cleaned_data
+
+
+class AppointmentSeriesForm(forms.ModelForm):
+    class Meta:
+        model = AppointmentSeries
+        fields = ['service', 'barber', 'start_date', 'appointment_time', 'interval_weeks', 'occurrences', 'notes']
+        widgets = {
+            'start_date': forms.DateInput(attrs={'type': 'date', 'min': datetime.now().date()}),
+            'appointment_time': forms.TimeInput(attrs={'type': 'time', 'step': 1800}),
+            'notes': forms.Textarea(attrs={'rows': 3, 'placeholder': 'Any special requests or notes...'}),
+        }
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['service'].queryset = Service.objects.filter(is_active=True)
+        self.fields['barber'].queryset = Barber.objects.filter(is_active=True)
+        
+        # Add CSS classes
+        for field in self.fields:
+            self.fields[field].widget.attrs['class'] = 'form-control'
+    
+    def clean_start_date(self):
+        start_date = self.cleaned_data['start_date']
+        if start_date < datetime.now().date():
+            raise forms.ValidationError('Cannot book appointments in the past.')
+        return start_date
+
+
+class WaitlistForm(forms.ModelForm):
+    class Meta:
+        model = WaitlistEntry
+        fields = ['service', 'barber', 'date', 'window_start', 'window_end']
+        widgets = {
+            'date': forms.DateInput(attrs={'type': 'date', 'min': datetime.now().date()}),
+            'window_start': forms.TimeInput(attrs={'type': 'time', 'step': 1800}),
+            'window_end': forms.TimeInput(attrs={'type': 'time', 'step': 1800}),
+        }
+        labels = {
+            'window_start': 'Earliest time',
+            'window_end': 'Latest finish time',
+        }
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['service'].queryset = Service.objects.filter(is_active=True)
+        self.fields['barber'].queryset = Barber.objects.filter(is_active=True)
+        self.fields['barber'].empty_label = 'Any barber'
+        
+        # Add CSS classes
+        for field in self.fields:
+            self.fields[field].widget.attrs['class'] = 'form-control'
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        date = cleaned_data.get('date')
+        window_start = cleaned_data.get('window_start')
+        window_end = cleaned_data.get('window_end')
+        
+        if date and date < datetime.now().date():
+            raise forms.ValidationError('Cannot join the waitlist for a past date.')
+        
+        if window_start and window_end and window_end <= window_start:
+            raise forms.ValidationError('The latest finish time must be after the earliest time.')
+        
+        return cleaned_data
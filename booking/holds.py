@@ -0,0 +1,96 @@
+# booking/holds.py
+
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import SlotHold
+from .intervals import IntervalIndex, load_interval_index, to_minutes
+from . import slot_index
+
+# How long a selected slot stays reserved for the customer who picked it
+HOLD_MINUTES = 5
+
+
+def sweep_expired():
+    """Delete every expired hold. Cheap thanks to the index on expires_at."""
+    SlotHold.objects.filter(expires_at__lte=timezone.now()).delete()
+
+
+def live_holds(barber_ids, dates, exclude_customer=None):
+    """Return unexpired holds for the given barbers and dates as a queryset."""
+    holds = SlotHold.objects.filter(
+        barber_id__in=barber_ids,
+        date__in=dates,
+        expires_at__gt=timezone.now()
+    )
+    if exclude_customer is not None:
+        holds = holds.exclude(customer=exclude_customer)
+    return holds
+
+
+def held_masks(barber_ids, dates, exclude_customer=None):
+    """
+    Get a bitmask of held cells for every barber/date pair in one query.
+    
+    Returns:
+        Dictionary mapping (barber_id, date) to a mask; pairs without holds are omitted
+    """
+    masks = {}
+    rows = live_holds(barber_ids, dates, exclude_customer).values_list('barber_id', 'date', 'time', 'duration_minutes')
+    for barber_id, day, start, duration in rows:
+        key = (barber_id, day)
+        masks[key] = masks.get(key, 0) | slot_index.appointment_mask(start, duration)
+    return masks
+
+
+def held_by_others(barber, date, time_slot, duration_minutes, customer):
+    """Check whether [time_slot, time_slot + duration) overlaps someone else's live hold."""
+    index = IntervalIndex(
+        (to_minutes(start), to_minutes(start) + duration)
+        for start, duration in live_holds([barber.pk], [date], exclude_customer=customer).values_list('time', 'duration_minutes')
+    )
+    start = to_minutes(time_slot)
+    return index.overlaps(start, start + duration_minutes)
+
+
+def place_hold(customer, barber, date, time_slot, duration_minutes):
+    """
+    Reserve a slot for a customer for HOLD_MINUTES.
+    
+    A customer holds at most one slot at a time; picking another slot moves
+    the hold. Called inside the same barber lock as booking, so a hold can't
+    be placed over a booking or another hold that is being written.
+    
+    Returns:
+        The SlotHold, or None if the slot is booked or held by someone else
+    """
+    from .bookings import lock_barber
+    
+    sweep_expired()
+    start = to_minutes(time_slot)
+    
+    try:
+        with transaction.atomic():
+            lock_barber(barber.pk)
+            SlotHold.objects.filter(customer=customer).delete()
+            
+            if held_by_others(barber, date, time_slot, duration_minutes, customer):
+                return None
+            if load_interval_index(barber.pk, date).overlaps(start, start + duration_minutes):
+                return None
+            
+            return SlotHold.objects.create(
+                barber=barber,
+                customer=customer,
+                date=date,
+                time=time_slot,
+                duration_minutes=duration_minutes,
+                expires_at=timezone.now() + timedelta(minutes=HOLD_MINUTES)
+            )
+    except IntegrityError:
+        return None
+
+
+def release_holds(customer):
+    """Drop every hold a customer has, e.g. once their booking is saved."""
+    SlotHold.objects.filter(customer=customer).delete()
@@ -0,0 +1,148 @@
+# booking/ics.py
+
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from django.core import signing
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from .events import CHUNK_SIZE
+from .models import DeletedAppointment
+
+# Appointments older than this are left out of feeds
+FEED_PAST_DAYS = 30
+
+# Cancelled and declined appointments drop out of the feed
+FEED_STATUSES = ['pending', 'confirmed', 'completed']
+
+ICS_STATUS = {
+    'pending': 'TENTATIVE',
+    'confirmed': 'CONFIRMED',
+    'completed': 'CONFIRMED',
+}
+
+FEED_FIELDS = [
+    'id', 'appointment_date', 'appointment_time', 'status', 'notes', 'queue_number', 'updated_at',
+    'service__name', 'duration_minutes', 'barber__name', 'customer__username',
+]
+
+_SIGNER_SALT = 'booking.ics.feed'
+
+
+def feed_token(scope):
+    """Secret token for a feed URL; scope is 'shop' or a barber id."""
+    return signing.Signer(salt=_SIGNER_SALT).signature(str(scope))
+
+
+def check_feed_token(scope, token):
+    """Whether a token from a feed URL belongs to that feed."""
+    return signing.constant_time_compare(feed_token(scope), token)
+
+
+def _feed_start():
+    """First date a feed shows."""
+    return timezone.localdate() - timedelta(days=FEED_PAST_DAYS)
+
+
+def feed_appointments(queryset):
+    """Limit an Appointment queryset to what a feed shows."""
+    return queryset.filter(appointment_date__gte=_feed_start(), status__in=FEED_STATUSES)
+
+
+def feed_state(queryset):
+    """
+    (etag, last_modified) for a feed, given the appointments it is cut from.
+    
+    Last-Modified must move whenever an event could enter or leave the
+    feed, so it is the latest of: any change to a row in the feed's date
+    window whatever its status (cancellations and declines), any deletion
+    of an appointment in the window, and local midnight, when the window
+    last moved and the oldest events dropped out. Tombstones don't record
+    the barber, so a deletion touches every feed.
+    
+    The ETag pairs the visible row count with the latest change, which
+    covers the same cases without the daily reset.
+    """
+    start = _feed_start()
+    state = queryset.filter(appointment_date__gte=start).aggregate(
+        changed=Max('updated_at'), count=Count('id', filter=Q(status__in=FEED_STATUSES))
+    )
+    deleted = DeletedAppointment.objects.filter(appointment_date__gte=start).aggregate(
+        latest=Max('deleted_at')
+    )['latest']
+    changed = max(filter(None, [state['changed'], deleted]), default=None)
+    window_moved = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+    
+    stamp = changed.timestamp() if changed else 0
+    return f'"{state["count"]}-{stamp:.6f}"', max(filter(None, [changed, window_moved]))
+
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def _fold(line):
+    """Fold a content line at 75 octets as RFC 5545 requires."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    
+    parts = []
+    while len(encoded) > 75:
+        cut = 75 if not parts else 74
+        # Don't split a multi-byte character
+        while cut and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+    parts.append(encoded.decode('utf-8'))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _utc(moment):
+    return moment.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def ics_lines(queryset, calendar_name, host):
+    """
+    Yield an iCalendar document for appointments, one chunk of events at a time.
+    
+    Rows are read in date order through a column projection, so the feed
+    streams in constant memory however long the schedule is.
+    """
+    yield (
+        'BEGIN:VCALENDAR\r\n'
+        'VERSION:2.0\r\n'
+        'PRODID:-//Barbershop//Appointments//EN\r\n'
+        'CALSCALE:GREGORIAN\r\n'
+        'METHOD:PUBLISH\r\n'
+        + _fold(f'X-WR-CALNAME:{_escape(calendar_name)}')
+    )
+    
+    local_tz = timezone.get_current_timezone()
+    rows = queryset.order_by('appointment_date', 'appointment_time', 'id').values(*FEED_FIELDS)
+    
+    chunk = []
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        start = timezone.make_aware(datetime.combine(row['appointment_date'], row['appointment_time']), local_tz)
+        end = start + timedelta(minutes=row['duration_minutes'])
+        description = f"Queue #{row['queue_number']}" if row['queue_number'] else ''
+        if row['notes']:
+            description = f"{description}\n{row['notes']}" if description else row['notes']
+    
+        chunk.append(
+            'BEGIN:VEVENT\r\n'
+            + _fold(f"UID:appointment-{row['id']}@{host}")
+            + f"DTSTAMP:{_utc(row['updated_at'])}\r\n"
+            + f"LAST-MODIFIED:{_utc(row['updated_at'])}\r\n"
+            + f'DTSTART:{_utc(start)}\r\n'
+            + f'DTEND:{_utc(end)}\r\n'
+            + _fold(f"SUMMARY:{_escape(row['customer__username'])}: {_escape(row['service__name'])}")
+            + _fold(f"LOCATION:{_escape(row['barber__name'])}")
+            + (_fold(f'DESCRIPTION:{_escape(description)}') if description else '')
+            + f"STATUS:{ICS_STATUS.get(row['status'], 'CONFIRMED')}\r\n"
+            'END:VEVENT\r\n'
+        )
+        if len(chunk) == CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    
+    yield ''.join(chunk) + 'END:VCALENDAR\r\n'
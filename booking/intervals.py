@@ -0,0 +1,80 @@
+# booking/intervals.py
+
+from bisect import bisect_left
+from itertools import accumulate
+from .models import Appointment
+
+ACTIVE_STATUSES = ['pending', 'confirmed']
+
+
+def to_minutes(time_obj):
+    """Convert a time object to minutes since midnight."""
+    return time_obj.hour * 60 + time_obj.minute
+
+
+class IntervalIndex:
+    """
+    Booked [start, end) intervals for one barber on one day, in minutes since midnight.
+    
+    Intervals are kept sorted by start alongside a running maximum of their
+    ends, so an overlap test is a single bisect: the only candidates are the
+    intervals starting before the query ends, and one of them overlaps iff
+    the furthest-reaching of them ends after the query starts. Overlapping
+    input intervals (e.g. legacy double bookings) are handled correctly.
+    """
+    
+    def __init__(self, intervals=()):
+        intervals = sorted(intervals)
+        self.starts = [start for start, end in intervals]
+        self.max_ends = list(accumulate((end for start, end in intervals), max))
+    
+    def __len__(self):
+        return len(self.starts)
+    
+    def overlaps(self, start, end):
+        """Check whether [start, end) overlaps any booked interval. O(log n)."""
+        i = bisect_left(self.starts, end)
+        return i > 0 and self.max_ends[i - 1] > start
+    
+    def fits(self, start, duration, opens, closes):
+        """Check whether a booking of `duration` minutes at `start` fits inside [opens, closes)."""
+        end = start + duration
+        return opens <= start and end <= closes and not self.overlaps(start, end)
+
+
+def load_interval_indexes(barber_ids, dates, exclude_pk=None):
+    """
+    Build an IntervalIndex for every barber/date pair with a single query.
+    
+    Args:
+        barber_ids: List of barber ids
+        dates: List of date objects
+        exclude_pk: Appointment id to leave out (the one being rescheduled)
+    
+    Returns:
+        Dictionary mapping (barber_id, date) to IntervalIndex
+    """
+    appointments = Appointment.objects.filter(
+        barber_id__in=barber_ids,
+        appointment_date__in=dates,
+        status__in=ACTIVE_STATUSES
+    )
+    if exclude_pk:
+        appointments = appointments.exclude(pk=exclude_pk)
+    
+    intervals = {}
+    rows = appointments.values_list('barber_id', 'appointment_date', 'appointment_time', 'duration_minutes')
+    for barber_id, appointment_date, appointment_time, duration in rows:
+        start = to_minutes(appointment_time)
+        intervals.setdefault((barber_id, appointment_date), []).append((start, start + duration))
+    
+    return {
+        (barber_id, day): IntervalIndex(intervals.get((barber_id, day), ()))
+        for barber_id in barber_ids
+        for day in dates
+    }
+
+
+def load_interval_index(barber_id, date, exclude_pk=None):
+    """Build the IntervalIndex for one barber on one day."""
+    return load_interval_indexes([barber_id], [date], exclude_pk)[(barber_id, date)]
@@ -0,0 +1,263 @@
+# booking/live.py
+
+import asyncio
+import contextvars
+import json
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connections, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from .models import LiveEvent
+
+# Seconds between each worker's checks for new events
+POLL_INTERVAL = 1.0
+
+# Seconds of silence before a comment line keeps proxies from closing a stream
+KEEPALIVE_SECONDS = 15
+
+# Seconds a stream stays open before the browser reconnects, which lets
+# long-lived connections rebalance across workers
+STREAM_SECONDS = 300
+
+# Milliseconds browsers wait before reconnecting. Without ASGI a response
+# can't be held open, so the stream degrades to polling at the slower rate.
+RETRY_MS = 3000
+FALLBACK_RETRY_MS = 15000
+
+# Events read per poll, and the most a reconnecting browser can catch up on
+BATCH_SIZE = 500
+
+# Poll batches a slow stream may fall behind by before it is dropped
+MAX_PENDING = 100
+
+# How long events are kept for reconnecting browsers
+RETENTION = timedelta(hours=1)
+
+# How long after it is written an event is read again on every poll. Ids
+# are allocated before commit, so a row can become visible after one with
+# a higher id was already read; readers skip the ids they have handled.
+POLL_OVERLAP = timedelta(seconds=5)
+
+EVENT_FIELDS = ['id', 'kind', 'appointment_id', 'customer_id', 'barber_id', 'payload', 'created_at']
+
+
+def publish(kind, appointment_id, customer_id, barber_id, **payload):
+    """Record an event for live listeners once the current transaction commits."""
+    publish_many([LiveEvent(
+        kind=kind, appointment_id=appointment_id, customer_id=customer_id, barber_id=barber_id, payload=payload
+    )])
+
+
+def publish_many(events):
+    """Record several unsaved LiveEvent rows in one insert once the transaction commits."""
+    if not events:
+        return
+    
+    def write():
+        LiveEvent.objects.filter(created_at__lt=timezone.now() - RETENTION).delete()
+        LiveEvent.objects.bulk_create(events)
+    
+    transaction.on_commit(write)
+
+
+def latest_id():
+    return LiveEvent.objects.aggregate(latest=Max('id'))['latest'] or 0
+
+
+def events_after(last_id, limit=BATCH_SIZE):
+    """
+    Up to limit events newer than last_id, oldest first, as dicts.
+    
+    Events written within POLL_OVERLAP come back whatever their id, so one
+    that committed late isn't lost behind a higher id already read.
+    """
+    recent = Q(created_at__gte=timezone.now() - POLL_OVERLAP)
+    return list(LiveEvent.objects.filter(Q(id__gt=last_id) | recent).order_by('id').values(*EVENT_FIELDS)[:limit])
+
+
+def recent_ids():
+    """Ids of the events still inside POLL_OVERLAP, mapped to when they were written."""
+    since = timezone.now() - POLL_OVERLAP
+    return dict(LiveEvent.objects.filter(created_at__gte=since).values_list('id', 'created_at'))
+
+
+def _poll_events(last_id):
+    # The poller lives outside any request, so nothing else retires its dead connections
+    close_old_connections()
+    return events_after(last_id)
+
+
+def _release_connections():
+    # Nothing after the catch-up touches the database; don't hold a connection per idle stream
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+def audience(user):
+    """
+    Who a stream is for: (is_staff, user_id, barber_id or None).
+    
+    Staff see every event, everyone else only events for their own
+    appointments or, for barbers, appointments booked with them.
+    """
+    from barbers.models import Barber
+    
+    barber_id = None if user.is_staff else Barber.objects.filter(user=user).values_list('pk', flat=True).first()
+    return user.is_staff, user.pk, barber_id
+
+
+def visible_to(event, listener):
+    is_staff, user_id, barber_id = listener
+    return is_staff or event['customer_id'] == user_id or (barber_id is not None and event['barber_id'] == barber_id)
+
+
+def format_event(event):
+    """One event in text/event-stream framing."""
+    data = dict(event['payload'], kind=event['kind'], appointment_id=event['appointment_id'])
+    return f"id: {event['id']}\nevent: appointment\ndata: {json.dumps(data)}\n\n"
+
+
+class Broadcaster:
+    """
+    Per-process fan-out from the LiveEvent table to open streams.
+    
+    A single polling task serves every stream in the worker, so idle
+    connections cost a queue each and no database work of their own. The
+    task starts with the first subscriber and stops after the last leaves.
+    
+    Each poll re-reads the last POLL_OVERLAP of events; ids delivered in
+    that window are remembered in recent so each event goes out once.
+    """
+    
+    def __init__(self):
+        self.subscribers = set()
+        self.last_id = 0
+        self.recent = {}
+        self._task = None
+        self._loop = None
+        self._lock = None
+    
+    async def subscribe(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # A new event loop (tests, or a reloaded server): nothing from the old one survives
+            self.subscribers, self._task, self._loop, self._lock = set(), None, loop, asyncio.Lock()
+    
+        queue = asyncio.Queue(maxsize=MAX_PENDING)
+        async with self._lock:
+            self.subscribers.add(queue)
+            if self._task is None:
+                self.last_id = await sync_to_async(latest_id)()
+                self.recent = await sync_to_async(recent_ids)()
+                # In a fresh context, so its queries don't run on (and die with) this request's thread
+                self._task = loop.create_task(self._poll(), context=contextvars.Context())
+        return queue
+    
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+    
+    async def _poll(self):
+        try:
+            while self.subscribers:
+                await asyncio.sleep(POLL_INTERVAL)
+                events = await sync_to_async(_poll_events)(self.last_id)
+                self.deliver(self.fresh(events))
+        finally:
+            self._task = None
+    
+    def fresh(self, events):
+        """The polled events not yet delivered, advancing last_id and recent past them."""
+        horizon = timezone.now() - POLL_OVERLAP
+        self.recent = {pk: created for pk, created in self.recent.items() if created >= horizon}
+        events = [event for event in events if event['id'] not in self.recent]
+        for event in events:
+            self.recent[event['id']] = event['created_at']
+            self.last_id = max(self.last_id, event['id'])
+        return events
+    
+    def deliver(self, events):
+        if not events:
+            return
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(events)
+            except asyncio.QueueFull:
+                # Too far behind; its stream ends and the browser catches up on reconnect
+                self.subscribers.discard(queue)
+
+
+broadcaster = Broadcaster()
+
+
+async def stream(listener, last_event_id=None):
+    """
+    Yield a text/event-stream for one listener until STREAM_SECONDS pass or it disconnects.
+    
+    Subscribes before catching up from the table, so an event committed in
+    between arrives by one route or the other; ids the catch-up sent are
+    skipped. A late event can arrive after a higher id, so the id the
+    browser resumes from may replay a few events; clients apply them by
+    appointment, so repeats are harmless.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + STREAM_SECONDS
+    start = last_event_id if last_event_id is not None else await sync_to_async(latest_id)()
+    queue = await broadcaster.subscribe()
+    
+    try:
+        yield f'retry: {RETRY_MS}\nid: {start}\n\n'
+    
+        missed = await sync_to_async(events_after)(start) if last_event_id is not None else []
+        if len(missed) == BATCH_SIZE:
+            # Too much to replay; the page should reload its data instead
+            yield f"id: {missed[-1]['id']}\nevent: reset\ndata: {{}}\n\n"
+            missed = []
+        sent = {event['id'] for event in missed}
+        chunk = ''.join(format_event(event) for event in missed if visible_to(event, listener))
+        if chunk:
+            yield chunk
+        
+        await sync_to_async(_release_connections)()
+    
+        while queue in broadcaster.subscribers or not queue.empty():
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                events = await asyncio.wait_for(queue.get(), timeout=min(KEEPALIVE_SECONDS, remaining))
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+    
+            chunk = ''.join(
+                format_event(event) for event in events if event['id'] not in sent and visible_to(event, listener)
+            )
+            if chunk:
+                yield chunk
+    finally:
+        broadcaster.unsubscribe(queue)
+
+
+def catch_up(listener, last_event_id):
+    """
+    The whole response for a server that can't hold a stream open (WSGI).
+    
+    Sends what happened since last_event_id and asks the browser to come
+    back after FALLBACK_RETRY_MS, which turns the stream into cheap polling.
+    Events inside POLL_OVERLAP are sent again on the next poll, so a late
+    commit isn't missed; as with streams, repeats are harmless.
+    """
+    if last_event_id is None:
+        return f'retry: {FALLBACK_RETRY_MS}\nid: {latest_id()}\n\n'
+    
+    events = events_after(last_event_id)
+    if len(events) == BATCH_SIZE:
+        return f"retry: {FALLBACK_RETRY_MS}\nid: {events[-1]['id']}\nevent: reset\ndata: {{}}\n\n"
+    
+    last_id = max([last_event_id] + [event['id'] for event in events])
+    return (
+        f'retry: {FALLBACK_RETRY_MS}\nid: {last_id}\n\n'
+        + ''.join(format_event(event) for event in events if visible_to(event, listener))
+    )
@@ -0,0 +1,32 @@
+# booking/management/commands/archive_appointments.py
+
+from django.core.management.base import BaseCommand, CommandError
+from booking.archive import archive, archive_cutoff, BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        'Move finished appointments older than --days, with their payments, to the archive tables. '
+        'Safe to interrupt and re-run: each batch commits on its own.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Archive appointments older than this many days (default: settings.APPOINTMENT_ARCHIVE_DAYS or 90)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Appointments moved per transaction')
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 0:
+            raise CommandError('--days must not be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        
+        cutoff = archive_cutoff(options['days'])
+        appointments = payments = 0
+        for moved_appointments, moved_payments in archive(cutoff, batch_size=options['batch_size']):
+            appointments += moved_appointments
+            payments += moved_payments
+            self.stdout.write(f"Archived {moved_appointments} appointments, {moved_payments} payments")
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Archived {appointments} appointments and {payments} payments from before {cutoff}"
+        ))
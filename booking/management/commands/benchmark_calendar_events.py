@@ -0,0 +1,113 @@
+# booking/management/commands/benchmark_calendar_events.py
+
+import json
+import time as timer
+import tracemalloc
+from datetime import date, datetime, time, timedelta
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from barbers.models import Barber
+from services.models import Service
+from booking.models import Appointment
+from booking.events import calendar_events, stream_json_array
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare the old and streaming calendar events pipelines on seeded appointments (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--appointments', type=int, default=100000)
+        parser.add_argument('--barbers', type=int, default=10)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                start_date, end_date = self.seed(options['appointments'], options['barbers'])
+                queryset = Appointment.objects.filter(appointment_date__range=[start_date, end_date])
+                
+                self.stdout.write(f"{queryset.count()} appointments from {start_date} to {end_date}\n")
+                self.report('Model instances + JsonResponse', lambda: self.legacy(queryset))
+                self.report('Projection + streamed JSON', lambda: self.streamed(queryset))
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, count, barber_count):
+        """Bulk insert appointments for a few barbers across consecutive days."""
+        suffix = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        customer = User.objects.create(username=f'benchmark_{suffix}')
+        barbers = [
+            Barber.objects.create(user=User.objects.create(username=f'benchmark_{suffix}_{i}'), name=f'Benchmark Barber {i}')
+            for i in range(barber_count)
+        ]
+        service = Service.objects.create(name='Benchmark Service', price=500, duration_minutes=30)
+        
+        slots = [time(hour, minute) for hour in range(9, 17) for minute in (0, 30)]
+        start_date = date(2090, 1, 1)
+        per_day = barber_count * len(slots)
+        
+        batch = []
+        for n in range(count):
+            day, slot = divmod(n, per_day)
+            barber_index, slot_index = divmod(slot, len(slots))
+            batch.append(Appointment(
+                customer=customer, barber=barbers[barber_index], service=service,
+                appointment_date=start_date + timedelta(days=day), appointment_time=slots[slot_index],
+                status='completed', queue_number=slot + 1
+            ))
+            if len(batch) == 5000:
+                Appointment.objects.bulk_create(batch)
+                batch = []
+        Appointment.objects.bulk_create(batch)
+        
+        return start_date, start_date + timedelta(days=(count - 1) // per_day)
+
+    def legacy(self, queryset):
+        """The events loop as it was before booking.events, for comparison."""
+        events = []
+        for appt in queryset.select_related('customer', 'service', 'barber'):
+            start_dt = datetime.combine(appt.appointment_date, appt.appointment_time)
+            end_dt = start_dt + timedelta(minutes=appt.service.duration_minutes)
+            status_colors = {
+                'pending': '#f39c12',
+                'confirmed': '#27ae60',
+                'completed': '#2980b9',
+                'cancelled': '#c0392b',
+                'declined': '#7f8c8d',
+            }
+            events.append({
+                'id': appt.id,
+                'title': f"{appt.customer.username}: {appt.service.name}",
+                'start': start_dt.isoformat(),
+                'end': end_dt.isoformat(),
+                'color': status_colors.get(appt.status, '#34495e'),
+                'url': f'/booking/appointment/{appt.id}/',
+                'extendedProps': {
+                    'status': appt.get_status_display(),
+                    'barber': appt.barber.name,
+                    'customer': appt.customer.username
+                }
+            })
+        return len(json.dumps(events, cls=DjangoJSONEncoder).encode())
+
+    def streamed(self, queryset):
+        return sum(len(chunk.encode()) for chunk in stream_json_array(calendar_events(queryset, include_customer=True)))
+
+    def report(self, label, run):
+        # Time an untraced run; tracemalloc slows allocation-heavy code a lot
+        started = timer.perf_counter()
+        size = run()
+        elapsed = timer.perf_counter() - started
+        
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        
+        self.stdout.write(f"{label:32} {elapsed:7.2f}s  peak {peak / 1024 / 1024:7.1f} MiB  body {size / 1024 / 1024:6.1f} MiB")
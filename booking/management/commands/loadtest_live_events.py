@@ -0,0 +1,132 @@
+# booking/management/commands/loadtest_live_events.py
+
+import asyncio
+import statistics
+import time as timer
+from importlib import import_module
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from booking.models import LiveEvent
+
+
+def _rss_kib(pid):
+    """Resident memory of a local process in KiB, or None if it can't be read."""
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Hold many idle connections open on the live events stream of a running ASGI server, '
+        'then publish one event and time its delivery to all of them. Start the server first, e.g. '
+        '"uvicorn barbershop.asgi:application --workers 1", against the same database.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--connections', type=int, default=500)
+        parser.add_argument('--idle', type=float, default=20.0, help='Seconds to hold the connections idle')
+        parser.add_argument('--ramp', type=int, default=50, help='Connections opened at a time')
+        parser.add_argument('--username', help='Staff user to connect as (default: the first staff user)')
+        parser.add_argument('--pid', type=int, help='Server process id, to report its memory')
+    
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_staff=True)
+        user = users.get(username=options['username']) if options['username'] else users.order_by('pk').first()
+        if user is None:
+            raise CommandError('No staff user to connect as; create one or pass --username.')
+    
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+    
+        try:
+            asyncio.run(self.run(options, session.session_key, user))
+        finally:
+            session.delete()
+    
+    async def run(self, options, session_key, user):
+        url = urlsplit(options['url'])
+        host, port = url.hostname, url.port or 80
+        path = reverse('booking:live_events')
+        request = (
+            f'GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\nAccept: text/event-stream\r\n'
+            f'Cookie: {settings.SESSION_COOKIE_NAME}={session_key}\r\n\r\n'
+        ).encode()
+    
+        rss_before = _rss_kib(options['pid']) if options['pid'] else None
+    
+        async def connect():
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request)
+            await writer.drain()
+            head = await reader.readuntil(b'\r\n\r\n')
+            if b' 200 ' not in head.split(b'\r\n', 1)[0] or b'text/event-stream' not in head:
+                writer.close()
+                raise ConnectionError(head.split(b'\r\n', 1)[0].decode())
+            return reader, writer
+    
+        started = timer.perf_counter()
+        results = []
+        for opened in range(0, options['connections'], options['ramp']):
+            wave = min(options['ramp'], options['connections'] - opened)
+            results += await asyncio.gather(*(connect() for _ in range(wave)), return_exceptions=True)
+        streams = [result for result in results if not isinstance(result, BaseException)]
+        failures = [result for result in results if isinstance(result, BaseException)]
+        self.stdout.write(f'{len(streams)} of {options["connections"]} streams open in {timer.perf_counter() - started:.2f}s')
+        for failure in failures[:3]:
+            self.stdout.write(f'  failed: {failure!r}')
+        if not streams:
+            return
+    
+        await asyncio.sleep(options['idle'])
+        rss_idle = _rss_kib(options['pid']) if options['pid'] else None
+    
+        # Written straight to the table, as a committed booking change would be
+        event = await asyncio.to_thread(
+            LiveEvent.objects.create, kind='status', appointment_id=0, customer_id=user.pk, barber_id=0,
+            payload={'status': 'loadtest', 'date': '', 'time': ''}
+        )
+        published = timer.perf_counter()
+        marker = f'id: {event.pk}\nevent: appointment'.encode()
+    
+        async def receive(reader):
+            buffer = b''
+            while marker not in buffer:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    raise ConnectionError('stream closed')
+                buffer = buffer[-len(marker):] + chunk
+            return timer.perf_counter() - published
+    
+        latencies = await asyncio.gather(
+            *(asyncio.wait_for(receive(reader), timeout=30) for reader, _ in streams), return_exceptions=True
+        )
+        delivered = sorted(latency for latency in latencies if isinstance(latency, float))
+    
+        for _, writer in streams:
+            writer.close()
+        await asyncio.to_thread(event.delete)
+    
+        self.stdout.write(f'Event delivered to {len(delivered)} of {len(streams)} streams')
+        if delivered:
+            self.stdout.write(
+                f'Latency: median {statistics.median(delivered) * 1000:.0f}ms, '
+                f'p95 {delivered[int(len(delivered) * 0.95) - 1] * 1000:.0f}ms, max {delivered[-1] * 1000:.0f}ms'
+            )
+        if rss_before and rss_idle:
+            self.stdout.write(
+                f'Server memory: {rss_before / 1024:.1f} MiB before, {rss_idle / 1024:.1f} MiB with the streams idle '
+                f'(at most {(rss_idle - rss_before) / len(streams):.1f} KiB per stream)'
+            )
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbers', '0001_initial'),
+        ('booking', '0003_alter_appointment_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotBitmap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('working_mask', models.BigIntegerField(default=0)),
+                ('booked_mask', models.BigIntegerField(default=0)),
+                ('barber', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_bitmaps', to='barbers.barber')),
+            ],
+            options={
+                'verbose_name': 'Slot Bitmap',
+                'verbose_name_plural': 'Slot Bitmaps',
+                'unique_together': {('barber', 'date')},
+            },
+        ),
+    ]
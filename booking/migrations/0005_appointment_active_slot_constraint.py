@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbers', '0001_initial'),
+        ('booking', '0004_slotbitmap'),
+        ('services', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='appointment',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'confirmed'])), fields=('barber', 'appointment_date', 'appointment_time'), name='unique_active_appointment_slot', violation_error_message='This barber is already booked at this time. Please choose another time.'),
+        ),
+    ]
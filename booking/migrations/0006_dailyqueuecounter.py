@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0005_appointment_active_slot_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyQueueCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('last_number', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Daily Queue Counter',
+                'verbose_name_plural': 'Daily Queue Counters',
+            },
+        ),
+    ]
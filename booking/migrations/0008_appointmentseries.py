@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:30
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbers', '0001_initial'),
+        ('booking', '0007_slothold'),
+        ('services', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('appointment_time', models.TimeField()),
+                ('interval_weeks', models.PositiveSmallIntegerField(default=2, help_text='Weeks between appointments', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(8)])),
+                ('occurrences', models.PositiveSmallIntegerField(default=6, help_text='Number of appointments in the series', validators=[django.core.validators.MinValueValidator(2), django.core.validators.MaxValueValidator(26)])),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('barber', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointment_series', to='barbers.barber')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointment_series', to=settings.AUTH_USER_MODEL)),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointment_series', to='services.service')),
+            ],
+            options={
+                'verbose_name': 'Appointment Series',
+                'verbose_name_plural': 'Appointment Series',
+            },
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='appointments', to='booking.appointmentseries'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbers', '0001_initial'),
+        ('booking', '0009_waitlistentry'),
+        ('services', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedAppointment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('appointment_id', models.PositiveIntegerField()),
+                ('customer_id', models.PositiveIntegerField()),
+                ('appointment_date', models.DateField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Deleted Appointment',
+                'verbose_name_plural': 'Deleted Appointments',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['updated_at'], name='booking_app_updated_95b6ce_idx'),
+        ),
+    ]
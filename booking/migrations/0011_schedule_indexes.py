@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbers', '0001_initial'),
+        ('booking', '0010_calendar_sync'),
+        ('services', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['barber', 'appointment_date', 'appointment_time'], name='booking_app_barber__444cf5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['appointment_date', 'appointment_time'], name='booking_app_appoint_c82d03_idx'),
+        ),
+    ]
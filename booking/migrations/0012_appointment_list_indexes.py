@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbers', '0001_initial'),
+        ('booking', '0011_schedule_indexes'),
+        ('services', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='appointment',
+            name='booking_app_barber__444cf5_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='appointment',
+            name='booking_app_appoint_c82d03_idx',
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['barber', 'appointment_date', 'appointment_time', 'id'], name='booking_app_barber__0b7788_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['appointment_date', 'appointment_time', 'id'], name='booking_app_appoint_c63914_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'appointment_date', 'appointment_time', 'id'], name='booking_app_status_b049cc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['service', 'appointment_date', 'appointment_time', 'id'], name='booking_app_service_6ad19b_idx'),
+        ),
+    ]
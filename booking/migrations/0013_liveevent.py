@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0012_appointment_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LiveEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('created', 'Created'), ('status', 'Status Changed'), ('payment', 'Payment Changed')], max_length=20)),
+                ('appointment_id', models.PositiveIntegerField()),
+                ('customer_id', models.PositiveIntegerField()),
+                ('barber_id', models.PositiveIntegerField()),
+                ('payload', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Live Event',
+                'verbose_name_plural': 'Live Events',
+            },
+        ),
+    ]
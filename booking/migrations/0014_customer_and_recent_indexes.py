@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbers', '0001_initial'),
+        ('booking', '0013_liveevent'),
+        ('services', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['customer', 'appointment_date', 'appointment_time'], name='booking_app_custome_b4983a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['created_at'], name='booking_app_created_b066db_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    """
+    Copy each service's current duration and price onto its appointments.
+
+    One UPDATE per service, then one per distinct (start time, duration)
+    pair for end_time, so the cost doesn't grow with the number of rows.
+    """
+    Appointment = apps.get_model('booking', 'Appointment')
+    Service = apps.get_model('services', 'Service')
+
+    for service_id, duration, price in Service.objects.values_list('pk', 'duration_minutes', 'price'):
+        Appointment.objects.filter(service_id=service_id).update(duration_minutes=duration, price=price)
+
+    pairs = Appointment.objects.order_by().values_list('appointment_time', 'duration_minutes').distinct()
+    for start, duration in list(pairs):
+        end = (datetime.combine(datetime.today(), start) + timedelta(minutes=duration)).time()
+        Appointment.objects.filter(appointment_time=start, duration_minutes=duration).update(end_time=end)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0014_customer_and_recent_indexes'),
+        ('services', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(blank=True, null=True, help_text='Copied from the service when booked'),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='price',
+            field=models.DecimalField(blank=True, null=True, decimal_places=2, max_digits=10, help_text='Copied from the service when booked'),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='end_time',
+            field=models.TimeField(blank=True, null=True, help_text='Start time plus duration'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='appointment',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(blank=True, help_text='Copied from the service when booked'),
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, help_text='Copied from the service when booked'),
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='end_time',
+            field=models.TimeField(blank=True, help_text='Start time plus duration'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbers', '0001_initial'),
+        ('booking', '0015_appointment_service_snapshot'),
+        ('services', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAppointment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('appointment_date', models.DateField()),
+                ('appointment_time', models.TimeField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed/Scheduled'), ('completed', 'Completed'), ('cancelled', 'Cancelled'), ('declined', 'Declined')], max_length=20)),
+                ('notes', models.TextField(blank=True)),
+                ('queue_number', models.PositiveIntegerField(blank=True, null=True)),
+                ('duration_minutes', models.PositiveIntegerField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('end_time', models.TimeField()),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('barber', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_appointments', to='barbers.barber')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_appointments', to=settings.AUTH_USER_MODEL)),
+                ('series', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_appointments', to='booking.appointmentseries')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_appointments', to='services.service')),
+            ],
+            options={
+                'verbose_name': 'Archived Appointment',
+                'verbose_name_plural': 'Archived Appointments',
+                'ordering': ['-appointment_date', '-appointment_time'],
+                'indexes': [models.Index(fields=['customer', 'appointment_date', 'appointment_time'], name='booking_arc_custome_fb418d_idx'), models.Index(fields=['appointment_date', 'barber'], name='booking_arc_appoint_fda25d_idx')],
+            },
+        ),
+    ]
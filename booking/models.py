@@ -1,10 +1,21 @@
 # booking/models.py
 
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Max
+from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.models import User
 from barbers.models import Barber
 from services.models import Service
 
+class AppointmentQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create skips save(), so snapshot the services here too
+        objs = list(objs)
+        for appointment in objs:
+            appointment.snapshot_service()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class Appointment(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -22,9 +33,47 @@ class Appointment(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     notes = models.TextField(blank=True)
     queue_number = models.PositiveIntegerField(null=True, blank=True)
+    series = models.ForeignKey('AppointmentSeries', on_delete=models.SET_NULL, null=True, blank=True, related_name='appointments')
+    # Copied from the service when booked, so later edits to the service
+    # don't change existing appointments
+    duration_minutes = models.PositiveIntegerField(blank=True, help_text="Copied from the service when booked")
+    price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, help_text="Copied from the service when booked")
+    end_time = models.TimeField(blank=True, help_text="Start time plus duration")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = AppointmentQuerySet.as_manager()
+    
+    is_archived = False
+    
+    # Service the stored duration and price were copied from
+    _snapshot_service_id = None
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_service_id = instance.__dict__.get('service_id')
+        return instance
+    
+    def snapshot_service(self):
+        """
+        Fill in duration_minutes and price from the service, and work out end_time.
+        
+        A booking keeps the duration and price it was made with. They are only
+        copied again when it is moved to a different service.
+        """
+        changed = self._snapshot_service_id is not None and self._snapshot_service_id != self.service_id
+        if self.duration_minutes is None or changed:
+            self.duration_minutes = self.service.duration_minutes
+        if self.price is None or changed:
+            self.price = self.service.price
+        self._snapshot_service_id = self.service_id
+        self.end_time = self.get_end_time()
+    
+    def save(self, *args, **kwargs):
+        self.snapshot_service()
+        super().save(*args, **kwargs)
+    
     def can_reschedule(self):
         """Check if appointment can be rescheduled."""
         from datetime import datetime, timedelta
@@ -43,10 +92,10 @@ class Appointment(models.Model):
         return time_until_appointment > timedelta(hours=2)
     
     def get_end_time(self):
-        """Calculate appointment end time based on service duration."""
+        """Calculate appointment end time from its booked duration."""
         from datetime import datetime, timedelta
         start_datetime = datetime.combine(datetime.today(), self.appointment_time)
-        end_datetime = start_datetime + timedelta(minutes=self.service.duration_minutes)
+        end_datetime = start_datetime + timedelta(minutes=self.duration_minutes)
         return end_datetime.time()
     
     def __str__(self):
@@ -56,4 +105,301 @@ class Appointment(models.Model):
         verbose_name = 'Appointment'
         verbose_name_plural = 'Appointments'
         ordering = ['-appointment_date', '-appointment_time']
-        unique_together = ['barber', 'appointment_date', 'appointment_time']
\ No newline at end of file
+        constraints = [
+            # Only live bookings hold a slot; cancelled/declined rows may share it
+            models.UniqueConstraint(
+                fields=['barber', 'appointment_date', 'appointment_time'],
+                condition=models.Q(status__in=['pending', 'confirmed']),
+                name='unique_active_appointment_slot',
+                violation_error_message='This barber is already booked at this time. Please choose another time.',
+            ),
+        ]
+        indexes = [
+            # Calendar delta sync reads rows changed since a sync token
+            models.Index(fields=['updated_at']),
+            # .ics feeds and the keyset-paginated appointment list read in
+            # (date, time, id) order, optionally narrowed by one filter column
+            models.Index(fields=['barber', 'appointment_date', 'appointment_time', 'id']),
+            models.Index(fields=['appointment_date', 'appointment_time', 'id']),
+            models.Index(fields=['status', 'appointment_date', 'appointment_time', 'id']),
+            models.Index(fields=['service', 'appointment_date', 'appointment_time', 'id']),
+            # A customer's own bookings (dashboard, My Appointments, calendar) in date order
+            models.Index(fields=['customer', 'appointment_date', 'appointment_time']),
+            # Most recently booked, on the admin dashboard
+            models.Index(fields=['created_at']),
+        ]
+
+
+class ArchivedAppointment(models.Model):
+    """
+    A finished appointment moved out of the live table by booking.archive.
+    
+    Keeps the id and columns it had while live, so reports, customer history
+    and links to it still work. Nothing changes an archived row.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_appointments')
+    barber = models.ForeignKey(Barber, on_delete=models.CASCADE, related_name='archived_appointments')
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='archived_appointments')
+    appointment_date = models.DateField()
+    appointment_time = models.TimeField()
+    status = models.CharField(max_length=20, choices=Appointment.STATUS_CHOICES)
+    notes = models.TextField(blank=True)
+    queue_number = models.PositiveIntegerField(null=True, blank=True)
+    series = models.ForeignKey('AppointmentSeries', on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_appointments')
+    duration_minutes = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    end_time = models.TimeField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    is_archived = True
+    
+    def can_reschedule(self):
+        return False
+    
+    def get_end_time(self):
+        return self.end_time
+    
+    def __str__(self):
+        return f"{self.customer.username} - {self.barber.name} - {self.appointment_date} (archived)"
+    
+    class Meta:
+        verbose_name = 'Archived Appointment'
+        verbose_name_plural = 'Archived Appointments'
+        ordering = ['-appointment_date', '-appointment_time']
+        indexes = [
+            # A customer's history, in date order
+            models.Index(fields=['customer', 'appointment_date', 'appointment_time']),
+            # Reports and rollup rebuilds read whole days
+            models.Index(fields=['appointment_date', 'barber']),
+        ]
+
+
+class DeletedAppointment(models.Model):
+    """
+    Tombstone left when an appointment is deleted, so calendar delta sync can report it.
+    
+    Plain integer columns rather than foreign keys: the rows they pointed at
+    are gone, or about to be.
+    """
+    appointment_id = models.PositiveIntegerField()
+    customer_id = models.PositiveIntegerField()
+    appointment_date = models.DateField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    def __str__(self):
+        return f"Appointment #{self.appointment_id} deleted at {self.deleted_at}"
+    
+    class Meta:
+        verbose_name = 'Deleted Appointment'
+        verbose_name_plural = 'Deleted Appointments'
+
+
+class LiveEvent(models.Model):
+    """
+    A booking change pushed to live listeners by booking.live.
+    
+    This table is the bus between web workers: each worker polls it for ids
+    it hasn't seen and fans new rows out to its open streams. Plain integer
+    columns so events outlive the appointment they describe.
+    """
+    KIND_CHOICES = [
+        ('created', 'Created'),
+        ('status', 'Status Changed'),
+        ('payment', 'Payment Changed'),
+    ]
+    
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    appointment_id = models.PositiveIntegerField()
+    customer_id = models.PositiveIntegerField()
+    barber_id = models.PositiveIntegerField()
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} for appointment #{self.appointment_id}"
+    
+    class Meta:
+        verbose_name = 'Live Event'
+        verbose_name_plural = 'Live Events'
+
+
+class SlotBitmap(models.Model):
+    """
+    Availability index for one barber on one day.
+    
+    Each mask holds one bit per 30-minute cell of the day (bit 0 = 00:00-00:30),
+    so a whole day fits in a single BIGINT. Maintained by booking.signals and
+    read by booking.slot_index.
+    """
+    barber = models.ForeignKey(Barber, on_delete=models.CASCADE, related_name='slot_bitmaps')
+    date = models.DateField()
+    working_mask = models.BigIntegerField(default=0)
+    booked_mask = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.barber_id} - {self.date}"
+    
+    class Meta:
+        verbose_name = 'Slot Bitmap'
+        verbose_name_plural = 'Slot Bitmaps'
+        unique_together = ['barber', 'date']
+
+
+class DailyQueueCounter(models.Model):
+    """Last queue number handed out for a day, shared by every barber."""
+    date = models.DateField(unique=True)
+    last_number = models.PositiveIntegerField(default=0)
+    
+    @classmethod
+    def allocate(cls, dates):
+        """
+        Allocate one queue number on each of several distinct days.
+        
+        Costs the same handful of queries however many days are given, for
+        bulk inserts such as appointment series.
+        
+        Returns:
+            Dictionary mapping date to its new queue number
+        """
+        dates = set(dates)
+        with transaction.atomic():
+            cls.objects.filter(date__in=dates).update(last_number=F('last_number') + 1)
+            numbers = dict(cls.objects.filter(date__in=dates).values_list('date', 'last_number'))
+            
+            missing = dates - numbers.keys()
+            if missing:
+                # Carry on from any numbers issued before counters existed
+                issued = dict(
+                    Appointment.objects.filter(appointment_date__in=missing)
+                    .order_by()
+                    .values_list('appointment_date')
+                    .annotate(Max('queue_number'))
+                )
+                seeded = {date: (issued.get(date) or 0) + 1 for date in missing}
+                try:
+                    with transaction.atomic():
+                        cls.objects.bulk_create([cls(date=date, last_number=number) for date, number in seeded.items()])
+                except IntegrityError:
+                    # Another worker created some of the rows first
+                    seeded = {date: cls.next_number(date) for date in missing}
+                numbers.update(seeded)
+        
+        return numbers
+    
+    @classmethod
+    def next_number(cls, date):
+        """
+        Allocate the next queue number for a day.
+        
+        A single-row UPDATE with an F() increment, so allocation is O(1) and
+        two workers can never read the same value: the row stays locked
+        until the surrounding transaction commits.
+        """
+        with transaction.atomic():
+            if not cls.objects.filter(date=date).update(last_number=F('last_number') + 1):
+                # First booking of the day: carry on from any numbers issued before counters existed
+                issued = Appointment.objects.filter(
+                    appointment_date=date
+                ).aggregate(Max('queue_number'))['queue_number__max'] or 0
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(date=date, last_number=issued + 1)
+                    return issued + 1
+                except IntegrityError:
+                    # Another worker created the row first
+                    cls.objects.filter(date=date).update(last_number=F('last_number') + 1)
+            return cls.objects.filter(date=date).values_list('last_number', flat=True).get()
+    
+    def __str__(self):
+        return f"{self.date} - #{self.last_number}"
+    
+    class Meta:
+        verbose_name = 'Daily Queue Counter'
+        verbose_name_plural = 'Daily Queue Counters'
+
+
+class SlotHold(models.Model):
+    """Short-lived reservation of a slot while a customer finishes booking it."""
+    barber = models.ForeignKey(Barber, on_delete=models.CASCADE, related_name='slot_holds')
+    customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='slot_holds')
+    date = models.DateField()
+    time = models.TimeField()
+    duration_minutes = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+    
+    def __str__(self):
+        return f"{self.customer.username} - {self.barber.name} - {self.date} {self.time}"
+    
+    class Meta:
+        verbose_name = 'Slot Hold'
+        verbose_name_plural = 'Slot Holds'
+        unique_together = ['barber', 'date', 'time']
+        indexes = [models.Index(fields=['barber', 'date', 'expires_at'])]
+
+
+class AppointmentSeries(models.Model):
+    """A repeating booking, e.g. every 2 weeks with the same barber."""
+    customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='appointment_series')
+    barber = models.ForeignKey(Barber, on_delete=models.CASCADE, related_name='appointment_series')
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='appointment_series')
+    start_date = models.DateField()
+    appointment_time = models.TimeField()
+    interval_weeks = models.PositiveSmallIntegerField(
+        default=2,
+        validators=[MinValueValidator(1), MaxValueValidator(8)],
+        help_text="Weeks between appointments"
+    )
+    occurrences = models.PositiveSmallIntegerField(
+        default=6,
+        validators=[MinValueValidator(2), MaxValueValidator(26)],
+        help_text="Number of appointments in the series"
+    )
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def occurrence_dates(self):
+        """Dates of every appointment in the series."""
+        from datetime import timedelta
+        return [self.start_date + timedelta(weeks=self.interval_weeks * i) for i in range(self.occurrences)]
+    
+    def __str__(self):
+        return f"{self.customer.username} - {self.barber.name} - every {self.interval_weeks} week(s)"
+    
+    class Meta:
+        verbose_name = 'Appointment Series'
+        verbose_name_plural = 'Appointment Series'
+
+
+class WaitlistEntry(models.Model):
+    """A customer waiting for a slot to open up within a time window."""
+    STATUS_CHOICES = [
+        ('waiting', 'Waiting'),
+        ('promoted', 'Promoted'),
+        ('cancelled', 'Cancelled'),
+    ]
+    
+    customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='waitlist_entries')
+    barber = models.ForeignKey(Barber, on_delete=models.CASCADE, null=True, blank=True, related_name='waitlist_entries',
+                               help_text="Leave empty to accept any barber")
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='waitlist_entries')
+    date = models.DateField()
+    window_start = models.TimeField()
+    window_end = models.TimeField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting')
+    appointment = models.OneToOneField(Appointment, on_delete=models.SET_NULL, null=True, blank=True, related_name='waitlist_entry')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.customer.username} - {self.date} {self.window_start}-{self.window_end} - {self.status}"
+    
+    class Meta:
+        verbose_name = 'Waitlist Entry'
+        verbose_name_plural = 'Waitlist Entries'
+        ordering = ['created_at']
+        indexes = [
+            # Promotion looks up waiting entries for one day, oldest first
+            models.Index(fields=['date', 'status', 'created_at']),
+        ]
@@ -0,0 +1,151 @@
+# booking/pagination.py
+
+from datetime import date, time
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+PAGE_SIZE = 50
+
+# Unfiltered tables estimated at this many rows or more are not counted exactly
+ESTIMATE_ABOVE = 10000
+
+# Keyset order for appointment lists; id breaks ties within a slot
+APPOINTMENT_KEY = ('appointment_date', 'appointment_time', 'id')
+
+
+def encode_cursor(appointment):
+    """Cursor pointing just past an appointment in APPOINTMENT_KEY order."""
+    return f"{appointment.appointment_date.isoformat()}_{appointment.appointment_time.strftime('%H:%M:%S')}_{appointment.pk}"
+
+
+def decode_cursor(cursor):
+    """
+    Turn a cursor back into (date, time, id).
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    day, slot, pk = cursor.split('_')
+    return date.fromisoformat(day), time.fromisoformat(slot), int(pk)
+
+
+def _seek(values, descending):
+    """
+    Q for rows strictly after `values` in APPOINTMENT_KEY order.
+    
+    Spelled out as (a > x) OR (a = x AND b > y) OR ..., with a redundant
+    a >= x in front so the database can start an index range scan there.
+    """
+    op = 'lt' if descending else 'gt'
+    edge = 'lte' if descending else 'gte'
+    
+    after = Q()
+    for position in range(len(APPOINTMENT_KEY) - 1, -1, -1):
+        field = APPOINTMENT_KEY[position]
+        step = Q(**{f'{field}__{op}': values[position]})
+        after = step if position == len(APPOINTMENT_KEY) - 1 else step | (Q(**{field: values[position]}) & after)
+    
+    return Q(**{f'{APPOINTMENT_KEY[0]}__{edge}': values[0]}) & after
+
+
+def keyset_page(queryset, after=None, before=None, descending=False, page_size=PAGE_SIZE):
+    """
+    One page of appointments by seeking past a cursor instead of OFFSET.
+    
+    Each page costs one index range scan of page_size + 1 rows, however deep
+    into the list it is.
+    
+    Args:
+        queryset: Filtered Appointment queryset
+        after: Cursor of the last row of the previous page
+        before: Cursor of the first row of the next page, to page backwards
+        descending: Newest first instead of oldest first
+    
+    Returns:
+        Dictionary with 'items', 'next_cursor' and 'previous_cursor' (None at either end)
+    
+    Raises:
+        ValueError: If a cursor is malformed
+    """
+    backwards = before is not None
+    # Paging backwards walks the opposite way, then flips the rows round
+    walk_descending = descending != backwards
+    order = [f'-{field}' if walk_descending else field for field in APPOINTMENT_KEY]
+    
+    cursor = before if backwards else after
+    if cursor:
+        queryset = queryset.filter(_seek(decode_cursor(cursor), walk_descending))
+    
+    items = list(queryset.order_by(*order)[:page_size + 1])
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    if backwards:
+        items.reverse()
+    
+    if not items:
+        return {'items': [], 'next_cursor': None, 'previous_cursor': None}
+    
+    more_ahead = has_more if not backwards else True
+    more_behind = bool(cursor) if not backwards else has_more
+    return {
+        'items': items,
+        'next_cursor': encode_cursor(items[-1]) if more_ahead else None,
+        'previous_cursor': encode_cursor(items[0]) if more_behind else None,
+    }
+
+
+def planner_estimate(model):
+    """
+    The planner's idea of how many rows a table has, or None without statistics.
+    
+    Reads pg_class on PostgreSQL, and sqlite_stat1 on SQLite once ANALYZE has run.
+    """
+    table = model._meta.db_table
+    row = None
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+        elif connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone():
+                # The first number of an index's stat is the row count
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s AND idx IS NOT NULL LIMIT 1', [table])
+                stat = cursor.fetchone()
+                row = (int(stat[0].split()[0]),) if stat else None
+    # reltuples is -1 until the table has been analyzed
+    if row and row[0] >= 0:
+        return row[0]
+    return None
+
+
+def estimated_count(model):
+    """
+    Roughly how many rows a table has, without counting them.
+    
+    Uses planner_estimate(). Without statistics it falls back to an exact
+    COUNT, which is fine at development sizes.
+    """
+    estimate = planner_estimate(model)
+    return model.objects.count() if estimate is None else estimate
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists over big tables.
+    
+    An unfiltered list takes its total from planner_estimate() once the
+    table is big enough for COUNT(*) to hurt; filtered lists, small tables
+    and tables without statistics are still counted exactly.
+    """
+    
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = planner_estimate(self.object_list.model)
+            if estimate is not None and estimate >= ESTIMATE_ABOVE:
+                return estimate
+        return super().count
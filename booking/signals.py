@@ -0,0 +1,131 @@
+# booking/signals.py
+
+from django.db.models.signals import post_init, post_save, post_delete
+from django.db import transaction
+from django.dispatch import receiver, Signal
+from .models import Appointment, LiveEvent
+from . import live, slot_index
+from barbers.models import BarberAvailability
+
+# Sent after appointments are inserted or updated in bulk (bulk_create,
+# QuerySet.update), which bypasses post_save. Receivers get the affected
+# ids as `appointment_ids`.
+appointments_bulk_changed = Signal()
+
+
+def _slot_key(instance):
+    """(barber_id, date, time, service_id) an appointment occupies, or None if it doesn't block a slot."""
+    # Read from __dict__ so deferred fields never trigger a query
+    values = instance.__dict__
+    if values.get('status') not in slot_index.ACTIVE_STATUSES:
+        return None
+    key = (values.get('barber_id'), values.get('appointment_date'), values.get('appointment_time'), values.get('service_id'))
+    return key if None not in key else None
+
+
+@receiver(post_init, sender=Appointment)
+def remember_slot(sender, instance, **kwargs):
+    # Unsaved instances don't occupy anything yet
+    instance._original_slot = _slot_key(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Appointment)
+def update_slot_index(sender, instance, **kwargs):
+    old_slot = instance._original_slot
+    new_slot = _slot_key(instance)
+    
+    if old_slot != new_slot:
+        if old_slot:
+            slot_index.release(old_slot[0], old_slot[1])
+            offer_to_waitlist(old_slot)
+        if new_slot:
+            slot_index.mark_booked(new_slot[0], new_slot[1], new_slot[2], instance.duration_minutes)
+    
+    instance._original_slot = new_slot
+
+
+@receiver(post_delete, sender=Appointment)
+def free_slot_index(sender, instance, **kwargs):
+    if instance._original_slot:
+        slot_index.release(instance._original_slot[0], instance._original_slot[1])
+        offer_to_waitlist(instance._original_slot)
+
+
+@receiver(post_delete, sender=Appointment)
+def leave_tombstone(sender, instance, **kwargs):
+    from .events import record_deletion
+    
+    record_deletion(instance.pk, instance.__dict__.get('customer_id'), instance.__dict__.get('appointment_date'))
+
+
+def offer_to_waitlist(slot):
+    """Offer a freed (barber_id, date, time, service_id) slot to the waitlist once the transaction commits."""
+    from .waitlist import schedule_promotion
+    
+    barber_id, date, time_slot, _ = slot
+    transaction.on_commit(lambda: schedule_promotion(barber_id, date, time_slot))
+
+
+@receiver(appointments_bulk_changed)
+def forget_bulk_changed_slots(sender, appointment_ids, **kwargs):
+    slot_index.forget(
+        Appointment.objects.filter(pk__in=appointment_ids).values_list('barber_id', 'appointment_date')
+    )
+
+
+def _live_payload(status, appointment_date, appointment_time):
+    return {'status': status, 'date': appointment_date.isoformat(), 'time': appointment_time.strftime('%H:%M')}
+
+
+@receiver(post_init, sender=Appointment)
+def remember_status(sender, instance, **kwargs):
+    instance._original_status = instance.__dict__.get('status') if instance.pk else None
+
+
+@receiver(post_save, sender=Appointment)
+def publish_appointment_change(sender, instance, created, **kwargs):
+    status = instance.__dict__.get('status')
+    if created or (status is not None and status != instance._original_status):
+        live.publish(
+            'created' if created else 'status', instance.pk, instance.customer_id, instance.barber_id,
+            **_live_payload(status, instance.appointment_date, instance.appointment_time)
+        )
+    instance._original_status = status
+
+
+@receiver(appointments_bulk_changed)
+def publish_bulk_changes(sender, appointment_ids, **kwargs):
+    rows = Appointment.objects.filter(pk__in=appointment_ids).order_by('pk').values_list(
+        'pk', 'customer_id', 'barber_id', 'status', 'appointment_date', 'appointment_time'
+    )
+    live.publish_many([
+        LiveEvent(
+            kind='status', appointment_id=pk, customer_id=customer_id, barber_id=barber_id,
+            payload=_live_payload(status, appointment_date, appointment_time)
+        )
+        for pk, customer_id, barber_id, status, appointment_date, appointment_time in rows
+    ])
+
+
+@receiver(post_init, sender=BarberAvailability)
+def remember_schedule_day(sender, instance, **kwargs):
+    if instance.pk:
+        instance._original_schedule_day = (instance.__dict__.get('barber_id'), instance.__dict__.get('day_of_week'))
+    else:
+        instance._original_schedule_day = (None, None)
+
+
+@receiver(post_save, sender=BarberAvailability)
+def update_working_hours(sender, instance, **kwargs):
+    old_barber_id, old_day = instance._original_schedule_day
+    if old_day is not None and (old_barber_id, old_day) != (instance.barber_id, instance.day_of_week):
+        slot_index.update_working_hours(old_barber_id, old_day)
+    
+    slot_index.update_working_hours(instance.barber_id, instance.day_of_week, instance)
+    instance._original_schedule_day = (instance.barber_id, instance.day_of_week)
+
+
+@receiver(post_delete, sender=BarberAvailability)
+def clear_working_hours(sender, instance, **kwargs):
+    slot_index.update_working_hours(instance.barber_id, instance.day_of_week)
+
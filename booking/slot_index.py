@@ -0,0 +1,202 @@
+# booking/slot_index.py
+
+from datetime import time, timedelta
+from django.db import transaction
+from django.db.models import F
+from .models import Appointment, SlotBitmap
+from .intervals import ACTIVE_STATUSES, to_minutes
+from barbers.models import Barber, BarberAvailability
+
+CELL_MINUTES = 30
+CELLS_PER_DAY = 24 * 60 // CELL_MINUTES
+
+
+def cell_of(time_obj):
+    """Return the index of the 30-minute cell containing a time."""
+    return (time_obj.hour * 60 + time_obj.minute) // CELL_MINUTES
+
+
+def cell_start(cell):
+    """Return the start time of a cell."""
+    minutes = cell * CELL_MINUTES
+    return time(minutes // 60, minutes % 60)
+
+
+def bit_for(time_obj):
+    """Return the mask with only the cell containing a time set."""
+    return 1 << cell_of(time_obj)
+
+
+def mask_between(start, end):
+    """
+    Return the mask of every cell overlapping [start, end).
+    
+    Args:
+        start: Minutes since midnight
+        end: Minutes since midnight, clamped to the end of the day
+    """
+    first = start // CELL_MINUTES
+    last = min(-(-end // CELL_MINUTES), CELLS_PER_DAY)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def appointment_mask(time_obj, duration_minutes):
+    """Return the mask of cells an appointment covers."""
+    start = to_minutes(time_obj)
+    return mask_between(start, start + duration_minutes)
+
+
+def working_mask_for(availability):
+    """
+    Build the working-hours mask for a BarberAvailability.
+    
+    A cell is working when its start lies in [start_time, end_time), the same
+    rule get_available_slots has always applied to slot times.
+    """
+    if availability is None or not availability.is_available:
+        return 0
+    
+    mask = 0
+    for cell in range(CELLS_PER_DAY):
+        if availability.start_time <= cell_start(cell) < availability.end_time:
+            mask |= 1 << cell
+    return mask
+
+
+def _booked_masks(barber_ids, dates):
+    """Compute booked masks from Appointment in one query, keyed by (barber_id, date)."""
+    booked = {}
+    existing_appointments = Appointment.objects.filter(
+        barber_id__in=barber_ids,
+        appointment_date__in=dates,
+        status__in=ACTIVE_STATUSES
+    ).values_list('barber_id', 'appointment_date', 'appointment_time', 'duration_minutes')
+    for barber_id, appointment_date, appointment_time, duration in existing_appointments:
+        key = (barber_id, appointment_date)
+        booked[key] = booked.get(key, 0) | appointment_mask(appointment_time, duration)
+    return booked
+
+
+def _lock_barbers(barber_ids):
+    """
+    Hold the barbers' rows until commit, as booking does.
+    
+    A day built under the lock can't miss a booking made meanwhile: either
+    the booking committed first and is read, or its mark_booked() waits
+    for the row to exist.
+    """
+    list(Barber.objects.select_for_update().filter(pk__in=barber_ids).order_by('pk').values_list('pk', flat=True))
+
+
+def _build(barber_ids, dates):
+    """Compute bitmaps from BarberAvailability and Appointment in two queries."""
+    schedules = {
+        (availability.barber_id, availability.day_of_week): working_mask_for(availability)
+        for availability in BarberAvailability.objects.filter(barber_id__in=barber_ids, is_available=True)
+    }
+    booked = _booked_masks(barber_ids, dates)
+    
+    return {
+        (barber_id, day): (schedules.get((barber_id, day.weekday()), 0), booked.get((barber_id, day), 0))
+        for barber_id in barber_ids
+        for day in dates
+    }
+
+
+def get_bitmaps(barber_ids, dates):
+    """
+    Get (working_mask, booked_mask) for every barber/date pair.
+    
+    Warm entries cost a single query on the index table. Missing entries are
+    built together under the barbers' locks and stored for the next caller.
+    
+    Returns:
+        Dictionary mapping (barber_id, date) to (working_mask, booked_mask)
+    """
+    bitmaps = {
+        (row.barber_id, row.date): (row.working_mask, row.booked_mask)
+        for row in SlotBitmap.objects.filter(barber_id__in=barber_ids, date__in=dates)
+    }
+    
+    missing_barbers = {barber_id for barber_id in barber_ids for day in dates if (barber_id, day) not in bitmaps}
+    if missing_barbers:
+        missing_dates = sorted({day for barber_id in barber_ids for day in dates if (barber_id, day) not in bitmaps})
+        with transaction.atomic():
+            _lock_barbers(missing_barbers)
+            built = {
+                key: masks for key, masks in _build(list(missing_barbers), missing_dates).items()
+                if key not in bitmaps
+            }
+            # Another request may have built the same rows meanwhile; theirs are just as valid
+            SlotBitmap.objects.bulk_create([
+                SlotBitmap(barber_id=barber_id, date=day, working_mask=working, booked_mask=booked)
+                for (barber_id, day), (working, booked) in built.items()
+            ], ignore_conflicts=True)
+        bitmaps.update(built)
+    
+    return bitmaps
+
+
+def get_bitmap(barber_id, date):
+    """Get (working_mask, booked_mask) for one barber on one day."""
+    return get_bitmaps([barber_id], [date])[(barber_id, date)]
+
+
+def date_range(start_date, end_date):
+    """List every date from start_date to end_date inclusive."""
+    return [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+
+
+def mark_booked(barber_id, date, time_obj, duration_minutes):
+    """Set the cells an appointment covers. No-op if the day isn't indexed yet."""
+    SlotBitmap.objects.filter(barber_id=barber_id, date=date).update(
+        booked_mask=F('booked_mask').bitor(appointment_mask(time_obj, duration_minutes))
+    )
+
+
+def release(barber_id, date):
+    """
+    Recompute the booked mask of an indexed day after an appointment leaves it.
+    
+    Cells can be shared by neighbouring appointments that don't sit on the
+    30-minute grid, so clearing bits in place could free a cell that is still
+    taken. No-op if the day isn't indexed yet.
+    """
+    booked = _booked_masks([barber_id], [date]).get((barber_id, date), 0)
+    SlotBitmap.objects.filter(barber_id=barber_id, date=date).update(booked_mask=booked)
+
+
+def forget(barber_dates):
+    """
+    Forget indexed days so they are rebuilt on next read.
+    
+    Deletes the cross product of the given barbers and dates, which may
+    drop a few extra rows but keeps it to a single indexed DELETE.
+    """
+    barber_dates = list(barber_dates)
+    if barber_dates:
+        SlotBitmap.objects.filter(
+            barber_id__in={barber_id for barber_id, date in barber_dates},
+            date__in={date for barber_id, date in barber_dates}
+        ).delete()
+
+
+def update_working_hours(barber_id, day_of_week, availability=None):
+    """Rewrite the working mask of every indexed day falling on a weekday."""
+    SlotBitmap.objects.filter(barber_id=barber_id, date__iso_week_day=day_of_week + 1).update(
+        working_mask=working_mask_for(availability)
+    )
+
+
+def refresh(barber_id, date):
+    """Rebuild one day from the source tables, e.g. after a booking conflict shows it was stale."""
+    with transaction.atomic():
+        _lock_barbers([barber_id])
+        working, booked = _build([barber_id], [date])[(barber_id, date)]
+        SlotBitmap.objects.update_or_create(
+            barber_id=barber_id, date=date,
+            defaults={'working_mask': working, 'booked_mask': booked}
+        )
+    return working, booked
@@ -1,12 +1,15 @@
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client, override_settings
 from django.contrib.auth.models import User
 from barbers.models import Barber
 from services.models import Service
 from booking.models import Appointment
 from payments.models import Payment
 from datetime import date, time
+import json
 
 from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 class AppointmentWorkflowTest(TestCase):
     def setUp(self):
@@ -61,9 +64,1450 @@ class AppointmentWorkflowTest(TestCase):
         # Customer sees 1 appointment
         self.client.login(username='customer', password='password')
         response = self.client.get(reverse('booking:calendar_events'), {'start': date.today().isoformat(), 'end': date.today().isoformat()})
-        self.assertEqual(len(response.json()), 1)
+        self.assertEqual(len(json.loads(b''.join(response.streaming_content))), 1)
         
         # Admin sees 2 appointments
         self.client.login(username='admin', password='password')
         response = self.client.get(reverse('booking:calendar_events'), {'start': date.today().isoformat(), 'end': date.today().isoformat()})
-        self.assertEqual(len(response.json()), 2)
+        self.assertEqual(len(json.loads(b''.join(response.streaming_content))), 2)
+
+
+class AvailabilityMatrixTest(TestCase):
+    def setUp(self):
+        from barbers.models import BarberAvailability
+        self.customer = User.objects.create_user(username='customer', password='password')
+        self.service = Service.objects.create(name='Test Service', price=500, duration_minutes=30, is_active=True)
+        self.barbers = []
+        for i in range(3):
+            barber_user = User.objects.create_user(username=f'barber{i}', password='password')
+            barber = Barber.objects.create(user=barber_user, name=f'Barber {i}', is_active=True)
+            for day in range(5):
+                BarberAvailability.objects.create(barber=barber, day_of_week=day, start_time=time(9, 0), end_time=time(17, 0))
+            self.barbers.append(barber)
+        # A Monday, so the week covers five working days and a weekend
+        self.monday = date(2030, 1, 7)
+        Appointment.objects.create(customer=self.customer, barber=self.barbers[0], service=self.service, appointment_date=self.monday, appointment_time=time(10, 0))
+        self.client = Client()
+        self.client.login(username='customer', password='password')
+    
+    def test_matrix_uses_fixed_number_of_queries(self):
+        from booking.utils import get_availability_matrix
+        from datetime import timedelta
+        end = self.monday + timedelta(days=27)
+        # Cold index: index lookup, then under the barber locks two source
+        # queries and one bulk insert (the transaction is a savepoint here), holds
+        with self.assertNumQueries(8):
+            get_availability_matrix(self.barbers, self.monday, end)
+        with self.assertNumQueries(2):
+            matrix = get_availability_matrix(self.barbers, self.monday, end)
+        self.assertEqual(len(matrix[self.barbers[0].pk]), 28)
+        monday_slots = {slot['time']: slot for slot in matrix[self.barbers[0].pk][self.monday]}
+        self.assertEqual(monday_slots[time(10, 0)]['reason'], 'Already booked')
+        self.assertTrue(monday_slots[time(10, 30)]['available'])
+        self.assertEqual(monday_slots[time(17, 0)]['reason'], 'Outside working hours')
+        saturday = matrix[self.barbers[1].pk][self.monday + timedelta(days=5)]
+        self.assertTrue(all(slot['reason'] == 'Barber not working' for slot in saturday))
+    
+    def test_matrix_matches_single_day_api(self):
+        from booking.utils import get_availability_matrix, get_available_slots
+        matrix = get_availability_matrix(self.barbers, self.monday, self.monday)
+        for barber in self.barbers:
+            self.assertEqual(matrix[barber.pk][self.monday], get_available_slots(barber, self.monday))
+    
+    def test_availability_endpoint(self):
+        response = self.client.get(reverse('booking:availability'), {
+            'start': self.monday.isoformat(),
+            'barber_ids': f'{self.barbers[0].pk},{self.barbers[1].pk}',
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([barber['id'] for barber in data['barbers']], [self.barbers[0].pk, self.barbers[1].pk])
+        self.assertEqual(len(data['barbers'][0]['days']), 7)
+    
+        response = self.client.get(reverse('booking:availability'), {'start': '2030-01-01', 'end': '2030-06-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+class SlotIndexTest(TestCase):
+    def setUp(self):
+        from barbers.models import BarberAvailability
+        self.customer = User.objects.create_user(username='customer', password='password')
+        barber_user = User.objects.create_user(username='barber_user', password='password')
+        self.barber = Barber.objects.create(user=barber_user, name='Test Barber', is_active=True)
+        self.service = Service.objects.create(name='Test Service', price=500, duration_minutes=30, is_active=True)
+        self.availability = BarberAvailability.objects.create(barber=self.barber, day_of_week=0, start_time=time(9, 0), end_time=time(17, 0))
+        self.monday = date(2030, 1, 7)
+    
+    def slot(self, slot_time):
+        from booking.utils import get_available_slots
+        return next(slot for slot in get_available_slots(self.barber, self.monday) if slot['time'] == slot_time)
+    
+    def test_warm_index_does_not_query_appointments(self):
+        from booking.utils import get_available_slots
+        get_available_slots(self.barber, self.monday)
+        with CaptureQueriesContext(connection) as queries:
+            get_available_slots(self.barber, self.monday)
+        # The index row and the live holds
+        self.assertEqual(len(queries), 2)
+        for query in queries:
+            self.assertNotIn('booking_appointment', query['sql'])
+    
+    def test_index_follows_appointment_writes(self):
+        self.assertTrue(self.slot(time(10, 0))['available'])
+        appointment = Appointment.objects.create(customer=self.customer, barber=self.barber, service=self.service, appointment_date=self.monday, appointment_time=time(10, 0))
+        self.assertEqual(self.slot(time(10, 0))['reason'], 'Already booked')
+    
+        # Rescheduling moves the bit
+        appointment.appointment_time = time(11, 0)
+        appointment.save()
+        self.assertTrue(self.slot(time(10, 0))['available'])
+        self.assertEqual(self.slot(time(11, 0))['reason'], 'Already booked')
+    
+        appointment.status = 'cancelled'
+        appointment.save()
+        self.assertTrue(self.slot(time(11, 0))['available'])
+    
+        appointment.status = 'pending'
+        appointment.save()
+        Appointment.objects.get(pk=appointment.pk).delete()
+        self.assertTrue(self.slot(time(11, 0))['available'])
+    
+    def test_index_follows_availability_changes(self):
+        from booking.utils import check_slot_availability
+        self.assertTrue(self.slot(time(16, 30))['available'])
+        self.availability.end_time = time(16, 0)
+        self.availability.save()
+        self.assertEqual(self.slot(time(16, 30))['reason'], 'Outside working hours')
+        self.assertEqual(check_slot_availability(self.barber, self.monday, time(16, 30)), (False, "Outside barber's working hours"))
+    
+        self.availability.delete()
+        self.assertEqual(self.slot(time(10, 0))['reason'], 'Barber not working')
+    
+    def test_booking_conflict_repairs_stale_index(self):
+        from booking.bookings import book_appointment, SlotTakenError
+        from booking.models import SlotBitmap
+        self.slot(time(10, 0))
+        Appointment.objects.create(customer=self.customer, barber=self.barber, service=self.service, appointment_date=self.monday, appointment_time=time(10, 0))
+        # As if a cold build had raced the booking and stored its mask
+        SlotBitmap.objects.filter(barber=self.barber, date=self.monday).update(booked_mask=0)
+        self.assertTrue(self.slot(time(10, 0))['available'])
+    
+        with self.assertRaises(SlotTakenError):
+            book_appointment(Appointment(customer=self.customer, barber=self.barber, service=self.service, appointment_date=self.monday, appointment_time=time(10, 0)))
+        self.assertEqual(self.slot(time(10, 0))['reason'], 'Already booked')
+
+
+class IntervalIndexTest(TestCase):
+    def setUp(self):
+        from barbers.models import BarberAvailability
+        self.customer = User.objects.create_user(username='customer', password='password')
+        barber_user = User.objects.create_user(username='barber_user', password='password')
+        self.barber = Barber.objects.create(user=barber_user, name='Test Barber', is_active=True)
+        self.short_service = Service.objects.create(name='Trim', price=200, duration_minutes=30, is_active=True)
+        self.long_service = Service.objects.create(name='Full Service', price=800, duration_minutes=60, is_active=True)
+        BarberAvailability.objects.create(barber=self.barber, day_of_week=0, start_time=time(9, 0), end_time=time(17, 0))
+        self.monday = date(2030, 1, 7)
+    
+    def test_overlap_queries(self):
+        from booking.intervals import IntervalIndex
+        # 10:00-11:00 and a legacy double booking 10:15-10:30
+        index = IntervalIndex([(600, 660), (615, 630)])
+        self.assertTrue(index.overlaps(630, 660))
+        self.assertTrue(index.overlaps(570, 601))
+        self.assertFalse(index.overlaps(570, 600))
+        self.assertFalse(index.overlaps(660, 720))
+        self.assertFalse(IntervalIndex().overlaps(0, 1440))
+        self.assertTrue(index.fits(540, 60, 540, 1020))
+        self.assertFalse(index.fits(570, 60, 540, 1020))
+        self.assertFalse(index.fits(990, 60, 540, 1020))
+    
+    def test_long_service_blocks_following_slots(self):
+        from booking.utils import get_available_slots, has_overlap
+        Appointment.objects.create(customer=self.customer, barber=self.barber, service=self.long_service, appointment_date=self.monday, appointment_time=time(10, 0))
+        slots = {slot['time']: slot for slot in get_available_slots(self.barber, self.monday, self.short_service)}
+        self.assertEqual(slots[time(10, 30)]['reason'], 'Already booked')
+        self.assertTrue(slots[time(11, 0)]['available'])
+    
+        slots = {slot['time']: slot for slot in get_available_slots(self.barber, self.monday, self.long_service)}
+        self.assertEqual(slots[time(9, 30)]['reason'], 'Overlaps another booking')
+        self.assertEqual(slots[time(16, 30)]['reason'], 'Runs past working hours')
+        self.assertTrue(slots[time(9, 0)]['available'])
+    
+        self.assertTrue(has_overlap(self.barber, self.monday, time(10, 30), 30))
+        self.assertFalse(has_overlap(self.barber, self.monday, time(11, 0), 30))
+    
+    def test_booking_rejects_overlap(self):
+        from booking.bookings import book_appointment, SlotTakenError
+        Appointment.objects.create(customer=self.customer, barber=self.barber, service=self.long_service, appointment_date=self.monday, appointment_time=time(10, 0))
+        overlapping = Appointment(customer=self.customer, barber=self.barber, service=self.short_service, appointment_date=self.monday, appointment_time=time(10, 30))
+        with self.assertRaises(SlotTakenError):
+            book_appointment(overlapping)
+        self.assertIsNone(overlapping.pk)
+        overlapping.appointment_time = time(11, 0)
+        book_appointment(overlapping)
+        self.assertIsNotNone(overlapping.pk)
+    
+    def test_cancelling_frees_every_covered_slot(self):
+        from booking.utils import get_available_slots
+        appointment = Appointment.objects.create(customer=self.customer, barber=self.barber, service=self.long_service, appointment_date=self.monday, appointment_time=time(10, 0))
+        get_available_slots(self.barber, self.monday)
+        appointment.status = 'cancelled'
+        appointment.save()
+        slots = {slot['time']: slot for slot in get_available_slots(self.barber, self.monday)}
+        self.assertTrue(slots[time(10, 0)]['available'])
+        self.assertTrue(slots[time(10, 30)]['available'])
+
+
+class ServiceSnapshotTest(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='password')
+        barber_user = User.objects.create_user(username='barber_user', password='password')
+        self.barber = Barber.objects.create(user=barber_user, name='Test Barber', is_active=True)
+        self.service = Service.objects.create(name='Trim', price=200, duration_minutes=30, is_active=True)
+        self.monday = date(2030, 1, 7)
+        self.appointment = Appointment.objects.create(
+            customer=self.customer, barber=self.barber, service=self.service, appointment_date=self.monday, appointment_time=time(23, 45)
+        )
+    
+    def test_booking_keeps_its_length_and_price(self):
+        from booking.events import calendar_events
+        self.assertEqual((self.appointment.duration_minutes, self.appointment.price, self.appointment.end_time), (30, 200, time(0, 15)))
+    
+        self.service.duration_minutes = 60
+        self.service.price = 350
+        self.service.save()
+        self.appointment.refresh_from_db()
+        self.assertEqual((self.appointment.duration_minutes, self.appointment.price), (30, 200))
+        event = next(calendar_events(Appointment.objects.filter(pk=self.appointment.pk)))
+        self.assertEqual(event['end'], '2030-01-08T00:15:00')
+    
+        # A new booking of the edited service gets its new length
+        later = Appointment.objects.create(customer=self.customer, barber=self.barber, service=self.service, appointment_date=self.monday, appointment_time=time(9, 0))
+        self.assertEqual((later.duration_minutes, later.price, later.end_time), (60, 350, time(10, 0)))
+    
+    def test_reschedule_moves_end_and_changing_service_takes_a_new_snapshot(self):
+        other = Service.objects.create(name='Full Service', price=800, duration_minutes=90, is_active=True)
+        appointment = Appointment.objects.get(pk=self.appointment.pk)
+        appointment.appointment_time = time(10, 0)
+        appointment.save()
+        self.assertEqual((appointment.duration_minutes, appointment.end_time), (30, time(10, 30)))
+    
+        appointment.service = other
+        appointment.save()
+        appointment.refresh_from_db()
+        self.assertEqual((appointment.duration_minutes, appointment.price, appointment.end_time), (90, 800, time(11, 30)))
+    
+    def test_overlap_runs_in_sql(self):
+        from booking.utils import has_overlap
+        # 23:45-00:15 runs past midnight, so it blocks the rest of the day
+        with self.assertNumQueries(1):
+            self.assertTrue(has_overlap(self.barber, self.monday, time(23, 50), 5))
+        self.assertTrue(has_overlap(self.barber, self.monday, time(23, 0), 60))
+        self.assertFalse(has_overlap(self.barber, self.monday, time(23, 0), 45))
+        self.assertFalse(has_overlap(self.barber, self.monday, time(23, 50), 5, exclude_pk=self.appointment.pk))
+    
+    def test_backfill_copies_current_service(self):
+        from importlib import import_module
+        from django.apps import apps
+        backfill = import_module('booking.migrations.0015_appointment_service_snapshot').backfill
+        Appointment.objects.filter(pk=self.appointment.pk).update(duration_minutes=1, price=1, end_time=time(0, 0))
+        backfill(apps, None)
+        self.appointment.refresh_from_db()
+        self.assertEqual((self.appointment.duration_minutes, self.appointment.price, self.appointment.end_time), (30, 200, time(0, 15)))
+
+
+class NextAvailableTest(TestCase):
+    def setUp(self):
+        from barbers.models import BarberAvailability
+        self.customer = User.objects.create_user(username='customer', password='password')
+        self.service = Service.objects.create(name='Full Service', price=800, duration_minutes=60, is_active=True)
+        self.barbers = []
+        for i, days in enumerate([[0], [1, 2]]):
+            barber_user = User.objects.create_user(username=f'barber{i}', password='password')
+            barber = Barber.objects.create(user=barber_user, name=f'Barber {i}', is_active=True)
+            for day in days:
+                BarberAvailability.objects.create(barber=barber, day_of_week=day, start_time=time(9, 0), end_time=time(11, 0))
+            self.barbers.append(barber)
+        self.monday = date(2030, 1, 7)
+    
+    def test_earliest_fits_across_barbers(self):
+        from booking.utils import find_next_available
+        from datetime import datetime, timedelta
+        Appointment.objects.create(customer=self.customer, barber=self.barbers[0], service=self.service, appointment_date=self.monday, appointment_time=time(9, 0))
+        results = find_next_available(self.service, after=datetime(2030, 1, 7, 8, 0), limit=3)
+        self.assertEqual(
+            [(r['barber'], r['date'], r['time']) for r in results],
+            [
+                (self.barbers[0], self.monday, time(10, 0)),
+                (self.barbers[1], self.monday + timedelta(days=1), time(9, 0)),
+                (self.barbers[1], self.monday + timedelta(days=1), time(9, 30)),
+            ]
+        )
+    
+    def test_long_horizon_loads_bookings_in_batches(self):
+        from booking.utils import find_next_available
+        from datetime import datetime
+        # Nothing ever fits a service longer than any working day
+        self.service.duration_minutes = 180
+        with self.assertNumQueries(2 + 3):
+            results = find_next_available(self.service, after=datetime(2030, 1, 7, 8, 0), horizon_days=90)
+        self.assertEqual(results, [])
+    
+    def test_next_available_endpoint(self):
+        self.client.login(username='customer', password='password')
+        response = self.client.get(reverse('booking:next_available'), {'service_id': self.service.pk, 'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertEqual(self.client.get(reverse('booking:next_available')).status_code, 400)
+
+
+class ConcurrentBookingTest(TransactionTestCase):
+    THREADS = 200
+    
+    def setUp(self):
+        from barbers.models import BarberAvailability
+        self.customer = User.objects.create_user(username='customer', password='password')
+        barber_user = User.objects.create_user(username='barber_user', password='password')
+        self.barber = Barber.objects.create(user=barber_user, name='Test Barber', is_active=True)
+        self.service = Service.objects.create(name='Test Service', price=500, duration_minutes=30, is_active=True)
+        BarberAvailability.objects.create(barber=self.barber, day_of_week=0, start_time=time(9, 0), end_time=time(17, 0))
+        self.monday = date(2030, 1, 7)
+    
+    def test_simultaneous_bookings_for_one_slot(self):
+        import threading
+        from booking.bookings import book_appointment, SlotTakenError
+    
+        barrier = threading.Barrier(self.THREADS)
+        outcomes = []
+    
+        def book():
+            try:
+                barrier.wait()
+                book_appointment(Appointment(
+                    customer=self.customer, barber=self.barber, service=self.service,
+                    appointment_date=self.monday, appointment_time=time(10, 0)
+                ))
+                outcomes.append('booked')
+            except SlotTakenError:
+                outcomes.append('taken')
+            except Exception as e:
+                outcomes.append(repr(e))
+            finally:
+                connection.close()
+    
+        threads = [threading.Thread(target=book) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    
+        self.assertEqual(outcomes.count('booked'), 1, outcomes)
+        self.assertEqual(outcomes.count('taken'), self.THREADS - 1, outcomes)
+        self.assertEqual(Appointment.objects.filter(barber=self.barber, appointment_date=self.monday).count(), 1)
+    
+    def test_other_integrity_errors_are_not_reported_as_taken(self):
+        from django.db import IntegrityError
+        from booking.bookings import book_appointment
+        # Foreign keys are checked at commit, so this needs a real transaction
+        with self.assertRaises(IntegrityError):
+            book_appointment(Appointment(
+                customer_id=self.customer.pk + 1000, barber=self.barber, service=self.service,
+                appointment_date=self.monday, appointment_time=time(10, 0)
+            ))
+    
+    def test_create_view_reports_slot_taken(self):
+        Appointment.objects.create(customer=self.customer, barber=self.barber, service=self.service, appointment_date=self.monday, appointment_time=time(10, 0))
+        self.client.login(username='customer', password='password')
+        response = self.client.post(reverse('booking:create'), {
+            'service': self.service.pk,
+            'barber': self.barber.pk,
+            'appointment_date': self.monday.isoformat(),
+            'appointment_time': '10:00',
+        })
+        self.assertEqual(response.status_code, 409)
+        self.assertContains(response, 'already booked', status_code=409)
+
+
+class DailyQueueCounterTest(TransactionTestCase):
+    THREADS = 100
+    
+    def test_numbers_continue_from_existing_bookings(self):
+        from booking.models import DailyQueueCounter
+        customer = User.objects.create_user(username='customer', password='password')
+        barber_user = User.objects.create_user(username='barber_user', password='password')
+        barber = Barber.objects.create(user=barber_user, name='Test Barber', is_active=True)
+        service = Service.objects.create(name='Test Service', price=500, duration_minutes=30, is_active=True)
+        day = date(2030, 1, 7)
+        Appointment.objects.create(customer=customer, barber=barber, service=service, appointment_date=day, appointment_time=time(9, 0), queue_number=4)
+        self.assertEqual(DailyQueueCounter.next_number(day), 5)
+        self.assertEqual(DailyQueueCounter.next_number(day), 6)
+        self.assertEqual(DailyQueueCounter.next_number(date(2030, 1, 8)), 1)
+    
+    def test_concurrent_allocation_has_no_duplicates(self):
+        import threading
+        from booking.models import DailyQueueCounter
+    
+        day = date(2030, 1, 7)
+        barrier = threading.Barrier(self.THREADS)
+        numbers = []
+        errors = []
+    
+        def allocate():
+            try:
+                barrier.wait()
+                numbers.append(DailyQueueCounter.next_number(day))
+            except Exception as e:
+                errors.append(repr(e))
+            finally:
+                connection.close()
+    
+        threads = [threading.Thread(target=allocate) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(numbers), list(range(1, self.THREADS + 1)))
+
+
+class SlotHoldTest(TestCase):
+    def setUp(self):
+        from barbers.models import BarberAvailability
+        self.alice = User.objects.create_user(username='alice', password='password')
+        self.bob = User.objects.create_user(username='bob', password='password')
+        barber_user = User.objects.create_user(username='barber_user', password='password')
+        self.barber = Barber.objects.create(user=barber_user, name='Test Barber', is_active=True)
+        self.service = Service.objects.create(name='Full Service', price=800, duration_minutes=60, is_active=True)
+        BarberAvailability.objects.create(barber=self.barber, day_of_week=0, start_time=time(9, 0), end_time=time(17, 0))
+        self.monday = date(2030, 1, 7)
+    
+    def slots_for(self, customer):
+        from booking.utils import get_available_slots
+        return {slot['time']: slot for slot in get_available_slots(self.barber, self.monday, customer=customer)}
+    
+    def test_hold_hides_slot_from_other_customers(self):
+        from booking.holds import place_hold
+        self.assertIsNotNone(place_hold(self.alice, self.barber, self.monday, time(10, 0), 60))
+        self.assertEqual(self.slots_for(self.bob)[time(10, 30)]['reason'], 'Held by another customer')
+        self.assertTrue(self.slots_for(self.alice)[time(10, 30)]['available'])
+        self.assertIsNone(place_hold(self.bob, self.barber, self.monday, time(10, 30), 30))
+    
+        # Picking another slot moves the hold
+        place_hold(self.alice, self.barber, self.monday, time(14, 0), 60)
+        self.assertTrue(self.slots_for(self.bob)[time(10, 30)]['available'])
+    
+    def test_booking_respects_and_releases_holds(self):
+        from booking.bookings import book_appointment, SlotTakenError
+        from booking.holds import place_hold
+        from booking.models import SlotHold
+        place_hold(self.alice, self.barber, self.monday, time(10, 0), 60)
+        with self.assertRaises(SlotTakenError):
+            book_appointment(Appointment(customer=self.bob, barber=self.barber, service=self.service, appointment_date=self.monday, appointment_time=time(10, 0)))
+        book_appointment(Appointment(customer=self.alice, barber=self.barber, service=self.service, appointment_date=self.monday, appointment_time=time(10, 0)))
+        self.assertFalse(SlotHold.objects.exists())
+    
+    def test_expired_holds_are_ignored_and_swept(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from booking.holds import place_hold
+        from booking.models import SlotHold
+        hold = place_hold(self.alice, self.barber, self.monday, time(10, 0), 60)
+        SlotHold.objects.filter(pk=hold.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertTrue(self.slots_for(self.bob)[time(10, 0)]['available'])
+        self.assertIsNotNone(place_hold(self.bob, self.barber, self.monday, time(10, 0), 60))
+        self.assertFalse(SlotHold.objects.filter(pk=hold.pk).exists())
+    
+    def test_hold_endpoint(self):
+        self.client.login(username='alice', password='password')
+        data = {'barber_id': self.barber.pk, 'date': self.monday.isoformat(), 'time': '10:00', 'service_id': self.service.pk}
+        self.assertEqual(self.client.post(reverse('booking:hold_slot'), data).status_code, 200)
+        self.client.login(username='bob', password='password')
+        self.assertEqual(self.client.post(reverse('booking:hold_slot'), data).status_code, 409)
+
+
+class AppointmentSeriesTest(TestCase):
+    def setUp(self):
+        from barbers.models import BarberAvailability
+        self.customer = User.objects.create_user(username='customer', password='password')
+        barber_user = User.objects.create_user(username='barber_user', password='password')
+        self.barber = Barber.objects.create(user=barber_user, name='Test Barber', is_active=True)
+        self.service = Service.objects.create(name='Test Service', price=500, duration_minutes=30, is_active=True)
+        BarberAvailability.objects.create(barber=self.barber, day_of_week=0, start_time=time(9, 0), end_time=time(17, 0))
+        self.monday = date(2030, 1, 7)
+    
+    def series(self, occurrences, start_date=None):
+        from booking.models import AppointmentSeries
+        return AppointmentSeries(
+            customer=self.customer, barber=self.barber, service=self.service,
+            start_date=start_date or self.monday, appointment_time=time(10, 0),
+            interval_weeks=2, occurrences=occurrences
+        )
+    
+    def test_series_books_free_dates_and_reports_conflicts(self):
+        from datetime import timedelta
+        from booking.bookings import book_series
+        from booking.utils import get_available_slots
+        taken = self.monday + timedelta(weeks=2)
+        get_available_slots(self.barber, self.monday)
+        Appointment.objects.create(customer=self.customer, barber=self.barber, service=self.service, appointment_date=taken, appointment_time=time(10, 0), queue_number=1)
+    
+        appointments, conflicts = book_series(self.series(4))
+        self.assertEqual(len(appointments), 3)
+        self.assertEqual(conflicts, [(taken, 'Already booked')])
+        self.assertEqual(Appointment.objects.get(appointment_date=taken, series__isnull=True).queue_number, 1)
+        self.assertEqual(Appointment.objects.filter(series__isnull=False).count(), 3)
+        self.assertEqual(Appointment.objects.get(appointment_date=self.monday).queue_number, 1)
+    
+        # The bulk insert shows up in the slot index
+        slots = {slot['time']: slot for slot in get_available_slots(self.barber, self.monday)}
+        self.assertEqual(slots[time(10, 0)]['reason'], 'Already booked')
+    
+        # A second series on a different weekday lands outside the schedule
+        appointments, conflicts = book_series(self.series(2, start_date=self.monday + timedelta(days=1)))
+        self.assertEqual(appointments, [])
+        self.assertEqual({reason for day, reason in conflicts}, {'Barber not working'})
+    
+    def test_query_count_does_not_grow_with_series_length(self):
+        from booking.bookings import book_series
+        with CaptureQueriesContext(connection) as short_series:
+            book_series(self.series(3))
+        with CaptureQueriesContext(connection) as long_series:
+            book_series(self.series(13, start_date=date(2031, 1, 6)))
+        self.assertEqual(len(short_series), len(long_series))
+        self.assertEqual(Appointment.objects.count(), 16)
+    
+    def test_create_series_view(self):
+        self.client.login(username='customer', password='password')
+        response = self.client.post(reverse('booking:create_series'), {
+            'service': self.service.pk,
+            'barber': self.barber.pk,
+            'start_date': self.monday.isoformat(),
+            'appointment_time': '10:00',
+            'interval_weeks': 2,
+            'occurrences': 6,
+        })
+        self.assertRedirects(response, reverse('booking:my_appointments'))
+        self.assertEqual(Appointment.objects.filter(customer=self.customer).count(), 6)
+
+
+@override_settings(WAITLIST_ASYNC=False)
+class WaitlistTest(TestCase):
+    def setUp(self):
+        from barbers.models import BarberAvailability
+        self.customer = User.objects.create_user(username='customer', password='password')
+        self.waiting = [User.objects.create_user(username=f'waiting{i}', password='password') for i in range(3)]
+        self.admin = User.objects.create_user(username='admin', password='password', is_staff=True)
+        barber_user = User.objects.create_user(username='barber_user', password='password')
+        self.barber = Barber.objects.create(user=barber_user, name='Test Barber', is_active=True)
+        self.service = Service.objects.create(name='Test Service', price=500, duration_minutes=30, is_active=True)
+        self.long_service = Service.objects.create(name='Long Service', price=900, duration_minutes=90, is_active=True)
+        BarberAvailability.objects.create(barber=self.barber, day_of_week=0, start_time=time(9, 0), end_time=time(17, 0))
+        self.monday = date(2030, 1, 7)
+        self.appointment = Appointment.objects.create(
+            customer=self.customer, barber=self.barber, service=self.service,
+            appointment_date=self.monday, appointment_time=time(10, 0)
+        )
+    
+    def join(self, customer, service=None, barber=None, start=time(9, 0), end=time(12, 0)):
+        from booking.models import WaitlistEntry
+        return WaitlistEntry.objects.create(
+            customer=customer, barber=barber, service=service or self.service,
+            date=self.monday, window_start=start, window_end=end
+        )
+    
+    def test_cancellation_promotes_oldest_fitting_entry(self):
+        # Window closes before the slot, then a service that doesn't fit before 10:30
+        self.join(self.waiting[0], end=time(10, 0))
+        Appointment.objects.create(customer=self.customer, barber=self.barber, service=self.service, appointment_date=self.monday, appointment_time=time(10, 30))
+        self.join(self.waiting[1], service=self.long_service)
+        fitting = self.join(self.waiting[2], barber=self.barber)
+        later = self.join(self.customer)
+    
+        self.client.login(username='customer', password='password')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('booking:cancel_appointment', args=[self.appointment.pk]))
+    
+        fitting.refresh_from_db()
+        self.assertEqual(fitting.status, 'promoted')
+        self.assertEqual(fitting.appointment.customer, self.waiting[2])
+        self.assertEqual(fitting.appointment.appointment_time, time(10, 0))
+        self.assertEqual(fitting.appointment.status, 'pending')
+        later.refresh_from_db()
+        self.assertEqual(later.status, 'waiting')
+    
+    def test_decline_promotes_any_barber_entry(self):
+        entry = self.join(self.waiting[0])
+        self.client.login(username='admin', password='password')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('booking:decline_appointment', args=[self.appointment.pk]))
+    
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'promoted')
+        self.assertEqual(entry.appointment.barber, self.barber)
+    
+    def test_no_promotion_when_slot_still_taken(self):
+        from booking.waitlist import promote_waitlist
+        entry = self.join(self.waiting[0])
+        self.assertIsNone(promote_waitlist(self.barber.pk, self.monday, time(10, 0)))
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'waiting')
+    
+    def test_failed_booking_leaves_entry_waiting(self):
+        from unittest import mock
+        from booking.waitlist import promote_waitlist
+        entry = self.join(self.waiting[0])
+        self.appointment.status = 'cancelled'
+        self.appointment.save()
+        with mock.patch('booking.waitlist.book_appointment', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                promote_waitlist(self.barber.pk, self.monday, time(10, 0))
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'waiting')
+    
+    def test_join_and_leave_waitlist_views(self):
+        from booking.models import WaitlistEntry
+        self.client.login(username='customer', password='password')
+        response = self.client.post(reverse('booking:join_waitlist'), {
+            'service': self.service.pk,
+            'barber': '',
+            'date': self.monday.isoformat(),
+            'window_start': '13:00',
+            'window_end': '12:00',
+        })
+        # The form comes back with its errors
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(WaitlistEntry.objects.exists())
+    
+        self.client.post(reverse('booking:join_waitlist'), {
+            'service': self.service.pk,
+            'barber': '',
+            'date': self.monday.isoformat(),
+            'window_start': '09:00',
+            'window_end': '12:00',
+        })
+        entry = WaitlistEntry.objects.get(customer=self.customer)
+        self.assertIsNone(entry.barber)
+    
+        self.client.post(reverse('booking:leave_waitlist', args=[entry.pk]))
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'cancelled')
+
+
+@override_settings(WAITLIST_ASYNC=False)
+class BulkTransitionTest(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='password')
+        self.admin = User.objects.create_user(username='admin', password='password', is_staff=True)
+        barber_user = User.objects.create_user(username='barber_user', password='password')
+        self.barber = Barber.objects.create(user=barber_user, name='Test Barber', is_active=True)
+        self.service = Service.objects.create(name='Test Service', price=500, duration_minutes=30, is_active=True)
+        self.appointments = [
+            Appointment.objects.create(
+                customer=self.customer, barber=self.barber, service=self.service,
+                appointment_date=date(2030, 1, 7), appointment_time=time(9 + hour, 0)
+            )
+            for hour in range(6)
+        ]
+    
+    def pks(self, appointments):
+        return [appointment.pk for appointment in appointments]
+    
+    def test_complete_reports_unpaid_and_wrong_status(self):
+        from booking.bookings import bulk_transition
+        paid, unpaid, pending = self.appointments[:3]
+        Appointment.objects.filter(pk__in=[paid.pk, unpaid.pk]).update(status='confirmed')
+        Payment.objects.create(appointment=paid, payment_method='gcash', amount=500, payment_status='paid')
+        Payment.objects.create(appointment=unpaid, payment_method='pay_after', amount=500)
+    
+        updated_ids, failures = bulk_transition([paid.pk, unpaid.pk, pending.pk, 9999], 'complete')
+        self.assertEqual(updated_ids, [paid.pk])
+        self.assertEqual(failures, [
+            (unpaid.pk, 'Payment has not been recorded'),
+            (pending.pk, 'Cannot complete a pending appointment'),
+            (9999, 'Appointment not found'),
+        ])
+        self.assertEqual(Appointment.objects.get(pk=paid.pk).status, 'completed')
+        self.assertEqual(Appointment.objects.get(pk=unpaid.pk).status, 'confirmed')
+    
+    def test_query_count_does_not_grow_with_selection(self):
+        from booking.bookings import bulk_transition
+        with CaptureQueriesContext(connection) as few:
+            bulk_transition(self.pks(self.appointments[:2]), 'approve')
+        with CaptureQueriesContext(connection) as many:
+            bulk_transition(self.pks(self.appointments[2:]), 'approve')
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(Appointment.objects.filter(status='confirmed').count(), 6)
+    
+    def test_decline_frees_slots(self):
+        from booking.bookings import bulk_transition
+        from booking.utils import get_available_slots
+        from barbers.models import BarberAvailability
+        BarberAvailability.objects.create(barber=self.barber, day_of_week=0, start_time=time(9, 0), end_time=time(17, 0))
+        get_available_slots(self.barber, date(2030, 1, 7))
+    
+        bulk_transition(self.pks(self.appointments[:2]), 'decline')
+        slots = {slot['time']: slot for slot in get_available_slots(self.barber, date(2030, 1, 7))}
+        self.assertTrue(slots[time(9, 0)]['available'])
+        self.assertFalse(slots[time(11, 0)]['available'])
+    
+    def test_bulk_view(self):
+        url = reverse('dashboard:bulk_update_appointments')
+        self.client.login(username='customer', password='password')
+        self.client.post(url, {'action': 'approve', 'appointment_ids': self.pks(self.appointments)})
+        self.assertFalse(Appointment.objects.filter(status='confirmed').exists())
+    
+        self.client.login(username='admin', password='password')
+        response = self.client.post(url, {
+            'action': 'approve',
+            'appointment_ids': self.pks(self.appointments),
+            'query': 'status=pending&order=oldest',
+        })
+        self.assertRedirects(response, reverse('dashboard:admin_appointments') + '?status=pending&order=oldest')
+        self.assertEqual(Appointment.objects.filter(status='confirmed').count(), 6)
+    
+    def test_admin_action(self):
+        self.admin.is_superuser = True
+        self.admin.save()
+        self.client.login(username='admin', password='password')
+        self.client.post(reverse('admin:booking_appointment_changelist'), {
+            'action': 'cancel_selected',
+            '_selected_action': self.pks(self.appointments[:3]),
+        })
+        self.assertEqual(Appointment.objects.filter(status='cancelled').count(), 3)
+
+
+class CalendarEventsTest(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='password')
+        self.admin = User.objects.create_user(username='admin', password='password', is_staff=True)
+        barber_user = User.objects.create_user(username='barber_user', password='password')
+        self.barber = Barber.objects.create(user=barber_user, name='Test Barber', is_active=True)
+        self.service = Service.objects.create(name='Test Service', price=500, duration_minutes=45, is_active=True)
+        self.client.login(username='admin', password='password')
+    
+    def fetch(self, start, end):
+        response = self.client.get(reverse('booking:calendar_events'), {'start': start.isoformat(), 'end': end.isoformat()})
+        return json.loads(b''.join(response.streaming_content))
+    
+    def test_event_fields(self):
+        appointment = Appointment.objects.create(
+            customer=self.customer, barber=self.barber, service=self.service,
+            appointment_date=date(2030, 1, 7), appointment_time=time(10, 30), status='confirmed'
+        )
+        self.assertEqual(self.fetch(date(2030, 1, 1), date(2030, 1, 31)), [{
+            'id': appointment.pk,
+            'title': 'customer: Test Service',
+            'start': '2030-01-07T10:30:00',
+            'end': '2030-01-07T11:15:00',
+            'color': '#27ae60',
+            'url': f'/booking/appointment/{appointment.pk}/',
+            'extendedProps': {'status': 'Confirmed/Scheduled', 'barber': 'Test Barber', 'customer': 'customer'},
+        }])
+        self.assertEqual(self.fetch(date(2030, 2, 1), date(2030, 2, 28)), [])
+    
+    def test_query_count_does_not_grow_with_range(self):
+        from booking.bookings import book_series
+        from booking.models import AppointmentSeries
+        from barbers.models import BarberAvailability
+        BarberAvailability.objects.create(barber=self.barber, day_of_week=0, start_time=time(9, 0), end_time=time(17, 0))
+        book_series(AppointmentSeries(
+            customer=self.customer, barber=self.barber, service=self.service,
+            start_date=date(2030, 1, 7), appointment_time=time(10, 0), interval_weeks=1, occurrences=20
+        ))
+    
+        with CaptureQueriesContext(connection) as one_week:
+            self.assertEqual(len(self.fetch(date(2030, 1, 7), date(2030, 1, 13))), 1)
+        with CaptureQueriesContext(connection) as months:
+            self.assertEqual(len(self.fetch(date(2030, 1, 1), date(2030, 6, 30))), 20)
+        self.assertEqual(len(one_week), len(months))
+    
+    def test_delta_sync(self):
+        from booking.events import SYNC_OVERLAP, make_sync_token
+        from django.utils import timezone
+        from datetime import timedelta
+        moved, cancelled, deleted, untouched = [
+            Appointment.objects.create(
+                customer=self.customer, barber=self.barber, service=self.service,
+                appointment_date=date(2030, 1, 7), appointment_time=time(9 + hour, 0)
+            )
+            for hour in range(4)
+        ]
+        params = {'start': '2030-01-01', 'end': '2030-01-31'}
+        response = self.client.get(reverse('booking:calendar_events'), params)
+        self.assertEqual(len(json.loads(b''.join(response.streaming_content))), 4)
+        token = response['X-Sync-Token']
+    
+        # Pretend the first fetch happened well before these changes
+        Appointment.objects.update(updated_at=timezone.now() - SYNC_OVERLAP * 2)
+        moved.appointment_date = date(2030, 3, 4)
+        moved.save()
+        cancelled.status = 'cancelled'
+        cancelled.save()
+        deleted_pk = deleted.pk
+        deleted.delete()
+    
+        old_token = make_sync_token(timezone.now() - SYNC_OVERLAP + timedelta(seconds=1))
+        response = self.client.get(reverse('booking:calendar_events'), dict(params, since=old_token))
+        delta = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(sorted(delta['deleted']), sorted([moved.pk, deleted_pk]))
+        self.assertEqual([(event['id'], event['color']) for event in delta['events']], [(cancelled.pk, '#c0392b')])
+        self.assertNotEqual(delta['sync_token'], token)
+    
+        # Customers only hear about their own deletions
+        User.objects.create_user(username='other', password='password')
+        self.client.login(username='other', password='password')
+        response = self.client.get(reverse('booking:calendar_events'), dict(params, since=old_token))
+        self.assertEqual(json.loads(b''.join(response.streaming_content))['deleted'], [])
+    
+        self.assertEqual(self.client.get(reverse('booking:calendar_events'), dict(params, since='junk')).status_code, 400)
+        self.assertEqual(self.client.get(reverse('booking:calendar_events'), dict(params, since='1')).status_code, 410)
+
+
+class IcsFeedTest(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='password')
+        barber_user = User.objects.create_user(username='barber_user', password='password')
+        self.barber = Barber.objects.create(user=barber_user, name='Test Barber', is_active=True)
+        other_user = User.objects.create_user(username='other_barber', password='password')
+        self.other_barber = Barber.objects.create(user=other_user, name='Other Barber', is_active=True)
+        self.service = Service.objects.create(name='Cut, Wash', price=500, duration_minutes=45, is_active=True)
+        self.appointment = Appointment.objects.create(
+            customer=self.customer, barber=self.barber, service=self.service,
+            appointment_date=date(2030, 1, 7), appointment_time=time(10, 0), queue_number=3
+        )
+        Appointment.objects.create(
+            customer=self.customer, barber=self.other_barber, service=self.service,
+            appointment_date=date(2030, 1, 7), appointment_time=time(11, 0)
+        )
+    
+    def feed_url(self, barber):
+        from booking.ics import feed_token
+        return reverse('booking:barber_ics_feed', args=[barber.pk, feed_token(barber.pk)])
+    
+    def test_barber_feed(self):
+        response = self.client.get(self.feed_url(self.barber))
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+        self.assertIn(f'UID:appointment-{self.appointment.pk}@testserver\r\n', body)
+        # 10:00 in Manila is 02:00 UTC
+        self.assertIn('DTSTART:20300107T020000Z\r\nDTEND:20300107T024500Z\r\n', body)
+        self.assertIn('SUMMARY:customer: Cut\\, Wash\r\n', body)
+        self.assertIn('STATUS:TENTATIVE\r\n', body)
+    
+        # Another barber's token doesn't open this feed
+        from booking.ics import feed_token
+        bad_url = reverse('booking:barber_ics_feed', args=[self.barber.pk, feed_token(self.other_barber.pk)])
+        self.assertEqual(self.client.get(bad_url).status_code, 404)
+    
+    def test_conditional_get(self):
+        url = self.feed_url(self.barber)
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+    
+        self.appointment.status = 'cancelled'
+        self.appointment.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('BEGIN:VEVENT', b''.join(response.streaming_content).decode())
+    
+    def test_if_modified_since_sees_removed_events(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        Appointment.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        url = self.feed_url(self.barber)
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+    
+        self.appointment.status = 'cancelled'
+        self.appointment.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+    
+        # Deletions count too
+        Appointment.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        last_modified = self.client.get(url)['Last-Modified']
+        Appointment.objects.get(pk=self.appointment.pk).delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+    
+    def test_shop_feed(self):
+        from booking.ics import feed_token
+        response = self.client.get(reverse('booking:shop_ics_feed', args=[feed_token('shop')]))
+        self.assertEqual(b''.join(response.streaming_content).decode().count('BEGIN:VEVENT'), 2)
+        self.assertEqual(self.client.get(reverse('booking:shop_ics_feed', args=['nope'])).status_code, 404)
+    
+    def test_barber_sees_own_feed_link(self):
+        self.client.login(username='barber_user', password='password')
+        response = self.client.get(reverse('booking:customer_calendar'))
+        self.assertContains(response, self.feed_url(self.barber))
+        self.assertNotContains(response, self.feed_url(self.other_barber))
+
+
+class CalendarSummaryTest(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='password')
+        self.admin = User.objects.create_user(username='admin', password='password', is_staff=True)
+        self.barbers = [
+            Barber.objects.create(user=User.objects.create_user(username=f'barber{i}', password='password'), name=f'Barber {i}')
+            for i in range(2)
+        ]
+        self.service = Service.objects.create(name='Test Service', price=500, duration_minutes=30, is_active=True)
+        for barber, hour, status in [(0, 9, 'pending'), (0, 10, 'confirmed'), (1, 9, 'confirmed'), (1, 10, 'cancelled')]:
+            Appointment.objects.create(
+                customer=self.customer, barber=self.barbers[barber], service=self.service,
+                appointment_date=date(2030, 1, 7), appointment_time=time(hour, 0), status=status
+            )
+        Appointment.objects.create(
+            customer=self.admin, barber=self.barbers[0], service=self.service,
+            appointment_date=date(2030, 1, 9), appointment_time=time(9, 0)
+        )
+    
+    def test_counts_per_day_and_status_in_one_query(self):
+        self.client.login(username='admin', password='password')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('booking:calendar_summary'), {'start': '2030-01-01', 'end': '2030-01-31', 'by_barber': '1'})
+        self.assertEqual(len([query for query in queries if 'booking_appointment' in query['sql']]), 1)
+        self.assertIn('X-Sync-Token', response)
+        self.assertEqual(response.json()['days'], {
+            '2030-01-07': {
+                'total': 4,
+                'statuses': {'pending': 1, 'confirmed': 2, 'cancelled': 1},
+                'barbers': {'Barber 0': {'pending': 1, 'confirmed': 1}, 'Barber 1': {'confirmed': 1, 'cancelled': 1}},
+            },
+            '2030-01-09': {'total': 1, 'statuses': {'pending': 1}, 'barbers': {'Barber 0': {'pending': 1}}},
+        })
+    
+    def test_customers_see_only_their_own_counts(self):
+        self.client.login(username='customer', password='password')
+        response = self.client.get(reverse('booking:calendar_summary'), {'start': '2030-01-01', 'end': '2030-01-31', 'by_barber': '1'})
+        self.assertEqual(response.json()['days'], {
+            '2030-01-07': {'total': 4, 'statuses': {'pending': 1, 'confirmed': 2, 'cancelled': 1}},
+        })
+        self.assertEqual(self.client.get(reverse('booking:calendar_summary'), {'start': '2030-01-01', 'end': '2032-01-01'}).status_code, 400)
+
+
+@override_settings(WAITLIST_ASYNC=False)
+class LiveEventsTest(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='password')
+        self.other = User.objects.create_user(username='other', password='password')
+        self.admin = User.objects.create_user(username='admin', password='password', is_staff=True)
+        self.barber_user = User.objects.create_user(username='barber_user', password='password')
+        self.barber = Barber.objects.create(user=self.barber_user, name='Test Barber', is_active=True)
+        self.service = Service.objects.create(name='Test Service', price=500, duration_minutes=30, is_active=True)
+        self.url = reverse('booking:live_events')
+    
+    def book(self, customer, hour):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Appointment.objects.create(
+                customer=customer, barber=self.barber, service=self.service,
+                appointment_date=date(2030, 1, 7), appointment_time=time(hour, 0)
+            )
+    
+    def test_changes_are_published(self):
+        from booking.bookings import bulk_transition
+        from booking.models import LiveEvent
+        mine = self.book(self.customer, 9)
+        theirs = self.book(self.other, 10)
+    
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_transition([mine.pk, theirs.pk], 'approve')
+        with self.captureOnCommitCallbacks(execute=True):
+            Payment.objects.create(appointment=mine, payment_method='gcash', amount=500, payment_status='paid')
+        with self.captureOnCommitCallbacks(execute=True):
+            mine.notes = 'No status change, no event'
+            mine.save()
+    
+        events = list(LiveEvent.objects.order_by('id').values_list('kind', 'appointment_id', 'payload'))
+        self.assertEqual([(kind, appointment_id) for kind, appointment_id, _ in events], [
+            ('created', mine.pk), ('created', theirs.pk),
+            ('status', mine.pk), ('status', theirs.pk),
+            ('payment', mine.pk),
+        ])
+        self.assertEqual(events[2][2], {'status': 'confirmed', 'date': '2030-01-07', 'time': '09:00'})
+        self.assertEqual(events[4][2]['payment_status'], 'paid')
+    
+    def test_catch_up_without_asgi(self):
+        from booking.models import LiveEvent
+        self.client.login(username='customer', password='password')
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response.content.decode(), 'retry: 15000\nid: 0\n\n')
+    
+        mine = self.book(self.customer, 9)
+        self.book(self.other, 10)
+        last = LiveEvent.objects.latest('id').pk
+    
+        # Customers only hear about their own appointments
+        body = self.client.get(self.url, HTTP_LAST_EVENT_ID='0').content.decode()
+        self.assertEqual(body.count('event: appointment'), 1)
+        self.assertIn(f'"appointment_id": {mine.pk}', body)
+        self.assertTrue(body.startswith(f'retry: 15000\nid: {last}\n\n'))
+    
+        # Barbers hear about everything booked with them, staff about everything
+        for username in ['barber_user', 'admin']:
+            self.client.login(username=username, password='password')
+            body = self.client.get(self.url, {'last_event_id': 0}).content.decode()
+            self.assertEqual(body.count('event: appointment'), 2)
+    
+    def test_late_commit_is_not_skipped(self):
+        from django.utils import timezone
+        from booking import live
+        from booking.live import Broadcaster, catch_up, events_after
+        from booking.models import LiveEvent
+        early, late = LiveEvent.objects.bulk_create([
+            LiveEvent(kind='created', appointment_id=n, customer_id=self.customer.pk, barber_id=self.barber.pk)
+            for n in [1, 2]
+        ])
+    
+        # The poller already read the higher id before the lower one committed
+        broadcaster = Broadcaster()
+        broadcaster.last_id, broadcaster.recent = late.pk, {late.pk: late.created_at}
+        self.assertEqual([event['id'] for event in broadcaster.fresh(events_after(broadcaster.last_id))], [early.pk])
+        self.assertEqual(broadcaster.fresh(events_after(broadcaster.last_id)), [])
+        self.assertEqual(broadcaster.last_id, late.pk)
+    
+        listener = live.audience(self.customer)
+        body = catch_up(listener, late.pk)
+        self.assertIn('"appointment_id": 1', body)
+        self.assertTrue(body.startswith(f'retry: {live.FALLBACK_RETRY_MS}\nid: {late.pk}\n\n'))
+    
+        # Outside the overlap only newer ids are read
+        LiveEvent.objects.update(created_at=timezone.now() - live.POLL_OVERLAP * 2)
+        self.assertEqual([event['id'] for event in events_after(early.pk)], [late.pk])
+        self.assertEqual(events_after(late.pk), [])
+    
+    def test_login_required(self):
+        self.assertRedirects(self.client.get(self.url), f"{reverse('accounts:login')}?next={self.url}", fetch_redirect_response=False)
+
+
+class LiveStreamTest(TransactionTestCase):
+    """Streams over ASGI; committed rows, because the poller reads on its own connection."""
+    
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='password')
+        barber_user = User.objects.create_user(username='barber_user', password='password')
+        self.barber = Barber.objects.create(user=barber_user, name='Test Barber', is_active=True)
+        self.service = Service.objects.create(name='Test Service', price=500, duration_minutes=30, is_active=True)
+    
+    async def test_stream_pushes_new_events(self):
+        import asyncio
+        from unittest import mock
+        from asgiref.sync import sync_to_async
+        from booking import live
+    
+        await self.async_client.aforce_login(self.customer)
+        with mock.patch.object(live, 'POLL_INTERVAL', 0.05):
+            response = await self.async_client.get(reverse('booking:live_events'))
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            content = aiter(response.streaming_content)
+            self.assertEqual(await anext(content), b'retry: 3000\nid: 0\n\n')
+    
+            appointment = await sync_to_async(Appointment.objects.create)(
+                customer=self.customer, barber=self.barber, service=self.service,
+                appointment_date=date(2030, 1, 7), appointment_time=time(9, 0)
+            )
+            chunk = (await asyncio.wait_for(anext(content), timeout=5)).decode()
+            await content.aclose()
+    
+        self.assertIn('event: appointment', chunk)
+        self.assertIn(f'"appointment_id": {appointment.pk}', chunk)
+        self.assertIn('"kind": "created"', chunk)
+
+
+class QueryPlanTest(TestCase):
+    """
+    EXPLAIN every query the busiest pages run against a large appointment
+    table, and fail if one of them reads the whole table, or most of it.
+    """
+    APPOINTMENTS = 20000
+    
+    # Tables that grow with bookings; small lookup tables may be scanned
+    LARGE_TABLES = {'booking_appointment', 'payments_payment'}
+    
+    # An index search the planner expects to read more of a large table than
+    # this is a full scan in all but name
+    MAX_READ_FRACTION = 0.5
+    
+    @classmethod
+    def setUpTestData(cls):
+        import random
+        from datetime import datetime, timedelta
+        from django.utils import timezone
+        from barbers.models import BarberAvailability
+    
+        rng = random.Random(22)
+        cls.admin = User.objects.create_user(username='admin', password='password', is_staff=True)
+        customers = User.objects.bulk_create([User(username=f'customer{n}') for n in range(50)])
+        cls.customer = customers[0]
+        cls.customer.set_password('password')
+        cls.customer.save()
+        cls.barbers = [
+            Barber.objects.create(user=User.objects.create_user(username=f'barber{n}'), name=f'Barber {n}')
+            for n in range(5)
+        ]
+        for barber in cls.barbers:
+            BarberAvailability.objects.bulk_create([
+                BarberAvailability(barber=barber, day_of_week=day, start_time=time(9, 0), end_time=time(18, 0))
+                for day in range(6)
+            ])
+        cls.service = Service.objects.create(name='Cut', price=300, duration_minutes=30)
+        Service.objects.create(name='Shave', price=200, duration_minutes=60)
+    
+        today = timezone.localdate()
+        statuses = ['completed'] * 6 + ['cancelled', 'declined', 'pending', 'confirmed']
+        appointments = []
+        taken = set()
+        while len(appointments) < cls.APPOINTMENTS:
+            n = len(appointments)
+            day = today + timedelta(days=rng.randint(-600, 60))
+            slot = time(9 + rng.randint(0, 8), rng.choice([0, 30]))
+            if (n % 5, day, slot) in taken:
+                continue
+            taken.add((n % 5, day, slot))
+            appointments.append(Appointment(
+                customer=customers[n % 50], barber=cls.barbers[n % 5], service=cls.service,
+                appointment_date=day, appointment_time=slot,
+                status=statuses[n % 10] if day < today else rng.choice(['pending', 'confirmed', 'cancelled']),
+            ))
+        Appointment.objects.bulk_create(appointments, batch_size=2000)
+        # Every booking gets a payment record; completed ones have been paid
+        Payment.objects.bulk_create([
+            Payment(
+                appointment=appointment, payment_method=rng.choice(['gcash', 'pay_after']), amount=300,
+                payment_status='paid', paid_at=timezone.make_aware(datetime.combine(appointment.appointment_date, time(12, 0))),
+            )
+            if appointment.status == 'completed' else
+            Payment(appointment=appointment, payment_method='pay_after', amount=300)
+            for appointment in appointments
+        ], batch_size=2000)
+    
+        # Give the planner real statistics, as production has
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    
+    def full_scans(self, sql):
+        """Plan lines that read all, or by the planner's estimate most, of a large table."""
+        import re
+    
+        aliases = {alias: table for table, alias in re.findall(r'"(\w+)" ([A-Z]\d+)\b', sql)}
+        scans = []
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Only fall back to a sequential scan when no index can serve the query
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN ' + sql)
+                plan = [line for (line,) in cursor.fetchall()]
+                # A page walked in index order stops early, whatever the scan node expects
+                paged = ' LIMIT ' in sql and not any('Sort' in line for line in plan)
+                for line in plan:
+                    match = re.search(r'(Seq Scan|Index Scan|Index Only Scan|Bitmap Heap Scan)(?: using \w+)? on (\w+).*rows=(\d+)', line)
+                    if not match or match.group(2) not in self.LARGE_TABLES:
+                        continue
+                    if match.group(1) == 'Seq Scan' or (not paged and int(match.group(3)) > self.MAX_READ_FRACTION * self.table_rows(match.group(2))):
+                        scans.append(line.strip())
+            else:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plan = [row[-1] for row in cursor.fetchall()]
+                paged = ' LIMIT ' in sql and not any('TEMP B-TREE' in line for line in plan)
+                for line in plan:
+                    match = re.match(r'(SCAN|SEARCH) (\w+)(?: USING (?:COVERING )?INDEX (\w+)(?: \((.*)\))?)?', line)
+                    if not match or aliases.get(match.group(2), match.group(2)) not in self.LARGE_TABLES:
+                        continue
+                    table = aliases.get(match.group(2), match.group(2))
+                    if match.group(1) == 'SCAN':
+                        # Walking an index in order is fine when the query stops after a page
+                        if not (match.group(3) and ' LIMIT ' in sql):
+                            scans.append(line)
+                    elif match.group(3) and not paged:
+                        estimate = self.sqlite_estimate(match.group(3), match.group(4), sql)
+                        if estimate > self.MAX_READ_FRACTION * self.table_rows(table):
+                            scans.append(f'{line} (~{estimate:.0f} rows)')
+        return scans
+    
+    def table_rows(self, table):
+        """Rows in a large table, as the planner's statistics record them."""
+        from booking.pagination import planner_estimate
+        from django.apps import apps
+    
+        model = next(model for model in apps.get_models() if model._meta.db_table == table)
+        return planner_estimate(model)
+    
+    def sqlite_estimate(self, index, constraints, sql):
+        """
+        Rows SQLite expects an index search to read.
+        
+        EXPLAIN QUERY PLAN prints no estimate, so this repeats the planner's
+        arithmetic: sqlite_stat1 gives the average rows per value of each
+        index prefix, an IN list multiplies that by its length, and without
+        STAT4 each range bound is assumed to keep a quarter of the rows.
+        """
+        import re
+    
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE idx = %s', [index])
+            stat = [int(part) for part in cursor.fetchone()[0].split() if part.isdigit()]
+        terms = constraints.split(' AND ') if constraints else []
+        equalities = [term[:-2] for term in terms if term.endswith('=?') and term[-3] not in '<>']
+    
+        estimate = stat[min(len(equalities), len(stat) - 1)]
+        for column in equalities:
+            values = re.search(rf'"{column}" IN \((?!SELECT)([^)]*)\)', sql)
+            if values:
+                estimate *= values.group(1).count(',') + 1
+        return estimate / 4 ** (len(terms) - len(equalities))
+    
+    def assert_no_full_scans(self, username, url, params=None, **headers):
+        from django.core.cache import cache
+    
+        cache.clear()
+        self.client.login(username=username, password='password')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {}, **headers)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, url)
+    
+        problems = []
+        for query in queries.captured_queries:
+            if query['sql'].lstrip().upper().startswith('SELECT'):
+                problems += [f"{scan}\n    {query['sql']}" for scan in self.full_scans(query['sql'])]
+        self.assertEqual(problems, [], f'Full or near-full table scans on {url}')
+    
+    def test_staff_pages(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from booking.ics import feed_token
+    
+        today = timezone.localdate()
+        month = {'start': (today - timedelta(days=3)).isoformat(), 'end': (today + timedelta(days=31)).isoformat()}
+        pages = [
+            (reverse('dashboard:home'), {}),
+            (reverse('dashboard:admin_appointments'), {}),
+            (reverse('dashboard:admin_appointments'), {'status': 'pending'}),
+            (reverse('dashboard:admin_appointments'), {'barber': self.barbers[1].pk}),
+            (reverse('dashboard:admin_appointments'), {'payment': 'paid', 'order': 'oldest'}),
+            (reverse('dashboard:admin_appointments'), {'date_from': month['start'], 'date_to': month['end'], 'count': '1'}),
+            (reverse('booking:calendar_events'), month),
+            (reverse('booking:calendar_summary'), dict(month, by_barber='1')),
+            (reverse('booking:shop_ics_feed', args=[feed_token('shop')]), {}),
+            (reverse('booking:barber_ics_feed', args=[self.barbers[0].pk, feed_token(self.barbers[0].pk)]), {}),
+            (reverse('reports:revenue_report'), {'start': (today - timedelta(days=365)).isoformat(), 'period': 'month', 'by': 'barber'}),
+            (reverse('reports:utilization_report'), {}),
+        ]
+        for url, params in pages:
+            with self.subTest(url=url, params=params):
+                self.assert_no_full_scans('admin', url, params)
+    
+        first_page = self.client.get(reverse('dashboard:admin_appointments'), {'status': 'completed'})
+        self.assert_no_full_scans(
+            'admin', reverse('dashboard:admin_appointments'), {'status': 'completed', 'after': first_page.context['next_cursor']}
+        )
+    
+    def test_customer_pages(self):
+        from datetime import timedelta
+        from django.utils import timezone
+    
+        today = timezone.localdate()
+        pages = [
+            (reverse('dashboard:home'), {}),
+            (reverse('booking:my_appointments'), {}),
+            (reverse('booking:calendar_events'), {'start': today.isoformat(), 'end': (today + timedelta(days=31)).isoformat()}),
+            (reverse('booking:available_slots'), {'barber_id': self.barbers[0].pk, 'date': (today + timedelta(days=2)).isoformat(), 'service_id': self.service.pk}),
+            (reverse('booking:availability'), {'start': (today + timedelta(days=1)).isoformat(), 'service_id': self.service.pk}),
+            (reverse('booking:next_available'), {'service_id': self.service.pk}),
+        ]
+        for url, params in pages:
+            with self.subTest(url=url, params=params):
+                self.assert_no_full_scans('customer0', url, params)
+
+
+@override_settings(WAITLIST_ASYNC=False)
+class ArchiveTest(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from reports.rollup import rebuild
+        self.customer = User.objects.create_user(username='customer', password='password')
+        self.admin = User.objects.create_user(username='admin', password='password', is_staff=True)
+        self.barber = Barber.objects.create(user=User.objects.create_user(username='barber'), name='Barber')
+        self.service = Service.objects.create(name='Cut', price=300, duration_minutes=30)
+        self.today = timezone.localdate()
+        self.old = self.today - timedelta(days=200)
+        self.recent = self.today - timedelta(days=10)
+    
+        def book(day, hour, status, payment_status=None):
+            appointment = Appointment.objects.create(
+                customer=self.customer, barber=self.barber, service=self.service,
+                appointment_date=day, appointment_time=time(hour, 0), status=status
+            )
+            if payment_status:
+                Payment.objects.create(
+                    appointment=appointment, payment_method='gcash', amount=300, payment_status=payment_status,
+                    paid_at=timezone.now() if payment_status == 'paid' else None
+                )
+            return appointment
+    
+        self.paid = book(self.old, 9, 'completed', 'paid')
+        self.cancelled = book(self.old, 10, 'cancelled', 'pending')
+        self.declined = book(self.old, 11, 'declined')
+        # Still owed money, still to happen, or too recent: these stay live
+        self.unpaid = book(self.old, 12, 'completed', 'pending')
+        self.pending = book(self.old, 13, 'pending')
+        self.fresh = book(self.recent, 9, 'completed', 'paid')
+        list(rebuild(self.old, self.recent))
+    
+    def test_archives_finished_appointments_in_resumable_batches(self):
+        from booking.archive import archive, archive_cutoff
+        from booking.models import ArchivedAppointment, DeletedAppointment, LiveEvent
+        from payments.models import ArchivedPayment
+        from reports.models import DailyShopStats
+        from reports.rollup import rebuild
+        from reports.revenue import revenue_report
+    
+        def rollup():
+            return sorted(DailyShopStats.objects.values_list('date', 'booked', 'completed', 'cancelled', 'declined', 'booked_minutes', 'revenue'))
+    
+        before = rollup()
+        revenue_before = revenue_report(self.old, self.today)[1]
+        live_events = LiveEvent.objects.count()
+    
+        # Stop after the first batch, as if interrupted, then run again
+        batches = archive(archive_cutoff(90), batch_size=2)
+        self.assertEqual(next(batches), (2, 2))
+        self.assertEqual(list(archive(archive_cutoff(90), batch_size=2)), [(1, 0)])
+    
+        archived = [self.paid.pk, self.cancelled.pk, self.declined.pk]
+        self.assertEqual(sorted(ArchivedAppointment.objects.values_list('pk', flat=True)), archived)
+        self.assertEqual(
+            sorted(Appointment.objects.values_list('pk', flat=True)), [self.unpaid.pk, self.pending.pk, self.fresh.pk]
+        )
+        self.assertEqual(ArchivedPayment.objects.get(appointment_id=self.paid.pk).amount, 300)
+        self.assertFalse(Payment.objects.filter(appointment_id__in=archived).exists())
+        declined = ArchivedAppointment.objects.get(pk=self.declined.pk)
+        self.assertEqual((declined.status, declined.duration_minutes, declined.price), ('declined', 30, 300))
+    
+        # Nothing downstream sees the move as a deletion
+        self.assertEqual(rollup(), before)
+        self.assertFalse(DeletedAppointment.objects.exists())
+        self.assertEqual(LiveEvent.objects.count(), live_events)
+        # Reports read across both tables, and a rebuild counts archived rows too
+        self.assertEqual(revenue_report(self.old, self.today)[1], revenue_before)
+        list(rebuild(self.old, self.recent))
+        self.assertEqual(rollup(), before)
+    
+    def test_history_and_detail_include_archived(self):
+        from django.core.management import call_command
+        from io import StringIO
+        call_command('archive_appointments', '--days', '90', stdout=StringIO())
+    
+        self.client.login(username='customer', password='password')
+        response = self.client.get(reverse('booking:my_appointments'))
+        self.assertEqual(
+            [appointment.pk for appointment in response.context['appointments']],
+            [self.fresh.pk, self.pending.pk, self.unpaid.pk, self.declined.pk, self.cancelled.pk, self.paid.pk]
+        )
+        response = self.client.get(reverse('booking:appointment_detail', args=[self.paid.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['appointment'].is_archived)
+    
+        self.client.login(username='admin', password='password')
+        response = self.client.get(reverse('booking:appointment_detail', args=[self.cancelled.pk]))
+        self.assertNotContains(response, 'Mark as Paid')
+
+
+class AdminChangelistTest(TestCase):
+    def setUp(self):
+        User.objects.create_superuser(username='admin', password='password', email='admin@test.com')
+        self.customers = [User.objects.create_user(username=f'customer{n}') for n in range(3)]
+        self.barbers = [Barber.objects.create(user=User.objects.create_user(username=f'barber{n}'), name=f'Barber {n}') for n in range(3)]
+        self.services = [Service.objects.create(name=f'Service {n}', price=300, duration_minutes=30) for n in range(3)]
+        self.client.login(username='admin', password='password')
+    
+    def book(self, count):
+        from datetime import timedelta
+        start = Appointment.objects.count()
+        Appointment.objects.bulk_create([
+            Appointment(
+                customer=self.customers[n % 3], barber=self.barbers[n % 3], service=self.services[n % 3],
+                appointment_date=date(2030, 1, 1) + timedelta(days=n), appointment_time=time(9, 0)
+            )
+            for n in range(start, start + count)
+        ])
+    
+    def changelist_queries(self, name):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(f'admin:{name}_changelist'))
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries.captured_queries]
+    
+    def assert_constant_queries(self, name, add_rows):
+        add_rows(2)
+        few = self.changelist_queries(name)
+        add_rows(40)
+        many = self.changelist_queries(name)
+        self.assertEqual(len(few), len(many), '\n'.join(many))
+        return many
+    
+    def test_appointment_changelist_queries_dont_grow_with_rows(self):
+        queries = self.assert_constant_queries('booking_appointment', self.book)
+        # Small tables without statistics are counted once, exactly
+        self.assertEqual(sum('COUNT(*)' in sql for sql in queries), 1)
+    
+    def test_month_filter_drills_down_by_date_range(self):
+        self.book(40)
+        url = reverse('admin:booking_appointment_changelist')
+    
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, '?month=2030')
+        self.assertFalse([query['sql'] for query in queries.captured_queries if 'DISTINCT' in query['sql']])
+    
+        response = self.client.get(url, {'month': '2030'})
+        self.assertEqual(response.context['cl'].result_count, 40)
+        self.assertContains(response, '?month=2030-02')
+        # 2030-01-01 plus 39 days runs to February 9th
+        self.assertEqual(self.client.get(url, {'month': '2030-02'}).context['cl'].result_count, 9)
+        self.assertRedirects(self.client.get(url, {'month': '2030-13'}), f'{url}?e=1', fetch_redirect_response=False)
+    
+    def test_payment_changelist_queries_dont_grow_with_rows(self):
+        def pay(count):
+            self.book(count)
+            Payment.objects.bulk_create([
+                Payment(appointment=appointment, amount=appointment.price, payment_method='pay_after')
+                for appointment in Appointment.objects.filter(payment__isnull=True)
+            ])
+        
+        self.assert_constant_queries('payments_payment', pay)
+    
+    def test_waitlist_changelist_queries_dont_grow_with_rows(self):
+        from booking.models import WaitlistEntry
+        
+        def wait(count):
+            WaitlistEntry.objects.bulk_create([
+                WaitlistEntry(
+                    customer=self.customers[n % 3], barber=self.barbers[n % 3], service=self.services[n % 3],
+                    date=date(2030, 1, 1), window_start=time(9, 0), window_end=time(12, 0)
+                )
+                for n in range(count)
+            ])
+        
+        self.assert_constant_queries('booking_waitlistentry', wait)
+    
+    def test_unfiltered_count_uses_estimate_on_big_tables(self):
+        from unittest import mock
+        from booking.pagination import EstimatedCountPaginator
+        
+        self.book(20)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        # Statistics now lag behind the table, as they do between ANALYZE runs
+        self.book(5)
+        
+        with mock.patch('booking.pagination.ESTIMATE_ABOVE', 10):
+            self.assertEqual(EstimatedCountPaginator(Appointment.objects.all(), 10).count, 20)
+            self.assertEqual(EstimatedCountPaginator(Appointment.objects.filter(status='pending'), 10).count, 25)
+        with mock.patch('booking.pagination.ESTIMATE_ABOVE', 100):
+            self.assertEqual(EstimatedCountPaginator(Appointment.objects.all(), 10).count, 25)
@@ -7,6 +7,9 @@ app_name = 'booking'
 
 urlpatterns = [
     path('create/', views.create_appointment, name='create'),
+    path('series/create/', views.create_series, name='create_series'),
+    path('waitlist/', views.join_waitlist, name='join_waitlist'),
+    path('waitlist/<int:pk>/leave/', views.leave_waitlist, name='leave_waitlist'),
     path('my-appointments/', views.my_appointments, name='my_appointments'),
     path('appointment/<int:pk>/', views.appointment_detail, name='appointment_detail'),
     path('appointment/<int:pk>/cancel/', views.cancel_appointment, name='cancel_appointment'),
@@ -17,6 +20,13 @@ urlpatterns = [
     path('appointment/<int:pk>/confirmation/', views.booking_confirmation, name='confirmation'),
     path('calendar/admin/', views.admin_calendar, name='admin_calendar'),
     path('calendar/my/', views.customer_calendar, name='customer_calendar'),
+    path('feeds/barber/<int:barber_id>/<str:token>.ics', views.barber_ics_feed, name='barber_ics_feed'),
+    path('feeds/shop/<str:token>.ics', views.shop_ics_feed, name='shop_ics_feed'),
     path('api/calendar-events/', views.get_calendar_events, name='calendar_events'),
+    path('api/calendar-summary/', views.get_calendar_summary, name='calendar_summary'),
     path('api/available-slots/', views.get_available_slots, name='available_slots'),
+    path('api/availability/', views.get_availability, name='availability'),
+    path('api/next-available/', views.get_next_available, name='next_available'),
+    path('api/hold-slot/', views.hold_slot, name='hold_slot'),
+    path('api/live/', views.live_events, name='live_events'),
 ]
\ No newline at end of file
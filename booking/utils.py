@@ -1,8 +1,13 @@
 # booking/utils.py
 
 from datetime import datetime, time, timedelta
+from django.db.models import F, Q
+from . import slot_index
 from .models import Appointment
-from barbers.models import BarberAvailability
+from .intervals import ACTIVE_STATUSES, load_interval_indexes, to_minutes
+from .holds import held_masks
+
+MINUTES_PER_DAY = 24 * 60
 
 
 def generate_time_slots(start_time=time(9, 0), end_time=time(18, 0), interval_minutes=30, lunch_break=True):
@@ -36,61 +41,88 @@ def generate_time_slots(start_time=time(9, 0), end_time=time(18, 0), interval_mi
     return slots
 
 
-def get_available_slots(barber, date, service=None):
+def get_available_slots(barber, date, service=None, customer=None):
     """
     Get available time slots for a specific barber on a specific date.
     
+    Answered from the slot index plus the live holds, so a warm day costs
+    two small queries and never touches the appointments table.
+    
     Args:
         barber: Barber instance
         date: Date object for the appointment
         service: Service instance (optional, for duration calculation)
+        customer: User whose own holds should not count as taken (optional)
     
     Returns:
         List of dictionaries with time and availability status
     """
-    # Generate all possible time slots
-    all_slots = generate_time_slots()
+    working_mask, booked_mask = slot_index.get_bitmap(barber.pk, date)
+    held_mask = held_masks([barber.pk], [date], exclude_customer=customer).get((barber.pk, date), 0)
+    return _build_slots(generate_time_slots(), working_mask, booked_mask, _duration(service), held_mask)
+
+
+def _duration(service):
+    """Minutes a booking occupies; a single slot when no service is chosen yet."""
+    return service.duration_minutes if service else slot_index.CELL_MINUTES
+
+
+def _build_slots(all_slots, working_mask, booked_mask, duration_minutes, held_mask=0):
+    """
+    Build the slot list for one barber on one day from its index masks.
     
-    # Get day of week (0=Monday, 6=Sunday)
-    day_of_week = date.weekday()
+    Args:
+        all_slots: List of time objects from generate_time_slots()
+        working_mask: Bitmask of cells inside the barber's working hours
+        booked_mask: Bitmask of cells already taken
+        duration_minutes: How long the booking needs, in minutes
+        held_mask: Bitmask of cells held by other customers mid-booking
     
-    # Check if barber is available on this day
-    try:
-        barber_availability = BarberAvailability.objects.get(
-            barber=barber,
-            day_of_week=day_of_week,
-            is_available=True
-        )
-    except BarberAvailability.DoesNotExist:
-        # Barber not available on this day
+    Returns:
+        List of dictionaries with time and availability status
+    """
+    if not working_mask:
         return [{'time': slot, 'available': False, 'reason': 'Barber not working'} for slot in all_slots]
     
-    # Get existing appointments for this barber on this date
-    existing_appointments = Appointment.objects.filter(
-        barber=barber,
-        appointment_date=date,
-        status__in=['pending', 'confirmed']
-    ).values_list('appointment_time', flat=True)
-    
-    booked_times = set(existing_appointments)
-    
-    # Build available slots list
     available_slots = []
     for slot in all_slots:
+        bit = slot_index.bit_for(slot)
+        needed = slot_index.appointment_mask(slot, duration_minutes)
         # Check if within barber's working hours
-        if slot < barber_availability.start_time or slot >= barber_availability.end_time:
+        if not working_mask & bit:
             available_slots.append({
                 'time': slot,
                 'available': False,
                 'reason': 'Outside working hours'
             })
         # Check if already booked
-        elif slot in booked_times:
+        elif booked_mask & bit:
             available_slots.append({
                 'time': slot,
                 'available': False,
                 'reason': 'Already booked'
             })
+        # Check if another customer is in the middle of booking it
+        elif held_mask & needed:
+            available_slots.append({
+                'time': slot,
+                'available': False,
+                'reason': 'Held by another customer'
+            })
+        # Check if the whole service fits before the next booking
+        elif booked_mask & needed:
+            available_slots.append({
+                'time': slot,
+                'available': False,
+                'reason': 'Overlaps another booking'
+            })
+        # Check if the whole service fits before closing
+        elif working_mask & needed != needed:
+            available_slots.append({
+                'time': slot,
+                'available': False,
+                'reason': 'Runs past working hours'
+            })
         else:
             available_slots.append({
                 'time': slot,
@@ -101,7 +133,42 @@ def get_available_slots(barber, date, service=None):
     return available_slots
 
 
-def check_slot_availability(barber, date, time_slot):
+def get_availability_matrix(barbers, start_date, end_date, service=None, customer=None):
+    """
+    Get available time slots for several barbers over a date range.
+    
+    Reads the slot index and the live holds in one query each; any days not
+    indexed yet are built together in a fixed number of extra queries,
+    however many barbers or days are requested.
+    
+    Args:
+        barbers: Iterable of Barber instances
+        start_date: First date of the range (inclusive)
+        end_date: Last date of the range (inclusive)
+        service: Service instance (optional, for duration calculation)
+        customer: User whose own holds should not count as taken (optional)
+    
+    Returns:
+        Dictionary mapping barber id to a dictionary of date -> slot list
+        (same slot format as get_available_slots)
+    """
+    barber_ids = [barber.pk for barber in barbers]
+    dates = slot_index.date_range(start_date, end_date)
+    all_slots = generate_time_slots()
+    bitmaps = slot_index.get_bitmaps(barber_ids, dates)
+    held = held_masks(barber_ids, dates, exclude_customer=customer)
+    duration = _duration(service)
+    
+    return {
+        barber_id: {
+            day: _build_slots(all_slots, *bitmaps[(barber_id, day)], duration, held.get((barber_id, day), 0))
+            for day in dates
+        }
+        for barber_id in barber_ids
+    }
+
+
+def check_slot_availability(barber, date, time_slot, service=None):
     """
     Check if a specific time slot is available for booking.
     
@@ -109,6 +176,7 @@ def check_slot_availability(barber, date, time_slot):
         barber: Barber instance
         date: Date object
         time_slot: Time object
+        service: Service instance (optional, for duration calculation)
     
     Returns:
         Tuple (is_available: bool, reason: str)
@@ -121,36 +189,124 @@ def check_slot_availability(barber, date, time_slot):
     if date == datetime.now().date() and time_slot <= datetime.now().time():
         return False, "Time slot has passed"
     
-    # Get day of week
-    day_of_week = date.weekday()
+    working_mask, booked_mask = slot_index.get_bitmap(barber.pk, date)
+    bit = slot_index.bit_for(time_slot)
     
-    # Check barber availability for this day
-    try:
-        barber_availability = BarberAvailability.objects.get(
-            barber=barber,
-            day_of_week=day_of_week,
-            is_available=True
-        )
-        
-        if time_slot < barber_availability.start_time or time_slot >= barber_availability.end_time:
-            return False, "Outside barber's working hours"
-    except BarberAvailability.DoesNotExist:
+    if not working_mask:
         return False, "Barber not available on this day"
     
-    # Check if slot is already booked
-    existing = Appointment.objects.filter(
-        barber=barber,
-        appointment_date=date,
-        appointment_time=time_slot,
-        status__in=['pending', 'confirmed']
-    ).exists()
+    if not working_mask & bit:
+        return False, "Outside barber's working hours"
     
-    if existing:
+    if booked_mask & bit:
         return False, "Time slot already booked"
     
+    needed = slot_index.appointment_mask(time_slot, _duration(service))
+    if booked_mask & needed:
+        return False, "Overlaps another booking"
+    
+    if working_mask & needed != needed:
+        return False, "Runs past barber's working hours"
+    
     return True, "Available"
 
 
+def has_overlap(barber, date, time_slot, duration_minutes, exclude_pk=None):
+    """
+    Check whether a booking would overlap an existing pending/confirmed one.
+    
+    Exact to the minute, unlike the 30-minute cells of the slot index, so
+    this is the check used before writing an appointment. Runs as a single
+    EXISTS on the stored start and end times, inside the barber's day on
+    the (barber, date, time) index.
+    
+    Args:
+        barber: Barber instance
+        date: Date object
+        time_slot: Time object for the start
+        duration_minutes: Booking length in minutes
+        exclude_pk: Appointment id to ignore (the one being rescheduled)
+    
+    Returns:
+        True if [time_slot, time_slot + duration) overlaps another booking
+    """
+    overlapping = Appointment.objects.filter(
+        # An end before the start means the booking runs past midnight
+        Q(end_time__gt=time_slot) | Q(end_time__lt=F('appointment_time')),
+        barber_id=barber.pk,
+        appointment_date=date,
+        status__in=ACTIVE_STATUSES
+    )
+    if to_minutes(time_slot) + duration_minutes < MINUTES_PER_DAY:
+        overlapping = overlapping.filter(appointment_time__lt=get_appointment_end_time(time_slot, duration_minutes))
+    if exclude_pk:
+        overlapping = overlapping.exclude(pk=exclude_pk)
+    return overlapping.exists()
+
+
+def find_next_available(service, after=None, limit=5, horizon_days=90, barbers=None, batch_days=14):
+    """
+    Find the earliest openings for a service with any active barber.
+    
+    Scans forward day by day from `after`, loading bookings for every barber
+    a batch of days at a time (one query per batch), and stops as soon as
+    `limit` openings are found.
+    
+    Args:
+        service: Service instance to fit
+        after: Datetime to search from (default: now)
+        limit: Number of openings to return
+        horizon_days: How many days ahead to search
+        barbers: Iterable of Barber instances (default: all active barbers)
+        batch_days: Days of bookings to load per query
+    
+    Returns:
+        List of dictionaries with barber, date and time, earliest first
+    """
+    from barbers.models import Barber, BarberAvailability
+    
+    after = after or datetime.now()
+    if barbers is None:
+        barbers = Barber.objects.filter(is_active=True).order_by('name')
+    barbers = list(barbers)
+    
+    schedules = {}
+    for availability in BarberAvailability.objects.filter(barber__in=barbers, is_available=True):
+        schedules.setdefault(availability.day_of_week, {})[availability.barber_id] = (
+            to_minutes(availability.start_time),
+            to_minutes(availability.end_time),
+        )
+    
+    # Only days on which somebody works are worth loading
+    days = [
+        day for day in slot_index.date_range(after.date(), after.date() + timedelta(days=horizon_days - 1))
+        if schedules.get(day.weekday())
+    ]
+    all_slots = generate_time_slots()
+    duration = service.duration_minutes
+    
+    results = []
+    for batch_start in range(0, len(days), batch_days):
+        batch = days[batch_start:batch_start + batch_days]
+        indexes = load_interval_indexes([barber.pk for barber in barbers], batch)
+        
+        for day in batch:
+            working = schedules[day.weekday()]
+            slots = [slot for slot in all_slots if day > after.date() or slot > after.time()]
+            for slot in slots:
+                start = to_minutes(slot)
+                for barber in barbers:
+                    if barber.pk not in working:
+                        continue
+                    opens, closes = working[barber.pk]
+                    if indexes[(barber.pk, day)].fits(start, duration, opens, closes):
+                        results.append({'barber': barber, 'date': day, 'time': slot})
+                        if len(results) >= limit:
+                            return results
+    
+    return results
+
+
 def format_time_slot(time_obj):
     """Format time object to 12-hour format string."""
     return time_obj.strftime('%I:%M %p')
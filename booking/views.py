@@ -3,11 +3,21 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import Appointment
-from .forms import AppointmentForm
+from .models import Appointment, ArchivedAppointment, WaitlistEntry
+from .forms import AppointmentForm, AppointmentSeriesForm, WaitlistForm
+from .bookings import book_appointment, book_series, SlotTakenError
 from payments.models import Payment
 from services.models import Service
 
+# Longest range the availability grid API will build in one request
+MAX_AVAILABILITY_DAYS = 31
+
+# Most openings the next-available API returns in one request
+MAX_NEXT_AVAILABLE_RESULTS = 20
+
+# Longest range the calendar summary API counts in one request
+MAX_SUMMARY_DAYS = 366
+
 @login_required
 def create_appointment(request):
     if request.method == 'POST':
@@ -16,14 +26,11 @@ def create_appointment(request):
             appointment = form.save(commit=False)
             appointment.customer = request.user
             
-            # Set queue number for the day
-            from django.db.models import Max
-            today_max = Appointment.objects.filter(
-                appointment_date=appointment.appointment_date
-            ).aggregate(Max('queue_number'))['queue_number__max'] or 0
-            appointment.queue_number = today_max + 1
-            
-            appointment.save()
+            try:
+                book_appointment(appointment)
+            except SlotTakenError as e:
+                form.add_error(None, str(e))
+                return render(request, 'booking/create_appointment.html', {'form': form}, status=409)
             
             # Store appointment ID in session for payment
             request.session['appointment_id'] = appointment.id
@@ -37,21 +44,90 @@ def create_appointment(request):
     return render(request, 'booking/create_appointment.html', {'form': form})
 
 
+@login_required
+def create_series(request):
+    """Book the same barber, service and time every few weeks in one go."""
+    conflicts = []
+    
+    if request.method == 'POST':
+        form = AppointmentSeriesForm(request.POST)
+        if form.is_valid():
+            series = form.save(commit=False)
+            series.customer = request.user
+            appointments, conflicts = book_series(series)
+            
+            if appointments:
+                messages.success(request, f'{len(appointments)} of {series.occurrences} appointments booked.')
+                for day, reason in conflicts:
+                    messages.warning(request, f'{day:%b %d, %Y} was skipped: {reason}.')
+                return redirect('booking:my_appointments')
+            
+            form.add_error(None, 'None of the dates in this series are available. Please try another time or barber.')
+    else:
+        form = AppointmentSeriesForm()
+    
+    return render(request, 'booking/create_series.html', {'form': form, 'conflicts': conflicts})
+
+
+@login_required
+def join_waitlist(request):
+    """Ask to be booked automatically if a slot opens up within a time window."""
+    if request.method == 'POST':
+        form = WaitlistForm(request.POST)
+        if form.is_valid():
+            entry = form.save(commit=False)
+            entry.customer = request.user
+            entry.save()
+            
+            messages.success(request, "You're on the waitlist. We'll book you automatically if a matching slot opens up.")
+            return redirect('booking:join_waitlist')
+    else:
+        form = WaitlistForm()
+    
+    entries = WaitlistEntry.objects.filter(
+        customer=request.user, status='waiting'
+    ).select_related('barber', 'service').order_by('date', 'window_start')
+    
+    return render(request, 'booking/join_waitlist.html', {'form': form, 'entries': entries})
+
+
+@login_required
+def leave_waitlist(request, pk):
+    entry = get_object_or_404(WaitlistEntry, pk=pk, customer=request.user)
+    
+    if request.method == 'POST' and entry.status == 'waiting':
+        entry.status = 'cancelled'
+        entry.save()
+        messages.success(request, 'You have left the waitlist.')
+    
+    return redirect('booking:join_waitlist')
+
+
 @login_required
 def my_appointments(request):
-    appointments = Appointment.objects.filter(
-        customer=request.user
-    ).select_related('barber', 'service', 'payment').order_by('-appointment_date', '-appointment_time')
+    from itertools import chain
+    
+    # Older finished appointments live in the archive; show them alongside the rest
+    appointments = sorted(
+        chain(
+            Appointment.objects.filter(customer=request.user).select_related('barber', 'service', 'payment'),
+            ArchivedAppointment.objects.filter(customer=request.user).select_related('barber', 'service', 'payment'),
+        ),
+        key=lambda appointment: (appointment.appointment_date, appointment.appointment_time),
+        reverse=True
+    )
     
     return render(request, 'booking/my_appointments.html', {'appointments': appointments})
 
 
 @login_required
 def appointment_detail(request, pk):
-    appointment = get_object_or_404(
-        Appointment.objects.select_related('barber', 'service', 'customer'),
-        pk=pk
-    )
+    appointment = Appointment.objects.select_related('barber', 'service', 'customer').filter(pk=pk).first()
+    if appointment is None:
+        appointment = get_object_or_404(
+            ArchivedAppointment.objects.select_related('barber', 'service', 'customer', 'payment'),
+            pk=pk
+        )
     
     # Check permission
     if not request.user.is_staff and appointment.customer != request.user:
@@ -156,25 +232,43 @@ def admin_calendar(request):
     if not request.user.is_staff:
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('dashboard:home')
-    return render(request, 'booking/admin_calendar.html')
+    
+    from django.urls import reverse
+    from barbers.models import Barber
+    from .ics import feed_token
+    
+    feeds = [('All barbers', reverse('booking:shop_ics_feed', args=[feed_token('shop')]))] + [
+        (barber.name, reverse('booking:barber_ics_feed', args=[barber.pk, feed_token(barber.pk)]))
+        for barber in Barber.objects.filter(is_active=True).order_by('name')
+    ]
+    feeds = [(name, request.build_absolute_uri(url)) for name, url in feeds]
+    
+    return render(request, 'booking/admin_calendar.html', {'feeds': feeds})
 
 
 @login_required
 def customer_calendar(request):
-    return render(request, 'booking/customer_calendar.html')
+    from django.urls import reverse
+    from barbers.models import Barber
+    from .ics import feed_token
+    
+    # Barbers get a link to subscribe to their own schedule
+    feeds = [
+        (barber.name, request.build_absolute_uri(reverse('booking:barber_ics_feed', args=[barber.pk, feed_token(barber.pk)])))
+        for barber in Barber.objects.filter(user=request.user)
+    ]
+    
+    return render(request, 'booking/customer_calendar.html', {'feeds': feeds})
 
 
-@login_required
-def get_calendar_events(request):
-    """API endpoint for FullCalendar events."""
-    from django.http import JsonResponse
-    from datetime import datetime
+def _parse_calendar_range(start_str, end_str):
+    """
+    Turn FullCalendar's start/end parameters into dates.
     
-    start_str = request.GET.get('start')
-    end_str = request.GET.get('end')
-    
-    if not start_str or not end_str:
-        return JsonResponse({'error': 'Missing start or end parameters'}, status=400)
+    Raises:
+        ValueError: If either can't be parsed
+    """
+    from datetime import datetime
     
     # FullCalendar uses ISO8601 strings
     try:
@@ -185,51 +279,202 @@ def get_calendar_events(request):
         # Fallback if fromisoformat fails
         start_date = datetime.strptime(start_str[:10], '%Y-%m-%d').date()
         end_date = datetime.strptime(end_str[:10], '%Y-%m-%d').date()
+    return start_date, end_date
+
 
+@login_required
+def get_calendar_events(request):
+    """
+    API endpoint for FullCalendar events, streamed as a JSON array.
+    
+    Every response carries an X-Sync-Token header. Passing it back as
+    ?since= returns only what changed after it, as an object with a new
+    sync_token, the ids of deleted events and the changed events.
+    """
+    import json
+    from django.db.models import Q
+    from django.http import JsonResponse, StreamingHttpResponse
+    from .events import (
+        calendar_events, stream_json_array, make_sync_token, parse_sync_token,
+        token_expired, changed_since, deleted_since
+    )
+    
+    start_str = request.GET.get('start')
+    end_str = request.GET.get('end')
+    
+    if not start_str or not end_str:
+        return JsonResponse({'error': 'Missing start or end parameters'}, status=400)
+    
+    try:
+        start_date, end_date = _parse_calendar_range(start_str, end_str)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid start or end parameters'}, status=400)
+    
+    # Taken before reading, so anything that changes while we read is sent again next time
+    sync_token = make_sync_token()
+    
     if request.user.is_staff:
-        appointments = Appointment.objects.filter(
-            appointment_date__range=[start_date, end_date]
-        ).select_related('customer', 'service', 'barber')
+        appointments = Appointment.objects.all()
     else:
-        appointments = Appointment.objects.filter(
-            customer=request.user,
-            appointment_date__range=[start_date, end_date]
-        ).select_related('service', 'barber')
-    
-    events = []
-    for appt in appointments:
-        # Calculate end time based on service duration
-        from datetime import timedelta
-        start_dt = datetime.combine(appt.appointment_date, appt.appointment_time)
-        end_dt = start_dt + timedelta(minutes=appt.service.duration_minutes)
-        
-        status_colors = {
-            'pending': '#f39c12',  # Orange
-            'confirmed': '#27ae60', # Green
-            'completed': '#2980b9', # Blue
-            'cancelled': '#c0392b', # Red
-            'declined': '#7f8c8d',  # Grey
-        }
-        
-        title = f"{appt.service.name}"
-        if request.user.is_staff:
-            title = f"{appt.customer.username}: {title}"
-            
-        events.append({
-            'id': appt.id,
-            'title': title,
-            'start': start_dt.isoformat(),
-            'end': end_dt.isoformat(),
-            'color': status_colors.get(appt.status, '#34495e'),
-            'url': f'/booking/appointment/{appt.id}/',
-            'extendedProps': {
-                'status': appt.get_status_display(),
-                'barber': appt.barber.name,
-                'customer': appt.customer.username if request.user.is_staff else None
-            }
-        })
-        
-    return JsonResponse(events, safe=False)
+        appointments = Appointment.objects.filter(customer=request.user)
+    in_range = Q(appointment_date__range=[start_date, end_date])
+    
+    since_str = request.GET.get('since')
+    if not since_str:
+        events = calendar_events(appointments.filter(in_range), include_customer=request.user.is_staff)
+        response = StreamingHttpResponse(stream_json_array(events), content_type='application/json')
+        response['X-Sync-Token'] = sync_token
+        return response
+    
+    try:
+        since = parse_sync_token(since_str)
+    except (ValueError, OverflowError, OSError):
+        return JsonResponse({'error': 'Invalid sync token'}, status=400)
+    
+    if token_expired(since):
+        return JsonResponse({'error': 'Sync token expired, fetch all events again'}, status=410)
+    
+    # Deleted rows, plus changed rows that moved out of the visible range
+    changed = changed_since(appointments, since)
+    deleted = deleted_since(since, customer=None if request.user.is_staff else request.user)
+    deleted += changed.exclude(in_range).values_list('id', flat=True)
+    events = calendar_events(changed.filter(in_range), include_customer=request.user.is_staff)
+    
+    def delta():
+        yield f'{{"sync_token":"{sync_token}","deleted":{json.dumps(deleted)},"events":'
+        yield from stream_json_array(events)
+        yield '}'
+    
+    response = StreamingHttpResponse(delta(), content_type='application/json')
+    response['X-Sync-Token'] = sync_token
+    return response
+
+
+@login_required
+def get_calendar_summary(request):
+    """
+    API endpoint for month view: appointment counts per day and status.
+    
+    Built from one GROUP BY query, so a month costs the same however busy it
+    is. Staff can add ?by_barber=1 for a per-barber breakdown. Carries an
+    X-Sync-Token header like the events endpoint, so a change feed can tell
+    the month view when to refresh.
+    """
+    from django.http import JsonResponse
+    from .events import day_summaries, make_sync_token
+    
+    start_str = request.GET.get('start')
+    end_str = request.GET.get('end')
+    
+    if not start_str or not end_str:
+        return JsonResponse({'error': 'Missing start or end parameters'}, status=400)
+    
+    try:
+        start_date, end_date = _parse_calendar_range(start_str, end_str)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid start or end parameters'}, status=400)
+    
+    if (end_date - start_date).days > MAX_SUMMARY_DAYS:
+        return JsonResponse({'error': f'Range is limited to {MAX_SUMMARY_DAYS} days'}, status=400)
+    
+    sync_token = make_sync_token()
+    
+    appointments = Appointment.objects.filter(appointment_date__range=[start_date, end_date])
+    if not request.user.is_staff:
+        appointments = appointments.filter(customer=request.user)
+    by_barber = request.user.is_staff and request.GET.get('by_barber') == '1'
+    
+    response = JsonResponse({'days': day_summaries(appointments, by_barber=by_barber)})
+    response['X-Sync-Token'] = sync_token
+    return response
+
+
+def _ics_response(request, appointments, calendar_name):
+    """Stream an .ics feed, or answer 304 if the client's copy is current."""
+    from django.http import StreamingHttpResponse
+    from django.utils.cache import get_conditional_response, patch_cache_control
+    from django.utils.http import http_date
+    from .ics import feed_appointments, feed_state, ics_lines
+    
+    etag, last_modified = feed_state(appointments)
+    last_modified = int(last_modified.timestamp())
+    appointments = feed_appointments(appointments)
+    
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = StreamingHttpResponse(
+            ics_lines(appointments, calendar_name, request.get_host()),
+            content_type='text/calendar; charset=utf-8'
+        )
+    
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Calendar apps poll; make them revalidate so they get cheap 304s
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def barber_ics_feed(request, barber_id, token):
+    """Subscribable .ics feed of one barber's appointments, authorised by the token in its URL."""
+    from django.http import Http404
+    from barbers.models import Barber
+    from .ics import check_feed_token
+    
+    if not check_feed_token(barber_id, token):
+        raise Http404('Unknown feed')
+    barber = get_object_or_404(Barber, pk=barber_id)
+    
+    return _ics_response(request, Appointment.objects.filter(barber=barber), f'{barber.name} - Appointments')
+
+
+def shop_ics_feed(request, token):
+    """Subscribable .ics feed of every barber's appointments, for staff."""
+    from django.http import Http404
+    from .ics import check_feed_token
+    
+    if not check_feed_token('shop', token):
+        raise Http404('Unknown feed')
+    
+    return _ics_response(request, Appointment.objects.all(), 'Barbershop - All Appointments')
+
+
+@login_required
+async def live_events(request):
+    """
+    Server-sent events for the appointment changes this user may see.
+    
+    Held open when served over ASGI. Under WSGI each request returns what
+    changed since Last-Event-ID and the browser comes back for more.
+    """
+    from asgiref.sync import sync_to_async
+    from django.core.handlers.asgi import ASGIRequest
+    from django.http import HttpResponse, StreamingHttpResponse
+    from . import live
+    
+    listener = await sync_to_async(live.audience)(await request.auser())
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.GET['last_event_id'])
+    except (KeyError, ValueError):
+        last_event_id = None
+    
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(live.stream(listener, last_event_id), content_type='text/event-stream')
+    else:
+        response = HttpResponse(
+            await sync_to_async(live.catch_up)(listener, last_event_id), content_type='text/event-stream'
+        )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _get_requested_service(request):
+    """Return the active Service named by ?service_id=, or None when it's omitted."""
+    service_id = request.GET.get('service_id')
+    if not service_id:
+        return None
+    return Service.objects.get(pk=int(service_id), is_active=True)
 
 
 @login_required
@@ -249,11 +494,12 @@ def get_available_slots(request):
     try:
         barber = Barber.objects.get(pk=barber_id, is_active=True)
         date = datetime.strptime(date_str, '%Y-%m-%d').date()
-    except (Barber.DoesNotExist, ValueError):
+        service = _get_requested_service(request)
+    except (Barber.DoesNotExist, Service.DoesNotExist, ValueError):
         return JsonResponse({'error': 'Invalid barber or date'}, status=400)
     
     # Get available slots
-    slots = get_slots(barber, date)
+    slots = get_slots(barber, date, service, customer=request.user)
     
     # Format response
     slots_data = [
@@ -269,6 +515,144 @@ def get_available_slots(request):
     return JsonResponse({'slots': slots_data})
 
 
+@login_required
+def get_availability(request):
+    """AJAX endpoint to get the availability grid for several barbers over a date range."""
+    from django.http import JsonResponse
+    from datetime import datetime, timedelta
+    from barbers.models import Barber
+    from .utils import get_availability_matrix, format_time_slot
+    
+    start_str = request.GET.get('start')
+    end_str = request.GET.get('end')
+    barber_ids = request.GET.get('barber_ids', '')
+    
+    if not start_str:
+        return JsonResponse({'error': 'Missing parameters'}, status=400)
+    
+    try:
+        start_date = datetime.strptime(start_str, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_str, '%Y-%m-%d').date() if end_str else start_date + timedelta(days=6)
+        barber_ids = [int(pk) for pk in barber_ids.split(',') if pk]
+        service = _get_requested_service(request)
+    except (Service.DoesNotExist, ValueError):
+        return JsonResponse({'error': 'Invalid barber or date'}, status=400)
+    
+    if end_date < start_date:
+        return JsonResponse({'error': 'End date must not be before start date'}, status=400)
+    
+    if (end_date - start_date).days >= MAX_AVAILABILITY_DAYS:
+        return JsonResponse({'error': f'Date range cannot exceed {MAX_AVAILABILITY_DAYS} days'}, status=400)
+    
+    barbers = Barber.objects.filter(is_active=True).order_by('name')
+    if barber_ids:
+        barbers = barbers.filter(pk__in=barber_ids)
+    barbers = list(barbers)
+    
+    matrix = get_availability_matrix(barbers, start_date, end_date, service, customer=request.user)
+    
+    # Format response
+    barbers_data = [
+        {
+            'id': barber.pk,
+            'name': barber.name,
+            'days': [
+                {
+                    'date': day.isoformat(),
+                    'slots': [
+                        {
+                            'time': slot['time'].strftime('%H:%M'),
+                            'display': format_time_slot(slot['time']),
+                            'available': slot['available'],
+                            'reason': slot['reason']
+                        }
+                        for slot in slots
+                    ]
+                }
+                for day, slots in matrix[barber.pk].items()
+            ]
+        }
+        for barber in barbers
+    ]
+    
+    return JsonResponse({
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
+        'barbers': barbers_data,
+    })
+
+
+@login_required
+def hold_slot(request):
+    """AJAX endpoint to reserve a slot for the current customer while they finish booking."""
+    from django.http import JsonResponse
+    from datetime import datetime
+    from barbers.models import Barber
+    from .holds import place_hold, HOLD_MINUTES
+    from .slot_index import CELL_MINUTES
+    from .utils import generate_time_slots
+    
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    
+    try:
+        barber = Barber.objects.get(pk=request.POST.get('barber_id'), is_active=True)
+        date = datetime.strptime(request.POST.get('date', ''), '%Y-%m-%d').date()
+        time_slot = datetime.strptime(request.POST.get('time', ''), '%H:%M').time()
+        service_id = request.POST.get('service_id')
+        service = Service.objects.get(pk=int(service_id), is_active=True) if service_id else None
+    except (Barber.DoesNotExist, Service.DoesNotExist, ValueError):
+        return JsonResponse({'error': 'Invalid barber, service or time'}, status=400)
+    
+    if date < datetime.now().date() or time_slot not in generate_time_slots():
+        return JsonResponse({'error': 'Invalid barber, service or time'}, status=400)
+    
+    duration = service.duration_minutes if service else CELL_MINUTES
+    hold = place_hold(request.user, barber, date, time_slot, duration)
+    if hold is None:
+        return JsonResponse({'error': 'This time was just taken. Please choose another time.'}, status=409)
+    
+    return JsonResponse({'held': True, 'expires_at': hold.expires_at.isoformat(), 'hold_minutes': HOLD_MINUTES})
+
+
+@login_required
+def get_next_available(request):
+    """AJAX endpoint to find the earliest openings for a service with any barber."""
+    from django.http import JsonResponse
+    from datetime import datetime
+    from .utils import find_next_available, format_time_slot
+    
+    after_str = request.GET.get('after')
+    
+    try:
+        service = _get_requested_service(request)
+        after = datetime.fromisoformat(after_str) if after_str else datetime.now()
+        limit = min(int(request.GET.get('limit', 5)), MAX_NEXT_AVAILABLE_RESULTS)
+    except (Service.DoesNotExist, ValueError):
+        return JsonResponse({'error': 'Invalid service or date'}, status=400)
+    
+    if service is None:
+        return JsonResponse({'error': 'Missing parameters'}, status=400)
+    
+    # Never offer openings in the past
+    after = max(after.replace(tzinfo=None), datetime.now())
+    
+    openings = find_next_available(service, after=after, limit=max(limit, 1))
+    
+    results = [
+        {
+            'barber_id': opening['barber'].pk,
+            'barber_name': opening['barber'].name,
+            'date': opening['date'].isoformat(),
+            'time': opening['time'].strftime('%H:%M'),
+            'display': format_time_slot(opening['time']),
+        }
+        for opening in openings
+    ]
+    
+    return JsonResponse({'results': results})
+
+
 @login_required
 def reschedule_appointment(request, pk):
     """Allow customers to reschedule their appointments."""
@@ -287,9 +671,13 @@ def reschedule_appointment(request, pk):
     if request.method == 'POST':
         form = AppointmentForm(request.POST, instance=appointment)
         if form.is_valid():
-            form.save()
-            messages.success(request, 'Appointment rescheduled successfully!')
-            return redirect('booking:appointment_detail', pk=pk)
+            try:
+                book_appointment(form.save(commit=False))
+            except SlotTakenError as e:
+                form.add_error(None, str(e))
+            else:
+                messages.success(request, 'Appointment rescheduled successfully!')
+                return redirect('booking:appointment_detail', pk=pk)
     else:
         form = AppointmentForm(instance=appointment)
     
@@ -313,11 +701,11 @@ def booking_confirmation(request, pk):
     if not request.user.is_staff and appointment.customer != request.user:
         messages.error(request, 'You do not have permission to view this appointment.')
         return redirect('booking:my_appointments')
-
+    
     # If payment already exists, redirect to detail
     if hasattr(appointment, 'payment') and request.method == 'GET':
         return redirect('booking:appointment_detail', pk=appointment.pk)
-
+    
     if request.method == 'POST':
         payment_method = request.POST.get('payment_method')
         gcash_reference = request.POST.get('reference_number', '')
@@ -327,10 +715,10 @@ def booking_confirmation(request, pk):
             from payments.models import Payment
             payment, created = Payment.objects.get_or_create(
                 appointment=appointment,
-                defaults={'amount': appointment.service.price}
+                defaults={'amount': appointment.price}
             )
             payment.payment_method = payment_method
-            payment.amount = appointment.service.price # Ensure amount is correct
+            payment.amount = appointment.price # Ensure amount is correct
             
             if payment_method == 'gcash':
                 if not gcash_reference:
@@ -346,7 +734,7 @@ def booking_confirmation(request, pk):
                 return redirect('booking:appointment_detail', pk=appointment.pk)
         else:
             messages.error(request, 'Invalid payment method selected.')
-
+    
     # Get GCash QR
     from payments.models import GCashQRCode
     gcash_qr = GCashQRCode.objects.filter(is_active=True).first()
@@ -0,0 +1,97 @@
+# booking/waitlist.py
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from .models import Appointment, WaitlistEntry
+from .bookings import book_appointment, SlotTakenError
+
+logger = logging.getLogger(__name__)
+
+# Waiting entries examined per freed slot before giving up
+CANDIDATE_LIMIT = 20
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='waitlist')
+
+
+def schedule_promotion(barber_id, date, time_slot):
+    """
+    Offer a freed slot to the waitlist without holding up the current request.
+    
+    Runs on a background thread unless settings.WAITLIST_ASYNC is False
+    (as in tests), in which case it runs inline.
+    """
+    if getattr(settings, 'WAITLIST_ASYNC', True):
+        _executor.submit(_promote_in_background, barber_id, date, time_slot)
+    else:
+        promote_waitlist(barber_id, date, time_slot)
+
+
+def _promote_in_background(barber_id, date, time_slot):
+    try:
+        promote_waitlist(barber_id, date, time_slot)
+    except Exception:
+        logger.exception('Waitlist promotion failed for barber %s on %s %s', barber_id, date, time_slot)
+    finally:
+        connection.close()
+
+
+def promote_waitlist(barber_id, date, time_slot):
+    """
+    Book a freed slot for the longest-waiting customer whose window fits it.
+    
+    Candidates come from one indexed lookup on (date, status, created_at),
+    narrowed to this barber (or any barber) and to windows containing the
+    slot. The first one whose service fits is booked through
+    book_appointment(), so the usual overlap and hold checks still apply.
+    Claiming an entry and booking it commit together.
+    
+    Returns:
+        The promoted WaitlistEntry, or None if nobody could take the slot
+    """
+    if date < datetime.now().date():
+        return None
+    
+    candidates = WaitlistEntry.objects.filter(
+        Q(barber_id=barber_id) | Q(barber__isnull=True),
+        date=date,
+        status='waiting',
+        window_start__lte=time_slot,
+        window_end__gt=time_slot
+    ).select_related('service').order_by('created_at')[:CANDIDATE_LIMIT]
+    
+    for entry in candidates:
+        end = (datetime.combine(date, time_slot) + timedelta(minutes=entry.service.duration_minutes)).time()
+        if end > entry.window_end or end <= time_slot:
+            continue
+        
+        # Claim and book together: any failure other than a taken slot
+        # rolls the claim back and leaves the entry waiting
+        with transaction.atomic():
+            # Claimed first so two promotions can't both book it
+            if not WaitlistEntry.objects.filter(pk=entry.pk, status='waiting').update(status='promoted'):
+                continue
+            
+            try:
+                appointment = book_appointment(Appointment(
+                    customer_id=entry.customer_id,
+                    barber_id=barber_id,
+                    service=entry.service,
+                    appointment_date=date,
+                    appointment_time=time_slot,
+                    notes='Booked automatically from the waitlist.'
+                ))
+            except SlotTakenError:
+                WaitlistEntry.objects.filter(pk=entry.pk).update(status='waiting')
+                continue
+            
+            WaitlistEntry.objects.filter(pk=entry.pk).update(appointment=appointment)
+        
+        entry.status = 'promoted'
+        entry.appointment = appointment
+        return entry
+    
+    return None
@@ -0,0 +1,51 @@
+# dashboard/landing.py
+
+import hashlib
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import timezone
+from barbers.models import Barber
+from services.models import Service
+
+# Seconds a rendered landing page is reused for. Service and Barber writes
+# clear it sooner in this process; other workers catch up within this window.
+LANDING_TTL = 300
+
+# Seconds browsers and proxies may reuse the page without asking again
+LANDING_MAX_AGE = 60
+
+_LANDING_KEY = 'dashboard:landing'
+
+
+def render_landing_page(request):
+    """Render the landing page from the database."""
+    context = {
+        'services': Service.objects.filter(is_active=True)[:6],
+        'barbers': Barber.objects.filter(is_active=True)[:3],
+    }
+    return render_to_string('dashboard/landing.html', context, request=request)
+
+
+def get_landing_page(request):
+    """
+    The landing page as anonymous visitors see it, rendered at most once per TTL.
+    
+    Returns:
+        Dictionary of content, etag and last_modified
+    """
+    page = cache.get(_LANDING_KEY)
+    if page is not None:
+        return page
+    
+    content = render_landing_page(request)
+    page = {
+        'content': content,
+        'etag': f'"{hashlib.md5(content.encode()).hexdigest()}"',
+        'last_modified': timezone.now().replace(microsecond=0),
+    }
+    cache.set(_LANDING_KEY, page, LANDING_TTL)
+    return page
+
+
+def invalidate_landing_page():
+    cache.delete(_LANDING_KEY)
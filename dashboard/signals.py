@@ -0,0 +1,36 @@
+# dashboard/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from booking.models import Appointment
+from booking.signals import appointments_bulk_changed
+from barbers.models import Barber
+from payments.models import Payment
+from services.models import Service
+from .landing import invalidate_landing_page
+from .stats import invalidate_dashboard_stats
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+@receiver(post_save, sender=Barber)
+@receiver(post_delete, sender=Barber)
+def clear_dashboard_stats(sender, **kwargs):
+    # After commit, so a concurrent reader can't cache the old numbers again
+    transaction.on_commit(invalidate_dashboard_stats)
+
+
+@receiver(appointments_bulk_changed)
+def clear_dashboard_stats_after_bulk_change(sender, **kwargs):
+    transaction.on_commit(invalidate_dashboard_stats)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=Barber)
+@receiver(post_delete, sender=Barber)
+def clear_landing_page(sender, **kwargs):
+    transaction.on_commit(invalidate_landing_page)
@@ -1,3 +1,195 @@
 from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from datetime import date, time, timedelta
+from barbers.models import Barber
+from services.models import Service
+from booking.models import Appointment
+from payments.models import Payment
+from dashboard.stats import get_dashboard_stats
 
-# Create your tests here.
+
+class DashboardStatsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = User.objects.create_user(username='customer', password='password')
+        self.admin = User.objects.create_user(username='admin', password='password', is_staff=True)
+        barber_user = User.objects.create_user(username='barber_user', password='password')
+        self.barber = Barber.objects.create(user=barber_user, name='Test Barber', is_active=True)
+        self.service = Service.objects.create(name='Test Service', price=500, duration_minutes=30, is_active=True)
+        today = timezone.localdate()
+    
+        def book(day, hour, status):
+            return Appointment.objects.create(
+                customer=self.customer, barber=self.barber, service=self.service,
+                appointment_date=day, appointment_time=time(hour, 0), status=status
+            )
+    
+        paid = book(today, 9, 'completed')
+        book(today, 10, 'confirmed')
+        book(today, 11, 'pending')
+        old = book(today - timedelta(days=3), 9, 'completed')
+        Payment.objects.create(appointment=paid, payment_method='gcash', amount=500, payment_status='paid', paid_at=timezone.now())
+        Payment.objects.create(appointment=old, payment_method='pay_after', amount=300, payment_status='paid', paid_at=timezone.now() - timedelta(days=3))
+        cache.clear()
+    
+    def test_counters(self):
+        with CaptureQueriesContext(connection) as queries:
+            stats = get_dashboard_stats()
+        # Rollup totals, appointment counters, today's payments and active
+        # barbers: one indexed aggregate per table rather than one aggregate
+        # that reads every appointment
+        self.assertEqual(len(queries), 4)
+        self.assertEqual(stats, {
+            'total_appointments': 4,
+            'pending_appointments': 1,
+            'today_appointments': 3,
+            'confirmed_today': 1,
+            'unpaid_appointments': 1,
+            'revenue_today': 500,
+            'total_barbers': 1,
+        })
+    
+    def test_cached_until_an_appointment_changes(self):
+        get_dashboard_stats()
+        with CaptureQueriesContext(connection) as queries:
+            get_dashboard_stats()
+        self.assertEqual(len(queries), 0)
+    
+        with self.captureOnCommitCallbacks(execute=True):
+            Appointment.objects.filter(status='pending').get().delete()
+        self.assertEqual(get_dashboard_stats()['pending_appointments'], 0)
+    
+    def test_home_shows_counters(self):
+        self.client.login(username='admin', password='password')
+        response = self.client.get(reverse('dashboard:home'))
+        self.assertContains(response, 'Confirmed Today')
+        self.assertContains(response, '₱500.00')
+
+
+class AdminAppointmentsPaginationTest(TestCase):
+    def setUp(self):
+        customer = User.objects.create_user(username='customer', password='password')
+        User.objects.create_user(username='admin', password='password', is_staff=True)
+        self.barbers = [
+            Barber.objects.create(user=User.objects.create_user(username=f'barber{n}', password='password'), name=f'Barber {n}')
+            for n in range(2)
+        ]
+        self.service = Service.objects.create(name='Cut', price=300, duration_minutes=30)
+        start = date(2030, 1, 1)
+        appointments = []
+        for n in range(120):
+            # Cancelled twins share a slot, so ties are broken by id
+            appointments.append(Appointment(
+                customer=customer, barber=self.barbers[n % 2], service=self.service,
+                appointment_date=start + timedelta(days=n // 8), appointment_time=time(9 + n % 4, 0),
+                status='cancelled' if n % 8 >= 4 else 'pending'
+            ))
+        Appointment.objects.bulk_create(appointments)
+        paid = Appointment.objects.order_by('id')[:5]
+        Payment.objects.bulk_create([
+            Payment(appointment=appointment, payment_method='gcash', amount=300, payment_status='paid')
+            for appointment in paid
+        ])
+        self.client.login(username='admin', password='password')
+        self.url = reverse('dashboard:admin_appointments')
+    
+    def walk(self, params, cursor_key='after', next_key='next_cursor'):
+        ids, cursor = [], None
+        while True:
+            query = dict(params, **({cursor_key: cursor} if cursor else {}))
+            response = self.client.get(self.url, query)
+            page = [appointment.pk for appointment in response.context['appointments']]
+            ids = page + ids if cursor_key == 'before' else ids + page
+            cursor = response.context[next_key]
+            if not cursor:
+                return ids, response
+    
+    def test_pages_cover_every_row_once(self):
+        expected = list(Appointment.objects.order_by('-appointment_date', '-appointment_time', '-id').values_list('id', flat=True))
+        ids, last_page = self.walk({})
+        self.assertEqual(ids, expected)
+    
+        oldest, _ = self.walk({'order': 'oldest'})
+        self.assertEqual(oldest, expected[::-1])
+    
+        # Walking back from the last page gives the same rows
+        tail = last_page.context['previous_cursor']
+        back, _ = self.walk({'before': tail}, cursor_key='before', next_key='previous_cursor')
+        self.assertEqual(back + [appointment.pk for appointment in last_page.context['appointments']], expected)
+    
+    def test_filters(self):
+        ids, _ = self.walk({'barber': self.barbers[0].pk, 'status': 'pending'})
+        self.assertEqual(set(ids), set(Appointment.objects.filter(barber=self.barbers[0], status='pending').values_list('id', flat=True)))
+    
+        ids, _ = self.walk({'date_from': '2030-01-03', 'date_to': '2030-01-04'})
+        self.assertEqual(len(ids), 16)
+    
+        ids, _ = self.walk({'payment': 'paid'})
+        self.assertEqual(len(ids), 5)
+        ids, _ = self.walk({'payment': 'none', 'service': self.service.pk})
+        self.assertEqual(len(ids), 115)
+    
+        response = self.client.get(self.url, {'status': 'pending'})
+        self.assertIsNone(response.context['total_count'])
+        response = self.client.get(self.url, {'status': 'pending', 'count': '1'})
+        self.assertEqual(response.context['total_count'], 60)
+    
+        response = self.client.get(self.url, {'after': 'not-a-cursor'})
+        self.assertRedirects(response, self.url)
+    
+    def test_deep_pages_cost_the_same(self):
+        first = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as shallow:
+            self.client.get(self.url)
+        with CaptureQueriesContext(connection) as deep:
+            self.client.get(self.url, {'after': first.context['next_cursor']})
+        self.assertEqual(len(deep), len(shallow))
+        self.assertFalse(any('OFFSET' in query['sql'].upper() for query in deep.captured_queries))
+
+
+class LandingPageTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        barber_user = User.objects.create_user(username='barber_user', password='password')
+        self.barber = Barber.objects.create(user=barber_user, name='Test Barber', is_active=True)
+        self.service = Service.objects.create(name='Fade', price=250, duration_minutes=30, is_active=True)
+        self.url = reverse('landing')
+    
+    def test_cached_for_anonymous_visitors(self):
+        first = self.client.get(self.url)
+        self.assertContains(first, 'Fade')
+        self.assertIn('public', first['Cache-Control'])
+        self.assertIn('max-age=60', first['Cache-Control'])
+    
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+    
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+    
+    def test_service_and_barber_changes_invalidate(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.name = 'Skin Fade'
+            self.service.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Skin Fade')
+        self.assertNotEqual(response['ETag'], etag)
+    
+        with self.captureOnCommitCallbacks(execute=True):
+            self.barber.delete()
+        self.assertNotContains(self.client.get(self.url), 'Test Barber')
+    
+    def test_logged_in_users_are_redirected(self):
+        self.client.get(self.url)
+        User.objects.create_user(username='customer', password='password')
+        self.client.login(username='customer', password='password')
+        self.assertRedirects(self.client.get(self.url), reverse('dashboard:home'))
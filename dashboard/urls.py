@@ -8,5 +8,6 @@ app_name = 'dashboard'
 urlpatterns = [
     path('', views.home, name='home'),
     path('admin/appointments/', views.admin_appointments, name='admin_appointments'),
+    path('admin/appointments/bulk/', views.bulk_update_appointments, name='bulk_update_appointments'),
     path('landing/', views.landing_page, name='landing'),
 ]
\ No newline at end of file
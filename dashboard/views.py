@@ -1,12 +1,15 @@
 # dashboard/views.py
 
 from django.shortcuts import render, redirect
+from django.urls import reverse
+from django.http import HttpResponse, QueryDict
 from django.contrib.auth.decorators import login_required
 from booking.models import Appointment
 from barbers.models import Barber
 from services.models import Service
 from django.db.models import Count, Q
 from django.contrib import messages
+from .stats import get_dashboard_stats
 from datetime import datetime, timedelta
 
 
@@ -15,14 +18,25 @@ def landing_page(request):
     if request.user.is_authenticated:
         return redirect('dashboard:home')
     
-    services = Service.objects.filter(is_active=True)[:6]
-    barbers = Barber.objects.filter(is_active=True)[:3]
+    from django.contrib.messages import get_messages
+    from django.utils.cache import get_conditional_response, patch_cache_control
+    from django.utils.http import http_date
+    from .landing import get_landing_page, render_landing_page, LANDING_MAX_AGE
     
-    context = {
-        'services': services,
-        'barbers': barbers,
-    }
-    return render(request, 'dashboard/landing.html', context)
+    # Pending flash messages are rendered into the page, so it can't come from the cache
+    if len(get_messages(request)):
+        response = HttpResponse(render_landing_page(request))
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    
+    page = get_landing_page(request)
+    response = get_conditional_response(
+        request, etag=page['etag'], last_modified=int(page['last_modified'].timestamp())
+    ) or HttpResponse(page['content'])
+    response.headers['ETag'] = page['etag']
+    response.headers['Last-Modified'] = http_date(page['last_modified'].timestamp())
+    patch_cache_control(response, public=True, max_age=LANDING_MAX_AGE)
+    return response
 
 
 @login_required
@@ -32,13 +46,8 @@ def home(request):
     
     if user.is_staff:
         # Admin dashboard
-        today = datetime.now().date()
-        
         # Statistics
-        total_appointments = Appointment.objects.count()
-        pending_appointments = Appointment.objects.filter(status='pending').count()
-        today_appointments = Appointment.objects.filter(appointment_date=today).count()
-        total_barbers = Barber.objects.filter(is_active=True).count()
+        stats = get_dashboard_stats()
         
         # Recent appointments
         recent_appointments = Appointment.objects.select_related(
@@ -46,10 +55,7 @@ def home(request):
         ).order_by('-created_at')[:10]
         
         context = {
-            'total_appointments': total_appointments,
-            'pending_appointments': pending_appointments,
-            'today_appointments': today_appointments,
-            'total_barbers': total_barbers,
+            **stats,
             'recent_appointments': recent_appointments,
             'is_admin': True,
         }
@@ -80,18 +86,114 @@ def admin_appointments(request):
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('dashboard:home')
     
+    from django.db.models import Exists, OuterRef
+    from booking.pagination import keyset_page, estimated_count
+    from payments.models import Payment
+    
     status_filter = request.GET.get('status', '')
+    barber_filter = request.GET.get('barber', '')
+    service_filter = request.GET.get('service', '')
+    payment_filter = request.GET.get('payment', '')
+    date_from = request.GET.get('date_from', '')
+    date_to = request.GET.get('date_to', '')
+    oldest_first = request.GET.get('order') == 'oldest'
     
-    appointments = Appointment.objects.select_related(
-        'customer', 'barber', 'service'
-    ).order_by('-appointment_date', '-appointment_time')
+    appointments = Appointment.objects.select_related('customer', 'barber', 'service', 'payment')
     
-    if status_filter:
-        appointments = appointments.filter(status=status_filter)
+    try:
+        if status_filter:
+            appointments = appointments.filter(status=status_filter)
+        if barber_filter:
+            appointments = appointments.filter(barber_id=int(barber_filter))
+        if service_filter:
+            appointments = appointments.filter(service_id=int(service_filter))
+        # As a per-row probe rather than a join, so the page still walks the appointment index in order
+        if payment_filter == 'none':
+            appointments = appointments.filter(~Exists(Payment.objects.filter(appointment=OuterRef('pk'))))
+        elif payment_filter:
+            appointments = appointments.filter(
+                Exists(Payment.objects.filter(appointment=OuterRef('pk'), payment_status=payment_filter))
+            )
+        if date_from:
+            appointments = appointments.filter(appointment_date__gte=datetime.strptime(date_from, '%Y-%m-%d').date())
+        if date_to:
+            appointments = appointments.filter(appointment_date__lte=datetime.strptime(date_to, '%Y-%m-%d').date())
+        
+        page = keyset_page(
+            appointments,
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+            descending=not oldest_first
+        )
+    except ValueError:
+        messages.error(request, 'Invalid filter. Showing all appointments.')
+        return redirect('dashboard:admin_appointments')
+    
+    filtered = any([status_filter, barber_filter, service_filter, payment_filter, date_from, date_to])
+    if not filtered:
+        # Counting the whole table gets slow; the planner's estimate is close enough
+        total_count, count_is_estimate = estimated_count(Appointment), True
+    elif request.GET.get('count') == '1':
+        total_count, count_is_estimate = appointments.count(), False
+    else:
+        total_count, count_is_estimate = None, False
     
     context = {
-        'appointments': appointments,
+        'appointments': page['items'],
+        'next_cursor': page['next_cursor'],
+        'previous_cursor': page['previous_cursor'],
+        'total_count': total_count,
+        'count_is_estimate': count_is_estimate,
         'status_filter': status_filter,
+        'barber_filter': barber_filter,
+        'service_filter': service_filter,
+        'payment_filter': payment_filter,
+        'date_from': date_from,
+        'date_to': date_to,
+        'oldest_first': oldest_first,
+        'barbers': Barber.objects.order_by('name'),
+        'services': Service.objects.order_by('name'),
     }
     
-    return render(request, 'dashboard/admin_appointments.html', context)
\ No newline at end of file
+    return render(request, 'dashboard/admin_appointments.html', context)
+
+
+@login_required
+def bulk_update_appointments(request):
+    """Apply approve/decline/cancel/complete to every selected appointment in one request."""
+    from booking.bookings import bulk_transition, TRANSITIONS
+    
+    if not request.user.is_staff:
+        messages.error(request, 'You do not have permission to perform this action.')
+        return redirect('dashboard:home')
+    
+    # Back to the same filtered page; re-encoded so only a query string gets through
+    query = QueryDict(request.POST.get('query', '')).urlencode()
+    redirect_url = reverse('dashboard:admin_appointments') + (f'?{query}' if query else '')
+    
+    if request.method != 'POST':
+        return redirect(redirect_url)
+    
+    action = request.POST.get('action')
+    try:
+        appointment_ids = [int(pk) for pk in request.POST.getlist('appointment_ids')]
+    except ValueError:
+        appointment_ids = []
+    
+    if action not in TRANSITIONS:
+        messages.error(request, 'Invalid action.')
+        return redirect(redirect_url)
+    
+    if not appointment_ids:
+        messages.error(request, 'Select at least one appointment.')
+        return redirect(redirect_url)
+    
+    updated_ids, failures = bulk_transition(appointment_ids, action)
+    
+    if updated_ids:
+        new_status = TRANSITIONS[action][0]
+        messages.success(request, f'{len(updated_ids)} appointment(s) marked as {new_status}.')
+    if failures:
+        messages.warning(request, 'Skipped ' + '; '.join(f'#{pk}: {reason}' for pk, reason in failures) + '.')
+    
+    return redirect(redirect_url)
@@ -1,6 +1,7 @@
 # payments/admin.py
 
 from django.contrib import admin
+from booking.pagination import EstimatedCountPaginator
 from .models import Payment, GCashQRCode
 
 @admin.register(Payment)
@@ -8,6 +9,11 @@ class PaymentAdmin(admin.ModelAdmin):
     list_display = ['appointment', 'payment_method', 'amount', 'payment_status', 'created_at']
     list_filter = ['payment_method', 'payment_status', 'created_at']
     search_fields = ['appointment__customer__username', 'gcash_reference']
+    # The appointment's __str__ reads its customer and barber
+    list_select_related = ['appointment__customer', 'appointment__barber']
+    raw_id_fields = ['appointment']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 @admin.register(GCashQRCode)
 class GCashQRCodeAdmin(admin.ModelAdmin):
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0012_appointment_list_indexes'),
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['payment_status', 'appointment'], name='payments_pa_payment_07b9c2_idx'),
+        ),
+    ]
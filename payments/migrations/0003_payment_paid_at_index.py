@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0012_appointment_list_indexes'),
+        ('payments', '0002_appointment_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['paid_at', 'payment_status'], name='payments_pa_paid_at_264401_idx'),
+        ),
+    ]
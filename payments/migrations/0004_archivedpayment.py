@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0016_archivedappointment'),
+        ('payments', '0003_payment_paid_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPayment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('payment_method', models.CharField(choices=[('pay_after', 'Pay After Service'), ('gcash', 'GCash')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('payment_status', models.CharField(choices=[('pending', 'Pending'), ('paid', 'Paid'), ('refunded', 'Refunded')], max_length=20)),
+                ('gcash_reference', models.CharField(blank=True, max_length=100)),
+                ('paid_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('appointment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='payment', to='booking.archivedappointment')),
+            ],
+            options={
+                'verbose_name': 'Archived Payment',
+                'verbose_name_plural': 'Archived Payments',
+                'indexes': [models.Index(fields=['paid_at', 'payment_status'], name='payments_ar_paid_at_d624c3_idx')],
+            },
+        ),
+    ]
@@ -1,7 +1,7 @@
 # payments/models.py
 
 from django.db import models
-from booking.models import Appointment
+from booking.models import Appointment, ArchivedAppointment
 
 class Payment(models.Model):
     PAYMENT_METHOD_CHOICES = [
@@ -29,6 +29,35 @@ class Payment(models.Model):
     class Meta:
         verbose_name = 'Payment'
         verbose_name_plural = 'Payments'
+        indexes = [
+            # Appointment list filtered by payment status
+            models.Index(fields=['payment_status', 'appointment']),
+            # Revenue reports read payments by the time they were paid
+            models.Index(fields=['paid_at', 'payment_status']),
+        ]
+
+
+class ArchivedPayment(models.Model):
+    """The payment of an ArchivedAppointment, moved along with it and keeping its id."""
+    id = models.BigIntegerField(primary_key=True)
+    appointment = models.OneToOneField(ArchivedAppointment, on_delete=models.CASCADE, related_name='payment')
+    payment_method = models.CharField(max_length=20, choices=Payment.PAYMENT_METHOD_CHOICES)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    payment_status = models.CharField(max_length=20, choices=Payment.PAYMENT_STATUS_CHOICES)
+    gcash_reference = models.CharField(max_length=100, blank=True)
+    paid_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"Payment for {self.appointment} - {self.payment_status}"
+    
+    class Meta:
+        verbose_name = 'Archived Payment'
+        verbose_name_plural = 'Archived Payments'
+        indexes = [
+            # Revenue reports read payments by the time they were paid
+            models.Index(fields=['paid_at', 'payment_status']),
+        ]
 
 
 class GCashQRCode(models.Model):
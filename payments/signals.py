@@ -0,0 +1,24 @@
+# payments/signals.py
+
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+from booking import live
+from .models import Payment
+
+
+@receiver(post_init, sender=Payment)
+def remember_payment_status(sender, instance, **kwargs):
+    instance._original_payment_status = instance.__dict__.get('payment_status') if instance.pk else None
+
+
+@receiver(post_save, sender=Payment)
+def publish_payment_change(sender, instance, created, **kwargs):
+    payment_status = instance.__dict__.get('payment_status')
+    if payment_status is not None and payment_status != instance._original_payment_status:
+        appointment = instance.appointment
+        live.publish(
+            'payment', appointment.pk, appointment.customer_id, appointment.barber_id,
+            payment_status=payment_status, payment_method=instance.payment_method,
+            date=appointment.appointment_date.isoformat(), time=appointment.appointment_time.strftime('%H:%M')
+        )
+    instance._original_payment_status = payment_status
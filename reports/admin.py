@@ -0,0 +1,11 @@
+# reports/admin.py
+
+from django.contrib import admin
+from .models import DailyShopStats
+
+@admin.register(DailyShopStats)
+class DailyShopStatsAdmin(admin.ModelAdmin):
+    list_display = ['date', 'barber', 'service', 'booked', 'completed', 'cancelled', 'declined', 'booked_minutes', 'revenue']
+    list_filter = ['barber', 'service']
+    date_hierarchy = 'date'
+    list_select_related = ['barber', 'service']
@@ -0,0 +1,41 @@
+# reports/management/commands/rebuild_shop_stats.py
+
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from booking.models import Appointment, ArchivedAppointment
+from reports.rollup import rebuild, REBUILD_BATCH_DAYS
+
+
+class Command(BaseCommand):
+    help = 'Recompute DailyShopStats for a date range from appointments and payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help='First date (YYYY-MM-DD); defaults to the earliest appointment')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last date (YYYY-MM-DD); defaults to the latest appointment')
+        parser.add_argument('--batch-days', type=int, default=REBUILD_BATCH_DAYS, help='Days recomputed per aggregate query')
+
+    def handle(self, *args, **options):
+        bounds = [
+            model.objects.aggregate(first=Min('appointment_date'), last=Max('appointment_date'))
+            for model in (Appointment, ArchivedAppointment)
+        ]
+        firsts = [bound['first'] for bound in bounds if bound['first']]
+        lasts = [bound['last'] for bound in bounds if bound['last']]
+        start = options['start'] or (min(firsts) if firsts else None)
+        end = options['end'] or (max(lasts) if lasts else None)
+        
+        if start is None or end is None:
+            self.stdout.write('No appointments to roll up.')
+            return
+        if end < start:
+            raise CommandError('--end must not be before --start')
+        if options['batch_days'] < 1:
+            raise CommandError('--batch-days must be at least 1')
+        
+        total = 0
+        for batch_start, batch_end, rows in rebuild(start, end, batch_days=options['batch_days']):
+            total += rows
+            self.stdout.write(f"{batch_start} to {batch_end}: {rows} rows")
+        
+        self.stdout.write(self.style.SUCCESS(f"✓ Rebuilt {total} rows from {start} to {end}"))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('barbers', '0001_initial'),
+        ('services', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyShopStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('booked', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('cancelled', models.IntegerField(default=0)),
+                ('declined', models.IntegerField(default=0)),
+                ('booked_minutes', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('barber', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='barbers.barber')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='services.service')),
+            ],
+            options={
+                'verbose_name': 'Daily Shop Stats',
+                'verbose_name_plural': 'Daily Shop Stats',
+                'indexes': [models.Index(fields=['barber', 'date'], name='reports_dai_barber__399080_idx')],
+                'unique_together': {('date', 'barber', 'service')},
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+
+def backfill(apps, schema_editor):
+    """Roll up existing appointments once; signals keep the table current from here on."""
+    Appointment = apps.get_model('booking', 'Appointment')
+    DailyShopStats = apps.get_model('reports', 'DailyShopStats')
+
+    rows = Appointment.objects.order_by().values('appointment_date', 'barber_id', 'service_id').annotate(
+        booked_count=Count('id'),
+        completed_count=Count('id', filter=Q(status='completed')),
+        cancelled_count=Count('id', filter=Q(status='cancelled')),
+        declined_count=Count('id', filter=Q(status='declined')),
+        minutes=Sum('service__duration_minutes', filter=Q(status__in=['pending', 'confirmed', 'completed'])),
+        paid=Sum('payment__amount', filter=Q(payment__payment_status='paid')),
+    )
+    DailyShopStats.objects.bulk_create([
+        DailyShopStats(
+            date=row['appointment_date'],
+            barber_id=row['barber_id'],
+            service_id=row['service_id'],
+            booked=row['booked_count'],
+            completed=row['completed_count'],
+            cancelled=row['cancelled_count'],
+            declined=row['declined_count'],
+            booked_minutes=row['minutes'] or 0,
+            revenue=row['paid'] or 0,
+        )
+        for row in rows.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        ('booking', '0011_schedule_indexes'),
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# reports/models.py
+
+from django.db import models
+from barbers.models import Barber
+from services.models import Service
+
+class DailyShopStats(models.Model):
+    """
+    Totals for one day, barber and service, kept in step with Appointment and Payment.
+    
+    Reports read these rows instead of scanning appointments, so their cost
+    grows with days x barbers x services rather than with bookings. The
+    rebuild_shop_stats command recomputes any range from scratch.
+    """
+    date = models.DateField()
+    barber = models.ForeignKey(Barber, on_delete=models.CASCADE, related_name='daily_stats')
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='daily_stats')
+    # Every appointment on the day, whatever its status
+    booked = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+    declined = models.IntegerField(default=0)
+    # Service minutes of pending, confirmed and completed appointments
+    booked_minutes = models.IntegerField(default=0)
+    # Paid payments, by appointment date
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    def __str__(self):
+        return f"{self.date} - {self.barber.name} - {self.service.name}"
+    
+    class Meta:
+        verbose_name = 'Daily Shop Stats'
+        verbose_name_plural = 'Daily Shop Stats'
+        unique_together = ['date', 'barber', 'service']
+        indexes = [
+            models.Index(fields=['barber', 'date']),
+        ]
@@ -0,0 +1,147 @@
+# reports/rollup.py
+
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction, IntegrityError
+from django.db.models import Count, F, Q, Sum
+from booking.models import Appointment, ArchivedAppointment
+from .models import DailyShopStats
+
+# Statuses whose service minutes count as booked time
+MINUTE_STATUSES = ['pending', 'confirmed', 'completed']
+
+# Statuses with a counter of their own
+COUNTED_STATUSES = ['completed', 'cancelled', 'declined']
+
+# Days recomputed per aggregate query when rebuilding
+REBUILD_BATCH_DAYS = 31
+
+COUNTER_FIELDS = ['booked', 'completed', 'cancelled', 'declined', 'booked_minutes', 'revenue']
+
+
+def contribution(status, duration_minutes):
+    """What one appointment adds to its day's row, payments aside."""
+    deltas = {'booked': 1}
+    if status in COUNTED_STATUSES:
+        deltas[status] = 1
+    if status in MINUTE_STATUSES:
+        deltas['booked_minutes'] = duration_minutes
+    return deltas
+
+
+def combine(*signed_deltas):
+    """Add up (sign, deltas) pairs into one deltas dict, dropping zeros."""
+    total = {}
+    for sign, deltas in signed_deltas:
+        for field, value in deltas.items():
+            total[field] = total.get(field, 0) + sign * value
+    return {field: value for field, value in total.items() if value}
+
+
+def apply(key, deltas, create=True):
+    """
+    Add deltas to the row for key = (date, barber_id, service_id), creating it if needed.
+    
+    Uses F() increments, so concurrent writers to the same row never lose
+    each other's changes. Pure removals pass create=False: there is nothing
+    to take away from a missing row, and its barber or service may be in the
+    middle of being deleted.
+    """
+    if not deltas:
+        return
+    date, barber_id, service_id = key
+    rows = DailyShopStats.objects.filter(date=date, barber_id=barber_id, service_id=service_id)
+    increments = {field: F(field) + value for field, value in deltas.items()}
+    
+    with transaction.atomic():
+        if rows.update(**increments) or not create:
+            return
+        try:
+            with transaction.atomic():
+                DailyShopStats.objects.create(date=date, barber_id=barber_id, service_id=service_id, **deltas)
+        except IntegrityError:
+            # Someone else created the row meanwhile
+            rows.update(**increments)
+
+
+def aggregate_rows(appointments):
+    """
+    Compute DailyShopStats rows for a set of appointments in one GROUP BY query.
+    
+    Returns:
+        Unsaved DailyShopStats instances, one per (date, barber, service)
+    """
+    rows = appointments.order_by().values('appointment_date', 'barber_id', 'service_id').annotate(
+        booked_count=Count('id'),
+        completed_count=Count('id', filter=Q(status='completed')),
+        cancelled_count=Count('id', filter=Q(status='cancelled')),
+        declined_count=Count('id', filter=Q(status='declined')),
+        minutes=Sum('duration_minutes', filter=Q(status__in=MINUTE_STATUSES)),
+        paid=Sum('payment__amount', filter=Q(payment__payment_status='paid')),
+    )
+    return [
+        DailyShopStats(
+            date=row['appointment_date'],
+            barber_id=row['barber_id'],
+            service_id=row['service_id'],
+            booked=row['booked_count'],
+            completed=row['completed_count'],
+            cancelled=row['cancelled_count'],
+            declined=row['declined_count'],
+            booked_minutes=row['minutes'] or 0,
+            revenue=row['paid'] or Decimal('0'),
+        )
+        for row in rows
+    ]
+
+
+def recount(**filters):
+    """
+    aggregate_rows() over live and archived appointments matching filters, merged per row.
+    
+    Archived days can still have live appointments, e.g. one left unpaid,
+    so both tables feed every row.
+    """
+    rows = {}
+    for model in (Appointment, ArchivedAppointment):
+        for row in aggregate_rows(model.objects.filter(**filters)):
+            key = (row.date, row.barber_id, row.service_id)
+            if key not in rows:
+                rows[key] = row
+                continue
+            for field in COUNTER_FIELDS:
+                setattr(rows[key], field, getattr(rows[key], field) + getattr(row, field))
+    return list(rows.values())
+
+
+def refresh(dates, barber_ids):
+    """Recompute every row for the given dates and barbers from the source tables."""
+    dates, barber_ids = set(dates), set(barber_ids)
+    if not dates or not barber_ids:
+        return
+    
+    with transaction.atomic():
+        DailyShopStats.objects.filter(date__in=dates, barber_id__in=barber_ids).delete()
+        DailyShopStats.objects.bulk_create(recount(appointment_date__in=dates, barber_id__in=barber_ids))
+
+
+def rebuild(start_date, end_date, batch_days=REBUILD_BATCH_DAYS):
+    """
+    Recompute every row from start_date to end_date inclusive.
+    
+    Works through the range a batch of days at a time, one aggregate query
+    and one bulk insert per batch, each in its own transaction.
+    
+    Yields:
+        (batch_start, batch_end, rows_written) after each batch
+    """
+    batch_start = start_date
+    while batch_start <= end_date:
+        batch_end = min(batch_start + timedelta(days=batch_days - 1), end_date)
+        with transaction.atomic():
+            DailyShopStats.objects.filter(date__range=[batch_start, batch_end]).delete()
+            rows = DailyShopStats.objects.bulk_create(
+                recount(appointment_date__range=[batch_start, batch_end]), batch_size=1000
+            )
+        yield batch_start, batch_end, len(rows)
+        batch_start = batch_end + timedelta(days=1)
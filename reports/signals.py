@@ -0,0 +1,109 @@
+# reports/signals.py
+
+from decimal import Decimal
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from booking.models import Appointment
+from booking.signals import appointments_bulk_changed
+from payments.models import Payment
+from . import rollup
+
+
+def _appointment_state(instance):
+    """(date, barber_id, service_id, status, duration_minutes) as loaded, or None if unsaved or partly deferred."""
+    # Read from __dict__ so deferred fields never trigger a query
+    values = instance.__dict__
+    state = (
+        values.get('appointment_date'), values.get('barber_id'), values.get('service_id'),
+        values.get('status'), values.get('duration_minutes'),
+    )
+    return state if instance.pk and None not in state else None
+
+
+def _paid_amount(instance):
+    values = instance.__dict__
+    if values.get('payment_status') != 'paid':
+        return Decimal('0')
+    return values.get('amount') or Decimal('0')
+
+
+@receiver(post_init, sender=Appointment)
+def remember_rollup_state(sender, instance, **kwargs):
+    instance._rollup_state = _appointment_state(instance)
+
+
+@receiver(post_save, sender=Appointment)
+def update_rollup(sender, instance, created, **kwargs):
+    old = None if created else instance._rollup_state
+    new = (instance.appointment_date, instance.barber_id, instance.service_id, instance.status, instance.duration_minutes)
+    instance._rollup_state = new
+    
+    if old == new:
+        return
+    if old is None and not created:
+        # Loaded with deferred fields; we don't know what it counted for before
+        rollup.refresh([instance.appointment_date], [instance.barber_id])
+        return
+    
+    removed = (-1, rollup.contribution(old[3], old[4])) if old else (1, {})
+    added = (1, rollup.contribution(new[3], new[4]))
+    
+    if old and old[:3] != new[:3]:
+        # Moved to another day, barber or service: take its revenue along
+        paid = Payment.objects.filter(appointment=instance, payment_status='paid').values_list('amount', flat=True).first()
+        if paid:
+            removed[1]['revenue'] = paid
+            added[1]['revenue'] = paid
+        rollup.apply(old[:3], rollup.combine(removed), create=False)
+        rollup.apply(new[:3], rollup.combine(added))
+    else:
+        rollup.apply(new[:3], rollup.combine(removed, added))
+
+
+@receiver(post_delete, sender=Appointment)
+def remove_from_rollup(sender, instance, **kwargs):
+    old = instance._rollup_state
+    if old is None:
+        return
+    rollup.apply(old[:3], rollup.combine((-1, rollup.contribution(old[3], old[4]))), create=False)
+
+
+@receiver(appointments_bulk_changed)
+def refresh_bulk_changed(sender, appointment_ids, **kwargs):
+    # Bulk writes don't tell us what changed, so recount the days they touched
+    keys = Appointment.objects.filter(pk__in=appointment_ids).values_list('appointment_date', 'barber_id').distinct()
+    keys = list(keys)
+    rollup.refresh({date for date, barber_id in keys}, {barber_id for date, barber_id in keys})
+
+
+@receiver(post_init, sender=Payment)
+def remember_paid_amount(sender, instance, **kwargs):
+    instance._rollup_paid = (instance.__dict__.get('appointment_id'), _paid_amount(instance)) if instance.pk else (None, Decimal('0'))
+
+
+def _apply_revenue(appointment_id, amount):
+    if not appointment_id or not amount:
+        return
+    key = Appointment.objects.filter(pk=appointment_id).values_list('appointment_date', 'barber_id', 'service_id').first()
+    if key:
+        rollup.apply(key, {'revenue': amount}, create=amount > 0)
+
+
+@receiver(post_save, sender=Payment)
+def update_rollup_revenue(sender, instance, **kwargs):
+    old_appointment_id, old_paid = instance._rollup_paid
+    new_paid = _paid_amount(instance)
+    
+    if old_appointment_id in (None, instance.appointment_id):
+        _apply_revenue(instance.appointment_id, new_paid - old_paid)
+    else:
+        _apply_revenue(old_appointment_id, -old_paid)
+        _apply_revenue(instance.appointment_id, new_paid)
+    
+    instance._rollup_paid = (instance.appointment_id, new_paid)
+
+
+@receiver(post_delete, sender=Payment)
+def remove_rollup_revenue(sender, instance, **kwargs):
+    appointment_id, paid = instance._rollup_paid
+    _apply_revenue(appointment_id, -paid)
@@ -0,0 +1,263 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from datetime import date, time
+from decimal import Decimal
+from io import StringIO
+from barbers.models import Barber, BarberAvailability
+from services.models import Service
+from booking.models import Appointment, AppointmentSeries
+from payments.models import Payment
+from reports.models import DailyShopStats
+from reports.rollup import aggregate_rows
+
+
+def rollup_table():
+    fields = ['date', 'barber_id', 'service_id', 'booked', 'completed', 'cancelled', 'declined', 'booked_minutes', 'revenue']
+    return sorted(
+        tuple(getattr(row, field) for field in fields)
+        for row in DailyShopStats.objects.all()
+        if row.booked or row.revenue
+    )
+
+
+def recomputed_table():
+    fields = ['date', 'barber_id', 'service_id', 'booked', 'completed', 'cancelled', 'declined', 'booked_minutes', 'revenue']
+    return sorted(tuple(getattr(row, field) for field in fields) for row in aggregate_rows(Appointment.objects.all()))
+
+
+@override_settings(WAITLIST_ASYNC=False)
+class DailyShopStatsTest(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='password')
+        self.admin = User.objects.create_user(username='admin', password='password', is_staff=True)
+        self.barbers = [
+            Barber.objects.create(user=User.objects.create_user(username=f'barber{i}', password='password'), name=f'Barber {i}')
+            for i in range(2)
+        ]
+        self.cut = Service.objects.create(name='Cut', price=300, duration_minutes=30)
+        self.shave = Service.objects.create(name='Shave', price=200, duration_minutes=45)
+        self.monday = date(2030, 1, 7)
+    
+    def book(self, barber=0, hour=9, service=None, day=None, status='pending'):
+        return Appointment.objects.create(
+            customer=self.customer, barber=self.barbers[barber], service=service or self.cut,
+            appointment_date=day or self.monday, appointment_time=time(hour, 0), status=status
+        )
+    
+    def test_signals_keep_rollup_equal_to_a_rebuild(self):
+        from booking.bookings import bulk_transition, book_series
+        first = self.book()
+        second = self.book(hour=10, service=self.shave)
+        third = self.book(barber=1)
+        self.assertEqual(rollup_table(), recomputed_table())
+    
+        # Status changes and payments
+        second.status = 'confirmed'
+        second.save()
+        payment = Payment.objects.create(appointment=second, payment_method='gcash', amount=Decimal('200.00'))
+        payment.payment_status = 'paid'
+        payment.save()
+        first.status = 'cancelled'
+        first.save()
+        self.assertEqual(rollup_table(), recomputed_table())
+    
+        # Rescheduling a paid appointment takes its revenue along
+        second.appointment_date = date(2030, 1, 8)
+        second.barber = self.barbers[1]
+        second.save()
+        self.assertEqual(rollup_table(), recomputed_table())
+    
+        # Refunds, reloaded and deferred instances, deletes
+        payment = Payment.objects.get(pk=payment.pk)
+        payment.payment_status = 'refunded'
+        payment.save()
+        deferred = Appointment.objects.only('id', 'status').get(pk=third.pk)
+        deferred.status = 'declined'
+        deferred.save()
+        Appointment.objects.get(pk=first.pk).delete()
+        self.assertEqual(rollup_table(), recomputed_table())
+    
+        # Bulk paths
+        fourth = self.book(hour=11)
+        bulk_transition([fourth.pk], 'approve')
+        BarberAvailability.objects.create(barber=self.barbers[0], day_of_week=0, start_time=time(9, 0), end_time=time(17, 0))
+        book_series(AppointmentSeries(
+            customer=self.customer, barber=self.barbers[0], service=self.shave,
+            start_date=self.monday, appointment_time=time(14, 0), interval_weeks=1, occurrences=3
+        ))
+        self.assertEqual(rollup_table(), recomputed_table())
+        self.assertEqual(DailyShopStats.objects.get(date=self.monday, barber=self.barbers[0], service=self.shave).booked_minutes, 45)
+    
+        # Deleting a barber takes their rows with them
+        self.barbers[1].delete()
+        self.assertEqual(rollup_table(), recomputed_table())
+    
+    def test_rebuild_command(self):
+        self.book()
+        self.book(day=date(2030, 3, 4), status='completed')
+        DailyShopStats.objects.all().delete()
+        DailyShopStats.objects.create(date=date(2030, 2, 1), barber=self.barbers[1], service=self.cut, booked=99)
+    
+        out = StringIO()
+        call_command('rebuild_shop_stats', '--batch-days', '10', stdout=out)
+        self.assertIn('Rebuilt 2 rows', out.getvalue())
+        self.assertEqual(rollup_table(), recomputed_table())
+    
+    def test_summary_report_reads_rollup(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.book(status='completed')
+        self.book(hour=10, service=self.shave)
+        self.book(barber=1, status='cancelled')
+    
+        self.client.login(username='admin', password='password')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('reports:shop_summary'), {'start': '2030-01-01', 'end': '2030-01-31', 'group': 'barber'})
+        self.assertFalse([query for query in queries if 'booking_appointment' in query['sql']])
+        self.assertEqual([(row['label'], row['booked'], row['booked_minutes']) for row in response.context['rows']], [
+            ('Barber 0', 2, 75),
+            ('Barber 1', 1, 0),
+        ])
+        self.assertEqual(response.context['totals']['cancelled'], 1)
+    
+        self.client.login(username='customer', password='password')
+        self.assertRedirects(self.client.get(reverse('reports:shop_summary')), reverse('dashboard:home'))
+
+
+class RevenueReportTest(TestCase):
+    def setUp(self):
+        from django.utils import timezone
+        from datetime import datetime
+        customer = User.objects.create_user(username='customer', password='password')
+        User.objects.create_user(username='admin', password='password', is_staff=True)
+        barbers = [
+            Barber.objects.create(user=User.objects.create_user(username=f'barber{i}', password='password'), name=f'Barber {i}')
+            for i in range(2)
+        ]
+        cut = Service.objects.create(name='Cut', price=300, duration_minutes=30)
+    
+        def pay(barber, day, hour, method, amount, status='paid', paid_at=True):
+            appointment = Appointment.objects.create(
+                customer=customer, barber=barber, service=cut,
+                appointment_date=day, appointment_time=time(9, 0), status='completed'
+            )
+            # Shop-local time; just after midnight still belongs to that day
+            moment = timezone.make_aware(datetime.combine(day, time(hour, 30)))
+            Payment.objects.create(
+                appointment=appointment, payment_method=method, amount=amount,
+                payment_status=status, paid_at=moment if paid_at else None
+            )
+    
+        pay(barbers[0], date(2030, 1, 5), 10, 'gcash', 300)
+        pay(barbers[1], date(2030, 1, 31), 23, 'pay_after', 200)
+        pay(barbers[0], date(2030, 2, 1), 0, 'gcash', 500)
+        pay(barbers[1], date(2030, 2, 14), 15, 'gcash', 400, status='refunded')
+        pay(barbers[0], date(2030, 2, 20), 15, 'pay_after', 250, status='pending', paid_at=False)
+        self.client.login(username='admin', password='password')
+        self.url = reverse('reports:revenue_report')
+    
+    def test_monthly_totals_with_refunds(self):
+        from reports.revenue import revenue_report
+        rows, totals = revenue_report(date(2030, 1, 1), date(2030, 2, 28), period='month')
+        self.assertEqual([(row['period'], row['payments'], row['gross'], row['refunds'], row['net']) for row in rows], [
+            (date(2030, 1, 1), 2, Decimal('500'), Decimal('0'), Decimal('500')),
+            (date(2030, 2, 1), 2, Decimal('900'), Decimal('400'), Decimal('500')),
+        ])
+        self.assertEqual(totals['net'], Decimal('1000'))
+        self.assertEqual(totals['refunded_payments'], 1)
+    
+    def test_breakdowns(self):
+        from reports.revenue import revenue_report
+        rows, _ = revenue_report(date(2030, 1, 1), date(2030, 2, 28), period='month', breakdown='method')
+        self.assertEqual([(row['period'].month, row['breakdown'], row['net']) for row in rows], [
+            (1, 'GCash', Decimal('300')),
+            (1, 'Pay After Service', Decimal('200')),
+            (2, 'GCash', Decimal('500')),
+        ])
+        rows, _ = revenue_report(date(2030, 1, 1), date(2030, 2, 28), period='week', breakdown='barber')
+        self.assertEqual(sum(row['gross'] for row in rows if row['breakdown'] == 'Barber 1'), Decimal('600'))
+    
+    def test_view_and_csv(self):
+        params = {'start': '2030-01-01', 'end': '2030-12-31', 'period': 'month', 'by': 'barber'}
+        with self.assertNumQueries(4):
+            # Session, user, then the report over live and archived payments
+            response = self.client.get(self.url, params)
+        self.assertEqual(len(response.context['rows']), 4)
+    
+        response = self.client.get(self.url, dict(params, format='csv'))
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'period,breakdown,payments,gross,refunds,refunded_payments,net')
+        self.assertEqual(lines[1:], [
+            '2030-01-01,Barber 0,1,300.00,0.00,0,300.00',
+            '2030-01-01,Barber 1,1,200.00,0.00,0,200.00',
+            '2030-02-01,Barber 0,1,500.00,0.00,0,500.00',
+            '2030-02-01,Barber 1,1,400.00,400.00,1,0.00',
+        ])
+    
+        self.client.logout()
+        User.objects.create_user(username='plain', password='password')
+        self.client.login(username='plain', password='password')
+        self.assertRedirects(self.client.get(self.url), reverse('dashboard:home'))
+
+
+class UtilizationTest(TestCase):
+    def setUp(self):
+        customer = User.objects.create_user(username='customer', password='password')
+        User.objects.create_user(username='admin', password='password', is_staff=True)
+        self.barber = Barber.objects.create(user=User.objects.create_user(username='barber', password='password'), name='Barber')
+        self.idle = Barber.objects.create(user=User.objects.create_user(username='idle', password='password'), name='Idle')
+        BarberAvailability.objects.create(barber=self.barber, day_of_week=0, start_time=time(9, 0), end_time=time(12, 0))
+        BarberAvailability.objects.create(barber=self.barber, day_of_week=1, start_time=time(9, 0), end_time=time(17, 0), is_available=False)
+        short = Service.objects.create(name='Cut', price=300, duration_minutes=30)
+        long = Service.objects.create(name='Color', price=900, duration_minutes=60)
+    
+        def book(day, slot, service, status='confirmed'):
+            Appointment.objects.create(
+                customer=customer, barber=self.barber, service=service,
+                appointment_date=day, appointment_time=slot, status=status
+            )
+    
+        # Two Mondays, a cancellation, and a late Sunday booking running past midnight
+        book(date(2030, 1, 7), time(9, 45), short, status='pending')
+        book(date(2030, 1, 14), time(10, 0), long)
+        book(date(2030, 1, 14), time(11, 0), long, status='cancelled')
+        book(date(2030, 1, 20), time(23, 30), long)
+        self.start, self.end = date(2030, 1, 7), date(2030, 1, 20)
+    
+    def test_hour_of_week_binning(self):
+        from reports.utilization import hour_of_week_minutes
+        with self.assertNumQueries(3):
+            minutes = hour_of_week_minutes(self.start, self.end, [self.barber.pk, self.idle.pk])
+        booked, available = minutes[self.barber.pk]
+        self.assertEqual(booked[9], 15)
+        self.assertEqual(booked[10], 15 + 60)
+        self.assertEqual(booked[11], 0)
+        # Sunday 23:30 spills into Monday 00:00
+        self.assertEqual((booked[167], booked[0]), (30, 30))
+        self.assertEqual([available[hour] for hour in (8, 9, 10, 11, 12)], [0, 120, 120, 120, 0])
+        self.assertEqual(sum(available), 360)
+        self.assertEqual(sum(minutes[self.idle.pk][0]) + sum(minutes[self.idle.pk][1]), 0)
+    
+    def test_daily_minutes(self):
+        from reports.utilization import daily_minutes
+        days = daily_minutes(self.start, self.end, [self.barber.pk])[self.barber.pk]
+        self.assertEqual(len(days), 14)
+        self.assertEqual(days[0], (date(2030, 1, 7), 30, 180))
+        self.assertEqual(days[1], (date(2030, 1, 8), 0, 0))
+        self.assertEqual(days[7], (date(2030, 1, 14), 60, 180))
+    
+    def test_views(self):
+        self.client.login(username='admin', password='password')
+        url = reverse('reports:utilization_report')
+        response = self.client.get(url, {'start': '2030-01-07', 'end': '2030-01-20'})
+        self.assertEqual(response.context['hours'], list(range(0, 24)))
+        monday = response.context['rows'][0]
+        self.assertEqual(monday['barber'], self.barber)
+        self.assertEqual(monday['cells'][10]['percent'], round(75 * 100 / 120))
+        self.assertEqual(monday['total']['percent'], round(150 * 100 / 360))
+    
+        response = self.client.get(url, {'start': '2030-01-07', 'end': '2030-01-20', 'view': 'day'})
+        self.assertEqual(response.context['days'][0]['cells'][0]['percent'], 17)
@@ -0,0 +1,12 @@
+# reports/urls.py
+
+from django.urls import path
+from . import views
+
+app_name = 'reports'
+
+urlpatterns = [
+    path('', views.shop_summary, name='shop_summary'),
+    path('revenue/', views.revenue_report, name='revenue_report'),
+    path('utilization/', views.utilization_report, name='utilization_report'),
+]
@@ -0,0 +1,132 @@
+# reports/utilization.py
+
+from array import array
+from datetime import timedelta
+from itertools import accumulate
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractIsoWeekDay
+from barbers.models import Barber, BarberAvailability
+from booking.models import Appointment, ArchivedAppointment
+from .models import DailyShopStats
+from .rollup import MINUTE_STATUSES
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+HOURS_PER_WEEK = 7 * 24
+
+
+def weekday_counts(start_date, end_date):
+    """How many Mondays, Tuesdays, ... Sundays fall in a date range, indexed 0 (Monday) to 6."""
+    days = (end_date - start_date).days + 1
+    counts = [days // 7] * 7
+    for offset in range(days % 7):
+        counts[(start_date.weekday() + offset) % 7] += 1
+    return counts
+
+
+def _minute_of_day(value):
+    return value.hour * 60 + value.minute
+
+
+def _empty_week():
+    # One slot per minute plus the end marker of an interval reaching Sunday midnight
+    return array('q', bytes(8 * (MINUTES_PER_WEEK + 1)))
+
+
+def _add(diff, start_minute, minutes, weight):
+    """Mark [start_minute, start_minute + minutes) in a minute-of-week difference array, wrapping past Sunday."""
+    end_minute = start_minute + minutes
+    if end_minute <= MINUTES_PER_WEEK:
+        diff[start_minute] += weight
+        diff[end_minute] -= weight
+    else:
+        _add(diff, start_minute, MINUTES_PER_WEEK - start_minute, weight)
+        _add(diff, 0, end_minute - MINUTES_PER_WEEK, weight)
+
+
+def _hourly(diff):
+    """
+    Turn a minute-of-week difference array into minutes per hour of the week.
+    
+    Two running sums do the binning: the first gives how much is going on in
+    each minute, the second lets each hour be read off as a difference of
+    two totals.
+    """
+    totals = array('q', accumulate(accumulate(diff[:MINUTES_PER_WEEK]), initial=0))
+    return array('q', (totals[hour * 60 + 60] - totals[hour * 60] for hour in range(HOURS_PER_WEEK)))
+
+
+def hour_of_week_minutes(start_date, end_date, barber_ids):
+    """
+    Booked and available minutes per barber and hour of the week over a date range.
+    
+    Appointments are read in one query per table, live and archived, already
+    collapsed by the database to (barber, weekday, start time, duration) with
+    a count, so a year of bookings comes back as at most a few thousand rows.
+    Each row is then added to a per-barber difference array rather than
+    looping over minutes.
+    
+    Returns:
+        {barber_id: (booked, available)}, each an array of HOURS_PER_WEEK
+        minute totals; hour 0 is Monday 00:00-01:00
+    """
+    diffs = {barber_id: (_empty_week(), _empty_week()) for barber_id in barber_ids}
+    
+    for model in (Appointment, ArchivedAppointment):
+        booked = (
+            model.objects.filter(
+                appointment_date__range=[start_date, end_date], status__in=MINUTE_STATUSES, barber_id__in=barber_ids
+            )
+            .annotate(weekday=ExtractIsoWeekDay('appointment_date'))
+            .values_list('barber_id', 'weekday', 'appointment_time', 'duration_minutes')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        for barber_id, weekday, slot, duration, count in booked:
+            _add(diffs[barber_id][0], (weekday - 1) * MINUTES_PER_DAY + _minute_of_day(slot), duration, count)
+    
+    counts = weekday_counts(start_date, end_date)
+    availability = BarberAvailability.objects.filter(barber_id__in=barber_ids, is_available=True).values_list(
+        'barber_id', 'day_of_week', 'start_time', 'end_time'
+    )
+    for barber_id, day, opens, closes in availability:
+        minutes = _minute_of_day(closes) - _minute_of_day(opens)
+        if minutes > 0 and counts[day]:
+            _add(diffs[barber_id][1], day * MINUTES_PER_DAY + _minute_of_day(opens), minutes, counts[day])
+    
+    return {barber_id: (_hourly(booked_diff), _hourly(available_diff)) for barber_id, (booked_diff, available_diff) in diffs.items()}
+
+
+def daily_minutes(start_date, end_date, barber_ids):
+    """
+    Booked and available minutes per barber per day, from the daily rollup.
+    
+    Returns:
+        {barber_id: [(date, booked_minutes, available_minutes), ...]} for every day in the range
+    """
+    booked = {
+        (barber_id, day): minutes
+        for barber_id, day, minutes in DailyShopStats.objects.filter(
+            date__range=[start_date, end_date], barber_id__in=barber_ids
+        ).values_list('barber_id', 'date').annotate(minutes=Sum('booked_minutes')).order_by()
+    }
+    
+    open_minutes = {}
+    for barber_id, day, opens, closes in BarberAvailability.objects.filter(
+        barber_id__in=barber_ids, is_available=True
+    ).values_list('barber_id', 'day_of_week', 'start_time', 'end_time'):
+        open_minutes[barber_id, day] = max(_minute_of_day(closes) - _minute_of_day(opens), 0)
+    
+    days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    return {
+        barber_id: [
+            (day, booked.get((barber_id, day), 0), open_minutes.get((barber_id, day.weekday()), 0))
+            for day in days
+        ]
+        for barber_id in barber_ids
+    }
+
+
+def report_barbers():
+    """Barbers a utilization report covers: everyone active."""
+    return list(Barber.objects.filter(is_active=True).order_by('name'))
@@ -0,0 +1,196 @@
+# reports/views.py
+
+import csv
+from django.shortcuts import render, redirect
+from django.http import StreamingHttpResponse
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.db.models import Sum
+from datetime import date, timedelta
+from barbers.models import BarberAvailability
+from .models import DailyShopStats
+from . import revenue, utilization
+
+# Longest range a report covers in one request
+MAX_REPORT_DAYS = 366 * 3
+
+SUMMARY_GROUPS = {
+    'day': ('date', 'date'),
+    'barber': ('barber__name', 'barber__name'),
+    'service': ('service__name', 'service__name'),
+}
+
+SUMMARY_FIELDS = ['booked', 'completed', 'cancelled', 'declined', 'booked_minutes', 'revenue']
+
+
+def _report_range(request, default_days=30):
+    """
+    Read ?start= and ?end= (YYYY-MM-DD), defaulting to the last default_days days.
+    
+    Raises:
+        ValueError: If a date is malformed, reversed, or the range is too long
+    """
+    today = date.today()
+    try:
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else today - timedelta(days=default_days - 1)
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else today
+    except ValueError:
+        raise ValueError('Please enter dates as YYYY-MM-DD.')
+    
+    if end < start:
+        raise ValueError('The end date must not be before the start date.')
+    if (end - start).days >= MAX_REPORT_DAYS:
+        raise ValueError(f'Reports are limited to {MAX_REPORT_DAYS} days.')
+    return start, end
+
+
+@login_required
+def shop_summary(request):
+    """Bookings, cancellations, booked time and revenue per day, barber or service, from the daily rollup."""
+    if not request.user.is_staff:
+        messages.error(request, 'You do not have permission to access this page.')
+        return redirect('dashboard:home')
+    
+    group = request.GET.get('group', 'day')
+    if group not in SUMMARY_GROUPS:
+        group = 'day'
+    
+    try:
+        start, end = _report_range(request)
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('reports:shop_summary')
+    
+    group_field, order_field = SUMMARY_GROUPS[group]
+    rows = list(
+        DailyShopStats.objects.filter(date__range=[start, end])
+        .values(group_field)
+        .annotate(**{field: Sum(field) for field in SUMMARY_FIELDS})
+        .order_by(order_field)
+    )
+    for row in rows:
+        row['label'] = row[group_field]
+        row['booked_hours'] = row['booked_minutes'] / 60
+    
+    totals = {field: sum(row[field] for row in rows) for field in SUMMARY_FIELDS}
+    totals['booked_hours'] = totals['booked_minutes'] / 60
+    
+    context = {
+        'rows': rows,
+        'totals': totals,
+        'group': group,
+        'start': start,
+        'end': end,
+    }
+    return render(request, 'reports/shop_summary.html', context)
+
+
+class _Echo:
+    """File-like object whose write() just returns the line, for streaming csv.writer output."""
+    def write(self, value):
+        return value
+
+
+@login_required
+def revenue_report(request):
+    """Revenue and refunds per day, week or month, optionally by barber, service or payment method."""
+    if not request.user.is_staff:
+        messages.error(request, 'You do not have permission to access this page.')
+        return redirect('dashboard:home')
+    
+    period = request.GET.get('period', 'day')
+    if period not in revenue.PERIODS:
+        period = 'day'
+    breakdown = request.GET.get('by') or None
+    if breakdown not in revenue.BREAKDOWNS:
+        breakdown = None
+    
+    try:
+        start, end = _report_range(request)
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('reports:revenue_report')
+    
+    if request.GET.get('format') == 'csv':
+        writer = csv.writer(_Echo())
+        response = StreamingHttpResponse(
+            (writer.writerow(row) for row in revenue.csv_rows(start, end, period, breakdown)),
+            content_type='text/csv'
+        )
+        response['Content-Disposition'] = f'attachment; filename="revenue_{start}_{end}.csv"'
+        return response
+    
+    rows, totals = revenue.revenue_report(start, end, period, breakdown)
+    
+    context = {
+        'rows': rows,
+        'totals': totals,
+        'period': period,
+        'breakdown': breakdown or '',
+        'start': start,
+        'end': end,
+    }
+    return render(request, 'reports/revenue_report.html', context)
+
+
+def _heat_cell(booked, available):
+    """Display values for one heatmap cell; utilization can pass 100% when bookings run outside hours."""
+    if not available:
+        return {'booked': booked, 'available': 0, 'percent': None, 'alpha': '0.35' if booked else '0'}
+    percent = round(booked * 100 / available)
+    return {'booked': booked, 'available': available, 'percent': percent, 'alpha': f'{min(percent, 100) / 100:.2f}'}
+
+
+@login_required
+def utilization_report(request):
+    """Booked minutes against available minutes per barber, as an hour-of-week heatmap or day by day."""
+    if not request.user.is_staff:
+        messages.error(request, 'You do not have permission to access this page.')
+        return redirect('dashboard:home')
+    
+    view = request.GET.get('view', 'week')
+    if view not in ('week', 'day'):
+        view = 'week'
+    
+    try:
+        start, end = _report_range(request)
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('reports:utilization_report')
+    
+    barbers = utilization.report_barbers()
+    barber_ids = [barber.pk for barber in barbers]
+    context = {'view': view, 'start': start, 'end': end, 'barbers': barbers}
+    
+    if view == 'day':
+        minutes = utilization.daily_minutes(start, end, barber_ids)
+        context['days'] = [
+            {'date': day, 'cells': [_heat_cell(*minutes[barber_id][index][1:]) for barber_id in barber_ids]}
+            for index, (day, _, _) in enumerate(minutes[barber_ids[0]] if barber_ids else [])
+        ]
+        return render(request, 'reports/utilization_report.html', context)
+    
+    minutes = utilization.hour_of_week_minutes(start, end, barber_ids)
+    # Only show the hours somebody works or is booked in
+    busy_hours = {
+        hour % 24
+        for booked, available in minutes.values()
+        for hour in range(utilization.HOURS_PER_WEEK)
+        if booked[hour] or available[hour]
+    }
+    hours = list(range(min(busy_hours), max(busy_hours) + 1)) if busy_hours else []
+    
+    rows = []
+    for barber in barbers:
+        booked, available = minutes[barber.pk]
+        for day, day_name in BarberAvailability.DAYS_OF_WEEK:
+            rows.append({
+                'barber': barber,
+                'first': day == 0,
+                'day': day_name[:3],
+                'cells': [_heat_cell(booked[day * 24 + hour], available[day * 24 + hour]) for hour in hours],
+            })
+        rows[-7]['total'] = _heat_cell(sum(booked), sum(available))
+    
+    context.update({'rows': rows, 'hours': hours})
+    return render(request, 'reports/utilization_report.html', context)
@@ -1,6 +1,7 @@
 /* booking.js - Dynamic booking functionality */
 
 document.addEventListener('DOMContentLoaded', function() {
+    const serviceSelect = document.getElementById('id_service');
     const barberSelect = document.getElementById('id_barber');
     const dateInput = document.getElementById('id_appointment_date');
     const timeInput = document.getElementById('id_appointment_time');
@@ -8,7 +9,12 @@ document.addEventListener('DOMContentLoaded', function() {
     
     if (!barberSelect || !dateInput) return;
     
+    // Slots already fetched this page view, keyed by "serviceId|barberId|date"
+    const slotCache = {};
+    const SLOT_CACHE_TTL = 60 * 1000;
+    
     // Load time slots when barber or date changes
+    if (serviceSelect) serviceSelect.addEventListener('change', loadTimeSlots);
     barberSelect.addEventListener('change', loadTimeSlots);
     dateInput.addEventListener('change', loadTimeSlots);
     
@@ -24,8 +30,15 @@ document.addEventListener('DOMContentLoaded', function() {
         // Show loading state
         timeSlotsContainer.innerHTML = '<div class="loading-spinner"><div class="spinner"></div><p>Loading available slots...</p></div>';
         
-        // Fetch available slots
-        fetch(`/booking/api/available-slots/?barber_id=${barberId}&date=${date}`)
+        const serviceId = serviceSelect ? serviceSelect.value : '';
+        const cached = slotCache[serviceId + '|' + barberId + '|' + date];
+        if (cached && Date.now() - cached.fetchedAt < SLOT_CACHE_TTL) {
+            displayTimeSlots(cached.slots);
+            return;
+        }
+        
+        // Fetch the whole week for this barber in one request
+        fetch(`/booking/api/availability/?barber_ids=${barberId}&service_id=${serviceId}&start=${date}&end=${addDays(date, 6)}`)
             .then(response => response.json())
             .then(data => {
                 if (data.error) {
@@ -33,7 +46,20 @@ document.addEventListener('DOMContentLoaded', function() {
                     return;
                 }
                 
-                displayTimeSlots(data.slots);
+                const fetchedAt = Date.now();
+                data.barbers.forEach(barber => {
+                    barber.days.forEach(day => {
+                        slotCache[serviceId + '|' + barber.id + '|' + day.date] = {slots: day.slots, fetchedAt: fetchedAt};
+                    });
+                });
+                
+                // Ignore responses for a barber/date the customer has already moved away from
+                const currentServiceId = serviceSelect ? serviceSelect.value : '';
+                if (currentServiceId === serviceId && barberSelect.value === barberId && dateInput.value === date) {
+                    // A barber missing from the response (inactive, say) has no slots to offer
+                    const entry = slotCache[serviceId + '|' + barberId + '|' + date];
+                    displayTimeSlots(entry ? entry.slots : []);
+                }
             })
             .catch(error => {
                 console.error('Error fetching time slots:', error);
@@ -41,6 +67,12 @@ document.addEventListener('DOMContentLoaded', function() {
             });
     }
     
+    function addDays(dateStr, days) {
+        const parts = dateStr.split('-').map(Number);
+        const d = new Date(Date.UTC(parts[0], parts[1] - 1, parts[2] + days));
+        return d.toISOString().slice(0, 10);
+    }
+    
     function displayTimeSlots(slots) {
         if (slots.length === 0) {
             timeSlotsContainer.innerHTML = '<p class="info-message">No time slots available for this date.</p>';
@@ -72,23 +104,61 @@ document.addEventListener('DOMContentLoaded', function() {
         // Add click handlers to available slots
         document.querySelectorAll('.time-slot.available').forEach(button => {
             button.addEventListener('click', function() {
+                holdSlot(this);
+            });
+        });
+    }
+    
+    function holdSlot(button) {
+        // Reserve the slot for a few minutes so nobody else can take it while the form is finished
+        const body = new URLSearchParams({
+            barber_id: barberSelect.value,
+            date: dateInput.value,
+            time: button.dataset.time,
+            service_id: serviceSelect ? serviceSelect.value : ''
+        });
+        
+        fetch('/booking/api/hold-slot/', {
+            method: 'POST',
+            headers: {'X-CSRFToken': getCsrfToken()},
+            body: body
+        })
+            .then(response => response.json().then(data => ({ok: response.ok, data: data})))
+            .then(result => {
+                if (!result.ok) {
+                    button.classList.remove('available', 'selected');
+                    button.classList.add('unavailable');
+                    button.disabled = true;
+                    button.title = result.data.error;
+                    delete slotCache[(serviceSelect ? serviceSelect.value : '') + '|' + barberSelect.value + '|' + dateInput.value];
+                    alert(result.data.error);
+                    return;
+                }
+                
                 // Remove selected class from all slots
                 document.querySelectorAll('.time-slot').forEach(btn => {
                     btn.classList.remove('selected');
                 });
                 
                 // Add selected class to clicked slot
-                this.classList.add('selected');
+                button.classList.add('selected');
                 
                 // Set the hidden time input value
-                timeInput.value = this.dataset.time;
+                timeInput.value = button.dataset.time;
                 
                 // Hide the original time input (it's now set programmatically)
                 if (timeInput.parentElement) {
                     timeInput.parentElement.style.display = 'none';
                 }
+            })
+            .catch(error => {
+                console.error('Error holding time slot:', error);
             });
-        });
+    }
+    
+    function getCsrfToken() {
+        const input = document.querySelector('input[name="csrfmiddlewaretoken"]');
+        return input ? input.value : '';
     }
     
     // Initialize on page load if values are already set
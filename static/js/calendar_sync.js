@@ -0,0 +1,122 @@
+/* calendar_sync.js - Keep a FullCalendar up to date with delta sync */
+
+const ACTIVE_STATUSES = ['pending', 'confirmed', 'completed'];
+
+// Event source that remembers the sync token of the last fetch.
+// When options.useSummary() is true (e.g. in month view) it shows one
+// all-day event per day from options.summaryUrl instead of every booking.
+function syncedEventSource(url, options) {
+    options = options || {};
+    
+    const source = {
+        syncToken: null,
+        summary: false,
+        events: function(info, successCallback, failureCallback) {
+            const summary = Boolean(options.summaryUrl && options.useSummary && options.useSummary());
+            const params = new URLSearchParams({start: info.startStr, end: info.endStr});
+            if (summary) params.set('by_barber', '1');
+            
+            fetch((summary ? options.summaryUrl : url) + '?' + params)
+                .then(response => {
+                    if (!response.ok) throw new Error('HTTP ' + response.status);
+                    source.syncToken = response.headers.get('X-Sync-Token');
+                    source.summary = summary;
+                    return response.json();
+                })
+                .then(data => successCallback(summary ? summaryEvents(data.days) : data))
+                .catch(failureCallback);
+        }
+    };
+    return source;
+}
+
+// One all-day event per day with bookings, e.g. "12 booked · 3 pending"
+function summaryEvents(days) {
+    const events = [];
+    Object.keys(days).forEach(date => {
+        const statuses = days[date].statuses;
+        const booked = ACTIVE_STATUSES.reduce((total, status) => total + (statuses[status] || 0), 0);
+        if (!booked) return;
+        
+        let title = booked + ' booked';
+        if (statuses.pending) title += ' · ' + statuses.pending + ' pending';
+        
+        events.push({
+            id: 'summary-' + date,
+            title: title,
+            start: date,
+            allDay: true,
+            color: statuses.pending ? '#f39c12' : '#27ae60',
+            extendedProps: {summary: true, statuses: statuses, barbers: days[date].barbers || {}}
+        });
+    });
+    return events;
+}
+
+// Tooltip text listing a summary day's bookings per barber
+function summaryTooltip(event) {
+    const barbers = event.extendedProps.barbers;
+    return Object.keys(barbers).map(name => {
+        const booked = ACTIVE_STATUSES.reduce((total, status) => total + (barbers[name][status] || 0), 0);
+        return name + ': ' + booked;
+    }).join('\n');
+}
+
+// Poll for changes since the last sync token and apply them in place.
+// Returns the sync function so live events can trigger it early.
+function startCalendarSync(calendar, url, source, intervalMs) {
+    function sync() {
+        if (!source.syncToken || document.hidden) return;
+        
+        const view = calendar.view;
+        const params = new URLSearchParams({
+            start: view.activeStart.toISOString(),
+            end: view.activeEnd.toISOString(),
+            since: source.syncToken
+        });
+        
+        fetch(url + '?' + params)
+            .then(response => {
+                if (response.status === 410) {
+                    // Too old to sync from; start over
+                    source.syncToken = null;
+                    calendar.refetchEvents();
+                    return null;
+                }
+                if (!response.ok) throw new Error('HTTP ' + response.status);
+                return response.json();
+            })
+            .then(delta => {
+                if (!delta) return;
+                
+                if (source.summary) {
+                    // Counts can't be patched in place; refetch them if anything moved
+                    if (delta.deleted.length || delta.events.length) {
+                        calendar.refetchEvents();
+                    } else {
+                        source.syncToken = delta.sync_token;
+                    }
+                    return;
+                }
+                
+                const eventSource = calendar.getEventSources()[0];
+                
+                calendar.batchRendering(function() {
+                    delta.deleted.forEach(id => {
+                        const event = calendar.getEventById(id);
+                        if (event) event.remove();
+                    });
+                    delta.events.forEach(data => {
+                        const event = calendar.getEventById(data.id);
+                        if (event) event.remove();
+                        calendar.addEvent(data, eventSource);
+                    });
+                });
+                source.syncToken = delta.sync_token;
+            })
+            .catch(error => console.error('Calendar sync failed:', error));
+    }
+    
+    setInterval(sync, intervalMs || 60000);
+    return sync;
+}
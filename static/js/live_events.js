@@ -0,0 +1,39 @@
+/* live_events.js - Listen for appointment changes pushed by the server */
+
+// Open a server-sent events stream and call onEvent(data) for each
+// appointment change, and onReset() when too much was missed to replay.
+// The browser reconnects by itself, resuming from the last event id.
+function listenForLiveEvents(url, onEvent, onReset) {
+    if (!window.EventSource) return null;
+    
+    const source = new EventSource(url);
+    source.addEventListener('appointment', function(message) {
+        onEvent(JSON.parse(message.data));
+    });
+    source.addEventListener('reset', function() {
+        if (onReset) onReset();
+    });
+    return source;
+}
+
+// Coalesce bursts of events (e.g. a bulk approve) into one call
+function debounce(callback, waitMs) {
+    let timer = null;
+    return function() {
+        clearTimeout(timer);
+        timer = setTimeout(callback, waitMs);
+    };
+}
+
+const LIVE_EVENT_LABELS = {
+    created: 'New booking',
+    status: 'Status changed',
+    payment: 'Payment updated'
+};
+
+// Short human-readable line for an event
+function describeLiveEvent(data) {
+    const detail = data.kind === 'payment' ? data.payment_status : data.status;
+    return (LIVE_EVENT_LABELS[data.kind] || 'Update') + ': appointment #' + data.appointment_id +
+        ' on ' + data.date + ' ' + (data.time || '') + ' (' + detail + ')';
+}